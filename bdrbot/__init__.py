@@ -0,0 +1,3 @@
+"""
+BDRman Telegram bot package
+"""
@@ -0,0 +1,153 @@
+"""
+Alert state shared with the security monitor (security_monitor.sh).
+
+The monitor writes every check result to STATE_DIR/alerts.db through the
+sqlite3 CLI: which alerts are firing and since when, when each was last
+sent (cooldown), how often it changed state lately (flap damping) and a
+history trimmed to ALERT_HISTORY_DAYS. /alerts reads the monitor's own view
+from here instead of sampling the machine again.
+
+Thresholds come from /etc/bdrman/config.conf with lib/core.sh's defaults,
+the same values the monitor uses.
+"""
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from bdrbot import core
+
+DB_FILE = os.path.join(core.STATE_DIR, "alerts.db")
+MONITOR_CONFIG = "/etc/bdrman/config.conf"
+HISTORY_LIMIT = 200
+
+# Keep in sync with lib/core.sh and the monitor script in lib/security.sh
+DEFAULTS = {
+    "MONITORING_INTERVAL": 30,
+    "ALERT_COOLDOWN": 300,
+    "DDOS_THRESHOLD": 50,
+    "CPU_ALERT_THRESHOLD": 90,
+    "MEMORY_ALERT_THRESHOLD": 90,
+    "DISK_ALERT_THRESHOLD": 90,
+    "FAILED_LOGIN_THRESHOLD": 10,
+    "FLAP_WINDOW": 1800,
+    "FLAP_LIMIT": 6,
+    "ALERT_HISTORY_DAYS": 30,
+}
+
+# Same statements as alert_db_init in the monitor
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    type TEXT PRIMARY KEY, state TEXT NOT NULL DEFAULT 'ok', detail TEXT,
+    since INTEGER, last_seen INTEGER, last_sent INTEGER NOT NULL DEFAULT 0,
+    last_change INTEGER NOT NULL DEFAULT 0, flaps INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS history (ts INTEGER, type TEXT, event TEXT, detail TEXT);
+CREATE INDEX IF NOT EXISTS history_ts ON history (ts);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+class Alert:
+    __slots__ = ("type", "state", "detail", "since", "last_seen", "last_sent", "last_change", "flaps")
+
+    def __init__(self, row):
+        for key, value in zip(self.__slots__, row):
+            setattr(self, key, value)
+
+    @property
+    def firing(self):
+        return self.state == "firing"
+
+    def flapping(self, settings, now=None):
+        now = now or time.time()
+        return self.flaps >= settings["FLAP_LIMIT"] and now - self.last_change < settings["FLAP_WINDOW"]
+
+def load_settings(path=MONITOR_CONFIG):
+    """Monitor thresholds: config.conf KEY=value lines over the defaults."""
+    settings = dict(DEFAULTS)
+    try:
+        with open(path) as f:
+            for line in f:
+                key, sep, value = line.split("#", 1)[0].strip().partition("=")
+                value = value.strip().strip("'\"")
+                if sep and key in settings and value.isdigit():
+                    settings[key] = int(value)
+    except OSError:
+        pass
+    return settings
+
+def connect(path=None):
+    conn = sqlite3.connect(path or DB_FILE, timeout=5)
+    conn.executescript(SCHEMA)
+    return conn
+
+def read(path=None):
+    """(alerts by type, monitor heartbeat or None); empty when there is no store yet."""
+    path = path or DB_FILE
+    if not os.path.exists(path):
+        return {}, None
+    conn = connect(path)
+    try:
+        alerts = {row[0]: Alert(row) for row in conn.execute(f"SELECT {', '.join(Alert.__slots__)} FROM alerts")}
+        row = conn.execute("SELECT value FROM meta WHERE key = 'heartbeat'").fetchone()
+    finally:
+        conn.close()
+    return alerts, int(row[0]) if row else None
+
+def history(since=0, limit=HISTORY_LIMIT, path=None):
+    path = path or DB_FILE
+    if not os.path.exists(path):
+        return []
+    conn = connect(path)
+    try:
+        return conn.execute("SELECT ts, type, event, detail FROM history WHERE ts >= ? ORDER BY ts DESC, rowid DESC LIMIT ?",
+                            (since, limit)).fetchall()
+    finally:
+        conn.close()
+
+def monitor_alive(heartbeat, settings, now=None):
+    """The monitor stamps a heartbeat every loop; three missed loops means it is gone."""
+    now = now or time.time()
+    return heartbeat is not None and now - heartbeat < 3 * (settings["MONITORING_INTERVAL"] + 5)
+
+def ago(seconds):
+    seconds = int(max(seconds, 0))
+    if seconds < 120:
+        return f"{seconds}s"
+    if seconds < 7200:
+        return f"{seconds // 60}m"
+    if seconds < 2 * 86400:
+        return f"{seconds // 3600}h"
+    return f"{seconds // 86400}d"
+
+def render_active(alerts, settings, now=None):
+    """One line per firing alert, flapping ones marked; empty when all clear."""
+    now = now or time.time()
+    lines = []
+    for a in sorted((a for a in alerts.values() if a.firing), key=lambda a: a.since or 0):
+        detail = (a.detail or "firing").replace("`", "'")
+        flapping = a.flapping(settings, now)
+        if flapping:
+            note = f"flapping, {a.flaps} changes, notifications held"
+        else:
+            note = f"sent {ago(now - a.last_sent)} ago" if a.last_sent else "not sent yet"
+        lines.append(f"{'〰️' if flapping else '🔴'} *{a.type}* `{detail}` for {ago(now - (a.since or now))} ({note})")
+    for a in alerts.values():
+        if not a.firing and a.flapping(settings, now):
+            lines.append(f"〰️ *{a.type}*: flapping ({a.flaps} changes), notifications held")
+    return "\n".join(lines)
+
+def render_history(rows):
+    return "\n".join(f"{datetime.fromtimestamp(ts).strftime('%m-%d %H:%M')} {event:<9} {kind:<10} {detail or ''}"
+                     for ts, kind, event, detail in rows)
+
+if __name__ == "__main__":
+    # python3 -m bdrbot.alertstore [history]
+    settings = load_settings()
+    alerts, heartbeat = read()
+    if sys.argv[1:2] == ["history"]:
+        print(render_history(history()) or "No alert history")
+    else:
+        state = f"heartbeat {ago(time.time() - heartbeat)} ago" if heartbeat else "never ran"
+        print(f"Monitor: {'running' if monitor_alive(heartbeat, settings) else 'NOT running'} ({state})")
+        print(render_active(alerts, settings).replace("*", "") or "No active alerts")
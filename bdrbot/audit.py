@@ -0,0 +1,94 @@
+"""
+Command audit trail.
+
+The scheduler writes one record per command: who ran it, arguments,
+lane, duration, outcome and the worst shell exit status. Records go to
+the JSON log (as an "audit" field) and to an in-memory ring buffer that
+/audit reads; after a restart the buffer is refilled from the log tail.
+"""
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime
+from bdrbot import core
+from bdrbot.core import logger
+
+RING_SIZE = 1000
+RELOAD_BYTES = 2 * 1024 * 1024     # log tail scanned to refill the ring on first use
+
+_ring = deque(maxlen=RING_SIZE)
+_loaded = False
+
+def start(update, name, lane):
+    """New audit record for a command update."""
+    user = update.effective_user
+    message = update.effective_message
+    # Only command arguments: conversation replies can be PINs
+    text = message.text if message and message.text else ""
+    args = text.split()[1:] if text.startswith("/") else []
+    return {
+        "ts": time.time(),
+        "user": user.id if user else None,
+        "username": (user.username or user.first_name) if user else None,
+        "cmd": name,
+        "args": args,
+        "lane": lane,
+        "status": "ok",
+    }
+
+def finish(record, started):
+    record["ms"] = round((time.perf_counter() - started) * 1000)
+    _ring.append(record)
+    logger.info(f"audit /{record['cmd']} by {record['user']}: {record['status']} in {record['ms']}ms", extra={"audit": record})
+
+def _reload():
+    """Refill the ring from the end of the JSON log."""
+    global _loaded
+    _loaded = True
+    try:
+        with open(core.LOG_FILE, 'rb') as f:
+            f.seek(max(os.path.getsize(core.LOG_FILE) - RELOAD_BYTES, 0))
+            tail = f.read().decode("utf-8", "replace").splitlines()[1:]
+    except OSError:
+        return
+    seen = {(r["ts"], r["cmd"]) for r in _ring}
+    older = []
+    for line in tail:
+        if '"audit"' not in line:
+            continue
+        try:
+            record = json.loads(line)["audit"]
+        except (ValueError, KeyError, TypeError):
+            continue
+        if (record.get("ts"), record.get("cmd")) not in seen:
+            older.append(record)
+    current = list(_ring)
+    _ring.clear()
+    _ring.extend(older[-(RING_SIZE - len(current)):] if len(current) < RING_SIZE else [])
+    _ring.extend(current)
+
+def recent(limit=20, match=None):
+    """Newest records first; match filters on command, username, user id or status."""
+    if not _loaded:
+        _reload()
+    out = []
+    for r in reversed(_ring):
+        if match and match not in (r.get("cmd"), r.get("username"), str(r.get("user")), r.get("status")):
+            continue
+        out.append(r)
+        if len(out) >= limit:
+            break
+    return out
+
+def render(records):
+    lines = []
+    for r in records:
+        stamp = datetime.fromtimestamp(r["ts"]).strftime('%m-%d %H:%M:%S')
+        who = r.get("username") or r.get("user")
+        status = r.get("status", "?")
+        if r.get("exit"):
+            status += f" rc={r['exit']}"
+        args = " ".join(r.get("args") or [])
+        lines.append(f"{stamp} {str(who)[:10]:<10} /{r['cmd']} {args[:30]}".rstrip() + f"  {r.get('ms', 0)}ms {status}")
+    return "\n".join(lines)
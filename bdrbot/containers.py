@@ -0,0 +1,190 @@
+"""
+Per-container resource accounting read straight from cgroup v2.
+
+One pass over the container cgroups (cpu.stat, memory.current, io.stat)
+replaces `docker stats`; CPU and IO rates come from the delta between two
+samples. Container names are read once from Docker's on-disk config.
+"""
+import asyncio
+import json
+import os
+import re
+import time
+from bdrbot.core import human_bytes
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+DOCKER_ROOT = "/var/lib/docker/containers"
+CACHE_TTL = 1.0        # reuse a sample younger than this
+MIN_INTERVAL = 0.5     # shortest window used for rates
+
+CAPROVER_APP_PREFIX = "srv-captain--"
+CAPROVER_CORE = ("captain-captain", "captain-nginx", "captain-certbot", "captain-registry")
+
+_ID_RE = re.compile(r"^(?:docker-)?([0-9a-f]{64})(?:\.scope)?$")
+
+def is_cgroup_v2(root=CGROUP_ROOT):
+    return os.path.exists(os.path.join(root, "cgroup.controllers"))
+
+def service_name(name):
+    """Swarm task containers are named <service>.<slot>.<task id>."""
+    return name.split(".")[0]
+
+def app_name(name):
+    """CapRover app for a container name, or None if it is not a CapRover container."""
+    service = service_name(name)
+    if service.startswith(CAPROVER_APP_PREFIX):
+        return service[len(CAPROVER_APP_PREFIX):]
+    if service in CAPROVER_CORE:
+        return service
+    return None
+
+def _read_int(path):
+    try:
+        with open(path, 'r') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+def _read_cpu_usec(path):
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                if line.startswith("usage_usec "):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _read_io_bytes(path):
+    total = 0
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                for field in line.split()[1:]:
+                    if field.startswith(("rbytes=", "wbytes=")):
+                        total += int(field.split("=")[1])
+    except OSError:
+        return None
+    return total
+
+class ContainerStat:
+    __slots__ = ("id", "name", "cpu_percent", "memory", "io_rate", "cpu_usec", "io_bytes")
+
+    def __init__(self, cid, name, memory, cpu_usec, io_bytes):
+        self.id = cid
+        self.name = name
+        self.memory = memory or 0
+        self.cpu_usec = cpu_usec
+        self.io_bytes = io_bytes
+        self.cpu_percent = 0.0
+        self.io_rate = 0.0
+
+    @property
+    def app(self):
+        return app_name(self.name)
+
+class ContainerCollector:
+    def __init__(self, cgroup_root=CGROUP_ROOT, docker_root=DOCKER_ROOT):
+        self.cgroup_root = cgroup_root
+        self.docker_root = docker_root
+        self._names = {}
+        self._prev = {}
+        self._prev_at = None
+        self._last = []
+        self._last_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _cgroup_dirs(self):
+        """Container id -> cgroup dir, for both systemd and cgroupfs drivers."""
+        found = {}
+        for parent in ("system.slice", "docker"):
+            base = os.path.join(self.cgroup_root, parent)
+            try:
+                with os.scandir(base) as it:
+                    for entry in it:
+                        m = _ID_RE.match(entry.name)
+                        if m and entry.is_dir(follow_symlinks=False):
+                            found[m.group(1)] = entry.path
+            except OSError:
+                continue
+        return found
+
+    def name_of(self, cid):
+        name = self._names.get(cid)
+        if name is None:
+            try:
+                with open(os.path.join(self.docker_root, cid, "config.v2.json"), 'r') as f:
+                    name = json.load(f).get("Name", "").lstrip("/") or cid[:12]
+            except (OSError, ValueError):
+                name = cid[:12]
+            self._names[cid] = name
+        return name
+
+    def _sample(self):
+        stats = {}
+        for cid, path in self._cgroup_dirs().items():
+            stats[cid] = ContainerStat(
+                cid, self.name_of(cid),
+                _read_int(os.path.join(path, "memory.current")),
+                _read_cpu_usec(os.path.join(path, "cpu.stat")),
+                _read_io_bytes(os.path.join(path, "io.stat")),
+            )
+        # Forget names of containers that are gone
+        for cid in list(self._names):
+            if cid not in stats:
+                del self._names[cid]
+        return stats
+
+    def _apply_rates(self, stats, now):
+        dt = now - self._prev_at
+        for cid, st in stats.items():
+            prev = self._prev.get(cid)
+            if not prev or dt <= 0:
+                continue
+            if st.cpu_usec is not None and prev.cpu_usec is not None:
+                st.cpu_percent = max(st.cpu_usec - prev.cpu_usec, 0) / (dt * 1e6) * 100
+            if st.io_bytes is not None and prev.io_bytes is not None:
+                st.io_rate = max(st.io_bytes - prev.io_bytes, 0) / dt
+
+    async def collect(self):
+        """Current stats for every container; rates cover at least MIN_INTERVAL."""
+        async with self._lock:
+            now = time.monotonic()
+            if self._last and now - self._last_at < CACHE_TTL:
+                return self._last
+            if self._prev_at is None:
+                self._prev, self._prev_at = self._sample(), time.monotonic()
+            wait = MIN_INTERVAL - (time.monotonic() - self._prev_at)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            now = time.monotonic()
+            stats = self._sample()
+            self._apply_rates(stats, now)
+            self._prev, self._prev_at = stats, now
+            self._last, self._last_at = list(stats.values()), now
+            return self._last
+
+SORT_KEYS = {
+    "cpu": lambda s: s.cpu_percent,
+    "mem": lambda s: s.memory,
+    "io": lambda s: s.io_rate,
+}
+
+def leaderboard(stats, sort="cpu", limit=15, label=lambda s: s.name):
+    """Monospace table of the top containers by cpu, mem or io."""
+    rows = sorted(stats, key=SORT_KEYS.get(sort, SORT_KEYS["cpu"]), reverse=True)[:limit]
+    width = min(max([len(label(s)) for s in rows] + [4]), 22)
+    lines = [f"{'NAME':<{width}} {'CPU%':>6} {'MEM':>8} {'IO/s':>8}"]
+    for s in rows:
+        lines.append(
+            f"{label(s)[:width]:<{width}} {s.cpu_percent:>6.1f} {human_bytes(s.memory):>8} {human_bytes(s.io_rate):>8}"
+        )
+    return "\n".join(lines)
+
+_collector = None
+
+def get_collector():
+    global _collector
+    if _collector is None:
+        _collector = ContainerCollector()
+    return _collector
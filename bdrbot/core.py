@@ -0,0 +1,169 @@
+"""
+Shared bot state and helpers: configuration, auth, shell execution
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from telegram import Update
+from bdrbot import jsonlog
+
+# Configuration
+CONFIG_FILE = "/etc/bdrman/telegram.conf"
+LOG_FILE = "/var/log/bdrman-bot.log"
+BDRMAN_BIN = "/usr/local/bin/bdrman"
+STATE_DIR = "/var/lib/bdrman"
+
+# Logging: stderr here; the bot and the fleet agent call setup_logging() for the
+# JSON file, so the python3 -m bdrbot.X CLIs never rotate the bot's log
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+logger = logging.getLogger("bdrman-bot")
+
+# Globals (filled by load_config)
+BOT_TOKEN = ""
+CHAT_ID = ""
+PIN_CODE = "1234"
+SERVER_NAME = ""
+PROBE_TARGETS = ""
+FLEET_SECRET = ""
+FLEET_LISTEN = ""
+
+def setup_logging():
+    """Queued JSON-lines logging to LOG_FILE (and stderr), for the long-running processes."""
+    jsonlog.setup(LOG_FILE)
+
+# Read version from bdrman script once - NO FALLBACK!
+@functools.lru_cache(maxsize=None)
+def get_version():
+    try:
+        with open(BDRMAN_BIN, 'r') as f:
+            for line in f:
+                if line.startswith('VERSION='):
+                    return line.split('=')[1].strip().strip('"')
+    except Exception as e:
+        logger.error(f"Cannot read version from bdrman: {e}")
+    # If we can't read version, something is seriously wrong
+    return "UNKNOWN"
+
+def load_config():
+    global BOT_TOKEN, CHAT_ID, PIN_CODE, SERVER_NAME, PROBE_TARGETS, FLEET_SECRET, FLEET_LISTEN
+    try:
+        with open(CONFIG_FILE, 'r') as f:
+            for line in f:
+                if line.startswith("BOT_TOKEN="):
+                    BOT_TOKEN = line.split("=", 1)[1].strip().strip('"')
+                elif line.startswith("CHAT_ID="):
+                    CHAT_ID = line.split("=", 1)[1].strip().strip('"')
+                elif line.startswith("PIN_CODE="):
+                    PIN_CODE = line.split("=", 1)[1].strip().strip('"')
+                elif line.startswith("SERVER_NAME="):
+                    SERVER_NAME = line.split("=", 1)[1].strip().strip('"')
+                elif line.startswith("PROBE_TARGETS="):
+                    PROBE_TARGETS = line.split("=", 1)[1].strip().strip('"')
+                elif line.startswith("FLEET_SECRET="):
+                    FLEET_SECRET = line.split("=", 1)[1].strip().strip('"')
+                elif line.startswith("FLEET_LISTEN="):
+                    FLEET_LISTEN = line.split("=", 1)[1].strip().strip('"')
+        if not SERVER_NAME:
+            SERVER_NAME = subprocess.check_output("hostname", shell=True).decode().strip()
+    except Exception as e:
+        logger.error(f"Config error: {e}")
+        sys.exit(1)
+
+UNAUTHORIZED_REPORT_INTERVAL = 600     # seconds between ⛔ replies to the same user
+_unauthorized_reported = {}
+_report_tasks = set()
+
+async def _report_unauthorized(bot, user_id):
+    try:
+        await bot.send_message(
+            chat_id=user_id,
+            text=f"⛔ *Unauthorized Access*\nYour ID: `{user_id}`\nExpected: `{CHAT_ID}`",
+            parse_mode="Markdown",
+        )
+    except Exception as e:
+        logger.error(f"Failed to send auth warning: {e}")
+
+def check_auth(update: Update) -> bool:
+    user_id = str(update.effective_user.id)
+    if user_id != CHAT_ID:
+        logger.warning(f"Unauthorized: {user_id}")
+        record = audit_record.get()
+        if record is not None:
+            record["status"] = "denied"
+        # Reply in the background, at most once per interval per user: a flood of
+        # strangers must not hold up the event loop or the emergency lane
+        now = time.monotonic()
+        if now - _unauthorized_reported.get(user_id, -UNAUTHORIZED_REPORT_INTERVAL) >= UNAUTHORIZED_REPORT_INTERVAL:
+            if len(_unauthorized_reported) > 1000:
+                for uid, at in list(_unauthorized_reported.items()):
+                    if now - at >= UNAUTHORIZED_REPORT_INTERVAL:
+                        del _unauthorized_reported[uid]
+            _unauthorized_reported[user_id] = now
+            try:
+                task = asyncio.get_running_loop().create_task(_report_unauthorized(update.get_bot(), user_id))
+            except (RuntimeError, AttributeError):
+                pass    # no loop or no bot (fleet requests)
+            else:
+                _report_tasks.add(task)
+                task.add_done_callback(_report_tasks.discard)
+        return False
+    return True
+
+# Audit record of the command being handled (set by bdrbot.scheduler)
+audit_record = contextvars.ContextVar("audit_record", default=None)
+
+def _run(cmd, timeout):
+    """(output, exit status); -1 for timeouts and spawn errors."""
+    try:
+        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=timeout)
+        output = result.stdout if result.stdout else result.stderr
+        return (output.strip() if output else "✅ Done"), result.returncode
+    except subprocess.TimeoutExpired:
+        return "⏱️ Timeout", -1
+    except Exception as e:
+        return f"❌ Error: {str(e)}", -1
+
+def run_cmd(cmd, timeout=30):
+    return _run(cmd, timeout)[0]
+
+# Emergency commands get their own shell threads so they never queue behind
+# heavy work in the default pool (see bdrbot.scheduler)
+_emergency_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="emergency")
+emergency_lane = contextvars.ContextVar("emergency_lane", default=False)
+
+async def arun_cmd(cmd, timeout=30):
+    """run_cmd without blocking the event loop."""
+    executor = _emergency_executor if emergency_lane.get() else None
+    output, status = await asyncio.get_running_loop().run_in_executor(executor, _run, cmd, timeout)
+    record = audit_record.get()
+    if record is not None:
+        record["shell"] = record.get("shell", 0) + 1
+        if status:
+            record["exit"] = status
+    return output
+
+def get_bar(percent):
+    filled = int(percent / 10)
+    return "▓" * filled + "░" * (10 - filled)
+
+def human_bytes(n):
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if n < 1024 or unit == "TB":
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+
+def colorize_log(line):
+    if "ERROR" in line or "error" in line.lower():
+        return f"🔴 {line}"
+    elif "WARN" in line or "warning" in line.lower():
+        return f"🟡 {line}"
+    elif "INFO" in line or "info" in line.lower():
+        return f"🔵 {line}"
+    elif "DEBUG" in line:
+        return f"⚪ {line}"
+    return f"⚫ {line}"
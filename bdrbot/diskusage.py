@@ -0,0 +1,211 @@
+"""
+Parallel, incremental disk usage analyzer ("what filled the disk").
+
+Directories are walked with os.scandir across a thread pool and the
+result is persisted as a size tree. On the next scan a directory whose
+mtime did not change is not listed again: its file total and children
+are reused and only its large files are re-stat'ed (appends do not touch
+the directory mtime). A full rescan happens once FULL_RESCAN_AGE passes.
+
+Scans run as a bot job (`python3 -m bdrbot.diskusage`) so they share the
+disk-heavy concurrency limit with backups; the bot only reads the cache.
+"""
+import json
+import os
+import stat
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from bdrbot import core
+
+CACHE_FILE = os.path.join(core.STATE_DIR, "du_cache.json")
+DEFAULT_ROOT = "/"
+WORKERS = 8
+BIG_FILE = 64 * 1024 * 1024     # files re-stat'ed even when their directory is unchanged
+FULL_RESCAN_AGE = 24 * 3600
+GROWTH_DEPTH = 5                # keep previous totals this deep for growth reports
+SKIP = {"/proc", "/sys", "/dev", "/run"}
+
+def _depth(path):
+    return 0 if path == "/" else path.rstrip("/").count("/")
+
+def _join(parent, name):
+    return parent.rstrip("/") + "/" + name
+
+def _scan_dir(path, cached, device, full):
+    """List one directory, or reuse the cached listing if its mtime is unchanged.
+
+    Returns (path, [mtime_ns, files_bytes, children, big_files]).
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return path, None
+    if cached and not full and cached[0] == st.st_mtime_ns:
+        mtime, files, children, big = cached
+        # Re-stat large files: appends change their size but not the dir mtime
+        if big:
+            files -= sum(big.values())
+            for name in list(big):
+                try:
+                    big[name] = os.lstat(_join(path, name)).st_blocks * 512
+                except OSError:
+                    del big[name]
+            files += sum(big.values())
+        return path, [mtime, files, children, big]
+
+    files, children, big = 0, [], {}
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    est = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if stat.S_ISDIR(est.st_mode):
+                    child = _join(path, entry.name)
+                    if est.st_dev == device and child not in SKIP:
+                        children.append(entry.name)
+                else:
+                    size = est.st_blocks * 512
+                    files += size
+                    if size >= BIG_FILE:
+                        big[entry.name] = size
+    except OSError:
+        pass
+    return path, [st.st_mtime_ns, files, children, big]
+
+def compute_totals(dirs, root):
+    """Bottom-up totals for every directory in the tree."""
+    totals = {}
+    order, stack = [], [root]
+    while stack:
+        path = stack.pop()
+        node = dirs.get(path)
+        if node is None:
+            continue
+        order.append(path)
+        stack.extend(_join(path, c) for c in node[2])
+    for path in reversed(order):
+        node = dirs[path]
+        totals[path] = node[1] + sum(totals.get(_join(path, c), 0) for c in node[2])
+    return totals
+
+def load_cache(cache_file=CACHE_FILE):
+    try:
+        with open(cache_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def scan(root=DEFAULT_ROOT, cache_file=CACHE_FILE, workers=WORKERS, progress=None):
+    """Walk root in parallel, reusing the previous tree, and persist the result."""
+    root = os.path.abspath(root)
+    old = load_cache(cache_file) or {}
+    if old.get("root") != root:
+        old = {}
+    old_dirs = old.get("dirs", {})
+    full = time.time() - old.get("full_scan", 0) > FULL_RESCAN_AGE
+    device = os.lstat(root).st_dev
+
+    dirs, listed = {}, 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(_scan_dir, root, old_dirs.get(root), device, full)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                path, node = fut.result()
+                if node is None:
+                    continue
+                dirs[path] = node
+                listed += 1
+                for c in node[2]:
+                    child = _join(path, c)
+                    pending.add(pool.submit(_scan_dir, child, old_dirs.get(child), device, full))
+                if progress and listed % 5000 == 0:
+                    progress(listed)
+
+    totals = compute_totals(dirs, root)
+    if old_dirs:
+        prev_totals = {p: t for p, t in compute_totals(old_dirs, root).items() if _depth(p) <= _depth(root) + GROWTH_DEPTH}
+    else:
+        prev_totals = {}
+    data = {
+        "root": root,
+        "scanned": time.time(),
+        "full_scan": time.time() if full else old.get("full_scan", 0),
+        "prev_scanned": old.get("scanned"),
+        "dirs": dirs,
+        "prev_totals": prev_totals,
+    }
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    tmp = cache_file + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, cache_file)
+    return data, totals
+
+class DiskTree:
+    """Read side used by the bot: the cached tree plus derived totals."""
+
+    def __init__(self, data):
+        self.root = data["root"]
+        self.scanned = data["scanned"]
+        self.prev_scanned = data.get("prev_scanned")
+        self.dirs = data["dirs"]
+        self.prev_totals = data.get("prev_totals", {})
+        self.totals = compute_totals(self.dirs, self.root)
+
+    def covers(self, path):
+        return path in self.totals
+
+    def children(self, path, limit=15):
+        """Largest entries directly under path: subdirectories plus the files total."""
+        node = self.dirs[path]
+        rows = [(_join(path, c), self.totals.get(_join(path, c), 0)) for c in node[2]]
+        if node[1]:
+            rows.append((f"{path.rstrip('/')}/(files)", node[1]))
+        return sorted(rows, key=lambda r: r[1], reverse=True)[:limit]
+
+    def growers(self, under=None, limit=10, min_bytes=10 * 1024 * 1024):
+        """Directories that grew most since the previous scan, preferring the deepest
+        directory that explains the growth over its ancestors."""
+        under = under or self.root
+        prefix = under.rstrip("/") + "/"
+        grew = {}
+        for path, prev in self.prev_totals.items():
+            if path != under and not path.startswith(prefix):
+                continue
+            delta = self.totals.get(path, 0) - prev
+            if delta >= min_bytes:
+                grew[path] = delta
+        explained = set()
+        for path, delta in grew.items():
+            parent = os.path.dirname(path.rstrip("/")) or "/"
+            if parent in grew and delta >= grew[parent] * 0.8:
+                explained.add(parent)
+        rows = [(p, d) for p, d in grew.items() if p not in explained]
+        return sorted(rows, key=lambda r: r[1], reverse=True)[:limit]
+
+_tree = None
+_tree_mtime = None
+
+def get_tree(cache_file=CACHE_FILE):
+    """Cached DiskTree, reloaded only when a scan rewrote the cache file."""
+    global _tree, _tree_mtime
+    try:
+        mtime = os.path.getmtime(cache_file)
+    except OSError:
+        return None
+    if _tree is None or mtime != _tree_mtime:
+        data = load_cache(cache_file)
+        if not data:
+            return None
+        _tree, _tree_mtime = DiskTree(data), mtime
+    return _tree
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_ROOT
+    started = time.time()
+    _, totals = scan(target, progress=lambda n: print(f"{n} directories scanned", flush=True))
+    print(f"✅ {len(totals)} directories, {totals.get(os.path.abspath(target), 0) / 1024 ** 3:.1f} GB in {time.time() - started:.0f}s")
@@ -0,0 +1,299 @@
+"""
+Docker reclaimable-space planner.
+
+One call to the Engine's /system/df (the data behind `docker system df -v`)
+is cached and turned into cleanup items: dangling and unused images, old
+CapRover app versions, stopped containers, unused volumes and build cache.
+Each item carries the bytes it would free and a rough cost in seconds of
+disk work, and the plan is ranked by bytes freed per second. Only chosen
+items are deleted, a few at a time, through the same API.
+
+Numbers refer to the last plan shown: the bot and the bdrman CLI keep
+separate plan files, a numbered run without a recent plan is refused,
+and the chosen items are checked against a fresh /system/df before
+anything is deleted.
+
+CapRover deploys every build as img-captain--<app>:<version>. The version
+in use and the newest KEEP_VERSIONS versions per app are never planned,
+so a rollback always has its image. Unused volumes are listed but never
+part of "safe": they hold data. captain-- volumes are never listed.
+"""
+import asyncio
+import http.client
+import json
+import os
+import re
+import socket
+import sys
+import time
+from urllib.parse import quote
+from bdrbot import core
+from bdrbot.core import logger, human_bytes
+
+DOCKER_SOCK = "/var/run/docker.sock"
+DF_TTL = 600                # seconds a /system/df result is reused
+PLAN_FILE = f"{core.STATE_DIR}/dockerclean_plan.json"
+CLI_PLAN_FILE = f"{core.STATE_DIR}/dockerclean_plan_cli.json"   # `bdrman docker prune`, so the bot never renumbers it
+KEEP_VERSIONS = 3           # per CapRover app, including the deployed one
+CONCURRENCY = 3             # deletions at once; they compete for the same disk
+API_TIMEOUT = 600
+
+# Rough seconds of disk work: fixed cost per item plus per GB deleted.
+# Overlay layers are many small files, volumes can be anything.
+COST = {
+    "dangling": (0.3, 1.0),
+    "image": (0.3, 1.0),
+    "caprover": (0.3, 1.0),
+    "container": (0.2, 2.0),
+    "volume": (0.1, 4.0),
+    "buildcache": (1.0, 1.0),
+}
+GB = 1024 ** 3
+
+_CAPROVER_IMAGE = re.compile(r"img-captain--([^:/@]+):(\d+)$")
+
+class DockerError(Exception):
+    pass
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+def api(method, path, timeout=API_TIMEOUT):
+    """Docker Engine API call over the unix socket; parsed JSON or None."""
+    conn = _UnixConnection(DOCKER_SOCK, timeout)
+    try:
+        conn.request(method, path)
+        response = conn.getresponse()
+        body = response.read()
+    except OSError as e:
+        raise DockerError(f"Docker API unavailable: {e}")
+    finally:
+        conn.close()
+    data = json.loads(body) if body.strip() else None
+    if response.status >= 400:
+        raise DockerError((data or {}).get("message") or f"HTTP {response.status}")
+    return data
+
+class Item:
+    __slots__ = ("kind", "ref", "label", "bytes", "safe", "note", "containers")
+
+    def __init__(self, kind, ref, label, size, safe=True, note="", containers=()):
+        self.kind = kind
+        self.ref = ref              # image id, container id, volume name
+        self.label = label
+        self.bytes = max(int(size or 0), 0)
+        self.safe = safe
+        self.note = note
+        self.containers = list(containers)  # stopped containers removed first (image items)
+
+    @property
+    def cost(self):
+        fixed, per_gb = COST[self.kind]
+        return fixed + per_gb * self.bytes / GB
+
+    @property
+    def rate(self):
+        return self.bytes / self.cost
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["kind"], d["ref"], d["label"], d["bytes"], d["safe"], d["note"], d["containers"])
+
+_df_cache = {"at": 0.0, "data": None}
+
+def system_df(refresh=False):
+    if refresh or _df_cache["data"] is None or time.time() - _df_cache["at"] > DF_TTL:
+        _df_cache["data"] = api("GET", "/system/df")
+        _df_cache["at"] = time.time()
+    return _df_cache["data"]
+
+def _image_label(image):
+    tags = [t for t in image.get("RepoTags") or [] if t != "<none>:<none>"]
+    return tags[0] if tags else image["Id"].split(":")[-1][:12]
+
+def build_plan(df):
+    """Cleanup items from /system/df data, best bytes-per-second first."""
+    containers_by_image = {}
+    for c in df.get("Containers") or []:
+        containers_by_image.setdefault(c.get("ImageID"), []).append(c)
+
+    # CapRover versions to keep: the ones in use plus the newest KEEP_VERSIONS per app
+    versions = {}
+    for image in df.get("Images") or []:
+        for tag in image.get("RepoTags") or []:
+            m = _CAPROVER_IMAGE.search(tag)
+            if m:
+                versions.setdefault(m.group(1), []).append((int(m.group(2)), image["Id"]))
+    keep = set()
+    for app, found in versions.items():
+        found.sort(reverse=True)
+        keep.update(image_id for _, image_id in found[:KEEP_VERSIONS])
+    caprover_app = {image_id: (app, v) for app, found in versions.items() for v, image_id in found}
+
+    items = []
+    for image in df.get("Images") or []:
+        users = containers_by_image.get(image["Id"], [])
+        if any(c.get("State") == "running" for c in users):
+            continue
+        if image["Id"] in keep:
+            continue
+        stopped = [c["Id"] for c in users]
+        size = image.get("Size", 0) - max(image.get("SharedSize", 0), 0)
+        size += sum(c.get("SizeRw", 0) or 0 for c in users)
+        note = f"+{len(stopped)} stopped container(s)" if stopped else ""
+        if image["Id"] in caprover_app:
+            app, v = caprover_app[image["Id"]]
+            items.append(Item("caprover", image["Id"], f"{app} v{v}", size, note=note or "old version", containers=stopped))
+        elif not [t for t in image.get("RepoTags") or [] if t != "<none>:<none>"]:
+            items.append(Item("dangling", image["Id"], _image_label(image), size, note=note, containers=stopped))
+        else:
+            items.append(Item("image", image["Id"], _image_label(image), size, note=note or "unused", containers=stopped))
+
+    # Stopped containers whose image stays (still used by running ones, or kept)
+    planned = {c for item in items for c in item.containers}
+    for c in df.get("Containers") or []:
+        if c.get("State") in ("running", "paused", "restarting") or c["Id"] in planned:
+            continue
+        name = (c.get("Names") or ["?"])[0].lstrip("/")
+        items.append(Item("container", c["Id"], name, c.get("SizeRw", 0), note=c.get("Status", "")))
+
+    for v in df.get("Volumes") or []:
+        usage = v.get("UsageData") or {}
+        if usage.get("RefCount", 1) != 0 or v["Name"].startswith("captain--"):
+            continue
+        items.append(Item("volume", v["Name"], v["Name"][:40], usage.get("Size", 0), safe=False, note="data!"))
+
+    cache = [b for b in df.get("BuildCache") or [] if not b.get("InUse")]
+    if cache:
+        size = sum(b.get("Size", 0) for b in cache if not b.get("Shared"))
+        items.append(Item("buildcache", "", f"{len(cache)} build cache records", size))
+
+    items = [i for i in items if i.bytes > 0 or i.kind == "container"]
+    items.sort(key=lambda i: i.rate, reverse=True)
+    return items
+
+def save_plan(items, path=PLAN_FILE):
+    os.makedirs(core.STATE_DIR, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump({"at": time.time(), "items": [i.to_dict() for i in items]}, f)
+    os.replace(tmp, path)
+
+def load_plan(path=PLAN_FILE):
+    """The last plan shown (numbers in /dockerclean run refer to it), or None."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - data.get("at", 0) > DF_TTL * 3:
+        return None
+    return [Item.from_dict(d) for d in data["items"]]
+
+def make_plan(refresh=False, path=PLAN_FILE):
+    items = build_plan(system_df(refresh))
+    save_plan(items, path)
+    return items
+
+def verify(chosen):
+    """Check chosen items against the live /system/df before deleting: each must still
+    be planned with the same kind and ref (an image may be in use again, a volume mounted)."""
+    live = {(i.kind, i.ref) for i in build_plan(system_df(refresh=True))}
+    changed = [i.label for i in chosen if (i.kind, i.ref) not in live]
+    if changed:
+        raise DockerError(f"Changed since the plan was shown: {', '.join(changed[:5])}. Show the plan again")
+
+def render_plan(items, limit=30):
+    if not items:
+        return "Nothing to reclaim"
+    total = sum(i.bytes for i in items if i.safe)
+    lines = []
+    for n, item in enumerate(items[:limit], 1):
+        mark = " " if item.safe else "⚠"
+        lines.append(f"{n:>2}{mark}{item.kind:<10} {human_bytes(item.bytes):>8} {item.cost:>5.1f}s  {item.label[:28]}"
+                     + (f" ({item.note})" if item.note else ""))
+    if len(items) > limit:
+        lines.append(f"... {len(items) - limit} more")
+    lines.append(f"\nsafe total: {human_bytes(total)}")
+    return "\n".join(lines)
+
+def _delete(item):
+    for container in item.containers:
+        api("DELETE", f"/containers/{container}?v=false")
+    if item.kind in ("dangling", "image", "caprover"):
+        api("DELETE", f"/images/{item.ref}?noprune=false")
+    elif item.kind == "container":
+        api("DELETE", f"/containers/{item.ref}?v=false")
+    elif item.kind == "volume":
+        api("DELETE", f"/volumes/{quote(item.ref, safe='')}")
+    elif item.kind == "buildcache":
+        result = api("POST", "/build/prune?all=true") or {}
+        return result.get("SpaceReclaimed", item.bytes)
+    return item.bytes
+
+async def execute(items, on_done=None):
+    """Delete items concurrently; returns [(item, freed bytes or None, error)]."""
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(item):
+        async with sem:
+            try:
+                freed, error = await asyncio.to_thread(_delete, item), None
+            except DockerError as e:
+                freed, error = None, str(e)
+        logger.info(f"dockerclean {item.kind} {item.label}: {error or human_bytes(freed)}")
+        if on_done:
+            await on_done(item, freed, error)
+        return item, freed, error
+
+    results = await asyncio.gather(*(one(i) for i in items))
+    _df_cache["data"] = None
+    return results
+
+def select(items, choice):
+    """Items for "safe" or a list of plan numbers (1-based)."""
+    if choice == ["safe"]:
+        return [i for i in items if i.safe]
+    chosen = []
+    for token in choice:
+        if not token.isdigit() or not 1 <= int(token) <= len(items):
+            raise DockerError(f"No plan item {token}")
+        chosen.append(items[int(token) - 1])
+    return chosen
+
+if __name__ == "__main__":
+    # bdrman docker prune: python3 -m bdrbot.dockerclean plan | run safe|N...
+    args = sys.argv[1:] or ["plan"]
+    try:
+        if args[0] == "plan":
+            print(render_plan(make_plan(refresh=True, path=CLI_PLAN_FILE)))
+        elif args[0] == "run" and args[1:]:
+            if args[1:] == ["safe"]:
+                chosen = select(make_plan(refresh=True, path=CLI_PLAN_FILE), ["safe"])
+            else:
+                items = load_plan(CLI_PLAN_FILE)
+                if items is None:
+                    raise DockerError("No recent plan. Run `python3 -m bdrbot.dockerclean plan` first")
+                chosen = select(items, args[1:])
+                verify(chosen)
+            started = time.perf_counter()
+            results = asyncio.run(execute(chosen))
+            for item, freed, error in results:
+                print(f"{'✅' if error is None else '❌'} {item.label}: {error or human_bytes(freed)}")
+            total = sum(freed or 0 for _, freed, _ in results)
+            print(f"Freed {human_bytes(total)} in {time.perf_counter() - started:.1f}s")
+        else:
+            sys.exit("Usage: python3 -m bdrbot.dockerclean plan | run safe|N...")
+    except DockerError as e:
+        sys.exit(f"❌ {e}")
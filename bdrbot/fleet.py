@@ -0,0 +1,587 @@
+"""
+Fleet mode: one bot controlling many bdrman hosts.
+
+Each host runs an agent that executes the bot's own command handlers on
+request: the bot itself when FLEET_LISTEN is set in telegram.conf, or
+`python3 -m bdrbot.fleet agent` on hosts without a bot. The controller
+fans a command out when its arguments start with targets, e.g.
+`/status @all`, `/block @web* 1.2.3.4` or `/capapps @eu`, with per-host
+timeouts, live progress while hosts answer and one aggregated summary at
+the end.
+
+Hosts are listed in /etc/bdrman/fleet.conf, one per line:
+
+    web1   10.8.0.11:7722   web,eu   timeout=60
+
+name, address (host:port or a unix socket path), optional comma separated
+tags and an optional per-host timeout. `@x` selects hosts whose name
+matches x (shell wildcards) or that carry the tag x; `@all` selects all.
+An `@x` that matches no configured host, or that follows a plain
+argument, is an ordinary argument: `/search @user` stays local.
+
+Both sides share FLEET_SECRET. Connections authenticate both ways with an
+HMAC challenge/response and every later frame carries a MAC over a
+per-session key and sequence number, so commands can't be forged,
+replayed or altered in flight. Traffic is not encrypted: bind agents to
+localhost or a WireGuard address.
+"""
+import asyncio
+import base64
+import fnmatch
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import secrets
+import socket
+import sys
+import time
+import types
+from bdrbot import core
+from bdrbot.core import logger
+
+FLEET_FILE = "/etc/bdrman/fleet.conf"
+DEFAULT_PORT = 7722
+DEFAULT_TIMEOUT = 30.0      # per host, whole request
+CONNECT_TIMEOUT = 5.0
+CONCURRENCY = 64            # hosts contacted at once
+FRAME_LIMIT = 32 * 1024 * 1024
+MAX_FILE = 10 * 1024 * 1024 # documents/photos forwarded from agents
+PROGRESS_EVERY = 1.5        # seconds between progress message edits
+MESSAGE_LIMIT = 4000
+INLINE_LIMIT = 12000        # larger summaries go out as a text file
+
+# Conversations need several messages from the user; fleet runs one shot
+NOT_REMOTE = {"snapshot", "vpn", "fleet"}
+
+class FleetError(Exception):
+    pass
+
+# --- Protocol ---
+
+def _mac(key, *parts):
+    h = hmac.new(key, digestmod=hashlib.sha256)
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+class Channel:
+    """Newline framed JSON: `<mac> <json>`. The MAC is "-" until the handshake is done."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.key = None
+        self.role = None
+        self.sent = 0
+        self.received = 0
+        self.closed = False
+
+    async def send(self, obj):
+        if self.closed:
+            return
+        body = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+        mac = "-"
+        if self.key:
+            self.sent += 1
+            mac = _mac(self.key, self.role, self.sent, body)
+        try:
+            self.writer.write(mac.encode() + b" " + body + b"\n")
+            await self.writer.drain()
+        except (ConnectionError, RuntimeError):
+            self.closed = True
+
+    async def recv(self):
+        line = await self.reader.readline()
+        if not line:
+            raise FleetError("connection closed")
+        mac, _, body = line.rstrip(b"\n").partition(b" ")
+        if self.key:
+            self.received += 1
+            peer = "agent" if self.role == "controller" else "controller"
+            if not hmac.compare_digest(mac.decode(errors="replace"), _mac(self.key, peer, self.received, body)):
+                raise FleetError("bad frame MAC")
+        return json.loads(body)
+
+    def close(self):
+        self.closed = True
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+    async def accept(self, secret, hello):
+        """Agent side of the handshake."""
+        nonce = secrets.token_hex(16)
+        await self.send(dict(hello, nonce=nonce))
+        reply = await self.recv()
+        theirs = str(reply.get("nonce", ""))
+        if not theirs or not hmac.compare_digest(str(reply.get("proof", "")), _mac(secret, "controller", nonce, theirs)):
+            await self.send({"error": "authentication failed"})
+            raise FleetError("authentication failed")
+        await self.send({"proof": _mac(secret, "agent", nonce, theirs)})
+        self.key, self.role = bytes.fromhex(_mac(secret, "session", nonce, theirs)), "agent"
+
+    async def connect(self, secret):
+        """Controller side of the handshake; returns the agent's hello."""
+        hello = await self.recv()
+        nonce, theirs = secrets.token_hex(16), str(hello.get("nonce", ""))
+        await self.send({"nonce": nonce, "proof": _mac(secret, "controller", theirs, nonce)})
+        reply = await self.recv()
+        if not hmac.compare_digest(str(reply.get("proof", "")), _mac(secret, "agent", theirs, nonce)):
+            raise FleetError(reply.get("error") or "agent failed to authenticate")
+        self.key, self.role = bytes.fromhex(_mac(secret, "session", theirs, nonce)), "controller"
+        return hello
+
+def _split_address(address):
+    if address.startswith("/"):
+        return address, None
+    host, _, port = address.rpartition(":")
+    if not host:
+        return address, DEFAULT_PORT
+    return host.strip("[]"), int(port)
+
+async def _open(address):
+    host, port = _split_address(address)
+    if port is None:
+        return await asyncio.open_unix_connection(host, limit=FRAME_LIMIT)
+    return await asyncio.open_connection(host, port, limit=FRAME_LIMIT)
+
+# --- Agent ---
+
+class _SentMessage:
+    """What reply_text returns, so handlers can edit their message later (jobs do)."""
+
+    def __init__(self, channel, msg_id):
+        self.channel = channel
+        self.message_id = msg_id
+
+    async def edit_text(self, text, parse_mode=None, **kwargs):
+        await self.channel.send({"type": "edit", "id": self.message_id, "text": text, "markdown": parse_mode is not None})
+        return self
+
+class _AttachedFile:
+    """The document a fleet command replied to (e.g. /import), sent along with the request."""
+
+    def __init__(self, name, data):
+        self.file_name = name
+        self.file_size = len(data)
+        self._data = data
+
+    async def get_file(self):
+        return self
+
+    async def download_as_bytearray(self):
+        return bytearray(self._data)
+
+class _CapturedMessage:
+    """Stands in for the Telegram message; replies become frames to the controller."""
+
+    def __init__(self, channel, text, attachment=None):
+        self.channel = channel
+        self.text = text
+        self.reply_to_message = None
+        if attachment:
+            document = _AttachedFile(attachment.get("name"), base64.b64decode(attachment["data"]))
+            self.reply_to_message = types.SimpleNamespace(document=document)
+        self._ids = itertools.count(1)
+
+    async def reply_text(self, text, parse_mode=None, **kwargs):
+        sent = _SentMessage(self.channel, next(self._ids))
+        await self.channel.send({"type": "reply", "id": sent.message_id, "text": text, "markdown": parse_mode is not None})
+        return sent
+
+    async def _file(self, f, filename, caption, photo):
+        filename = filename or os.path.basename(getattr(f, "name", "") or "file")
+        try:
+            data = f.read(MAX_FILE + 1) if hasattr(f, "read") else bytes(f)
+        finally:
+            if hasattr(f, "close"):
+                f.close()
+        if len(data) > MAX_FILE:
+            return await self.reply_text(f"📎 {filename} is over {MAX_FILE >> 20} MB, fetch it on the host")
+        await self.channel.send({"type": "file", "name": filename, "caption": caption, "photo": photo,
+                                 "data": base64.b64encode(data).decode()})
+        return _SentMessage(self.channel, next(self._ids))
+
+    async def reply_document(self, document, filename=None, caption=None, **kwargs):
+        return await self._file(document, filename, caption, False)
+
+    async def reply_photo(self, photo, caption=None, **kwargs):
+        return await self._file(photo, None, caption, True)
+
+async def _run_command(channel, request):
+    from bdrbot import registry
+    from bdrbot.scheduler import get_scheduler
+    cmd = str(request.get("cmd", ""))
+    args = [str(a) for a in request.get("args") or []]
+    spec = next((s for c, _, _, s in registry.COMMANDS if c == cmd), None)
+    if spec is None or cmd in NOT_REMOTE:
+        return "error", f"/{cmd} is not available in fleet mode"
+
+    message = _CapturedMessage(channel, " ".join([f"/{cmd}"] + args), request.get("attachment"))
+    user = types.SimpleNamespace(id=core.CHAT_ID, username=f"fleet:{request.get('user') or 'controller'}", first_name="fleet")
+    update = types.SimpleNamespace(effective_user=user, effective_message=message, message=message,
+                                   effective_chat=types.SimpleNamespace(id=core.CHAT_ID))
+    context = types.SimpleNamespace(args=args, user_data={}, bot=None)
+    await get_scheduler().run(registry.lane_for(cmd), cmd, registry.resolve(spec), update, context)
+    return "ok", None
+
+async def _serve(reader, writer):
+    channel = Channel(reader, writer)
+    peer = writer.get_extra_info("peername") or "unix"
+    try:
+        await asyncio.wait_for(channel.accept(core.FLEET_SECRET.encode(), {"name": core.SERVER_NAME, "version": core.get_version()}),
+                               CONNECT_TIMEOUT)
+        request = await channel.recv()
+        started = time.perf_counter()
+        if request.get("op") == "ping":
+            load = os.getloadavg()[0] if hasattr(os, "getloadavg") else None
+            await channel.send({"type": "done", "status": "ok", "load": load, "uptime": _uptime()})
+            return
+        try:
+            status, error = await _run_command(channel, request)
+        except Exception as e:
+            logger.error(f"Fleet /{request.get('cmd')} failed: {e}")
+            status, error = "error", str(e)[:500]
+        await channel.send({"type": "done", "status": status, "error": error,
+                            "ms": round((time.perf_counter() - started) * 1000)})
+    except (FleetError, asyncio.TimeoutError, ValueError) as e:
+        logger.warning(f"Fleet connection from {peer} rejected: {e}")
+    finally:
+        channel.close()
+
+def _uptime():
+    try:
+        with open("/proc/uptime") as f:
+            return float(f.read().split()[0])
+    except (OSError, ValueError):
+        return None
+
+async def start_agent(listen=None):
+    """Serve fleet requests on FLEET_LISTEN (host:port or socket path)."""
+    listen = listen or core.FLEET_LISTEN
+    if not core.FLEET_SECRET:
+        raise FleetError("FLEET_SECRET is not set")
+    host, port = _split_address(listen)
+    if port is None:
+        if os.path.exists(host):
+            os.unlink(host)
+        # Bind under umask 077: a chmod after bind leaves a window where anyone can connect
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            sock.bind(host)
+            os.chmod(host, 0o600)
+        except OSError:
+            sock.close()
+            raise
+        finally:
+            os.umask(old_umask)
+        server = await asyncio.start_unix_server(_serve, sock=sock, limit=FRAME_LIMIT)
+    else:
+        server = await asyncio.start_server(_serve, host, port, limit=FRAME_LIMIT)
+    logger.info(f"Fleet agent listening on {listen}")
+    return server
+
+# --- Controller ---
+
+class Host:
+    __slots__ = ("name", "address", "tags", "timeout")
+
+    def __init__(self, name, address, tags=(), timeout=DEFAULT_TIMEOUT):
+        self.name = name
+        self.address = address
+        self.tags = set(tags)
+        self.timeout = timeout
+
+def load_hosts(path=None):
+    hosts = []
+    try:
+        with open(path or FLEET_FILE) as f:
+            for line in f:
+                fields = line.split("#", 1)[0].split()
+                if len(fields) < 2:
+                    continue
+                tags, timeout = [], DEFAULT_TIMEOUT
+                for extra in fields[2:]:
+                    if extra.startswith("timeout="):
+                        timeout = float(extra.split("=", 1)[1])
+                    else:
+                        tags += [t for t in extra.split(",") if t]
+                hosts.append(Host(fields[0], fields[1], tags, timeout))
+    except FileNotFoundError:
+        pass
+    except ValueError as e:
+        logger.error(f"Bad fleet host line: {e}")
+    return hosts
+
+def _matches(host, sel):
+    return sel == "all" or sel in host.tags or fnmatch.fnmatchcase(host.name, sel)
+
+def split_targets(args, hosts=None):
+    """(plain args, selectors): selectors are the leading `@x` arguments.
+
+    With hosts given, only `@all` and selectors matching one of them count, so
+    `/search @user` keeps its argument; without, every leading `@x` does (the
+    /fleet command and the CLI, where a typo should be an error).
+    """
+    args = list(args or ())
+    n = 0
+    while n < len(args) and len(args[n]) > 1 and args[n].startswith("@"):
+        if hosts is not None and args[n] != "@all" and not any(_matches(h, args[n][1:]) for h in hosts):
+            break
+        n += 1
+    return args[n:], [a[1:] for a in args[:n]]
+
+def select(hosts, selectors):
+    """Hosts matched by any selector, in fleet.conf order; raises on a selector matching nothing."""
+    chosen = set()
+    for sel in selectors:
+        hit = {h.name for h in hosts if _matches(h, sel)}
+        if not hit:
+            raise FleetError(f"@{sel} matches no host")
+        chosen |= hit
+    return [h for h in hosts if h.name in chosen]
+
+class HostResult:
+    __slots__ = ("host", "status", "error", "messages", "files", "ms", "info")
+
+    def __init__(self, host):
+        self.host = host
+        self.status = "pending"     # ok, error, timeout, down
+        self.error = None
+        self.messages = {}          # reply id -> (text, markdown), edits replace
+        self.files = []
+        self.ms = None
+        self.info = {}
+
+    @property
+    def text(self):
+        return "\n".join(plain_text(t) if md else t for t, md in self.messages.values()).strip()
+
+def plain_text(text):
+    """Drop Markdown markers so outputs of many hosts can be combined safely."""
+    lines = [l for l in text.splitlines() if not l.strip().startswith("```")]
+    return "\n".join(lines).replace("`", "").replace("*", "")
+
+async def call(host, request, secret=None, on_frame=None):
+    """Run one request on one agent; never raises, the outcome is in the result."""
+    result = HostResult(host)
+    started = time.perf_counter()
+    secret = (secret or core.FLEET_SECRET).encode()
+
+    async def exchange():
+        reader, writer = await asyncio.wait_for(_open(host.address), CONNECT_TIMEOUT)
+        channel = Channel(reader, writer)
+        try:
+            result.info = await channel.connect(secret)
+            await channel.send(request)
+            while True:
+                frame = await channel.recv()
+                kind = frame.get("type")
+                if kind in ("reply", "edit"):
+                    result.messages[frame.get("id")] = (str(frame.get("text", "")), bool(frame.get("markdown")))
+                elif kind == "file":
+                    result.files.append(frame)
+                elif kind == "done":
+                    result.status = frame.get("status", "ok")
+                    result.error = frame.get("error")
+                    result.info.update({k: frame[k] for k in ("load", "uptime") if k in frame})
+                    return
+                if on_frame:
+                    on_frame(result)
+        finally:
+            channel.close()
+
+    try:
+        await asyncio.wait_for(exchange(), host.timeout)
+    except asyncio.TimeoutError:
+        result.status = "timeout"
+        result.error = f"no answer in {host.timeout:g}s"
+    except (OSError, FleetError, ValueError) as e:
+        result.status = "down"
+        result.error = str(e) or type(e).__name__
+    result.ms = round((time.perf_counter() - started) * 1000)
+    return result
+
+async def fan_out(hosts, request, secret=None, on_result=None):
+    """Run a request on all hosts concurrently; on_result fires as each host finishes."""
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(host):
+        async with sem:
+            result = await call(host, request, secret)
+        if on_result:
+            await on_result(result)
+        return result
+
+    return await asyncio.gather(*(one(h) for h in hosts))
+
+ICONS = {"ok": "✅", "error": "❌", "timeout": "⏱️", "down": "🔌", "pending": "⏳"}
+
+def progress_line(results, total):
+    counts = {}
+    for r in results:
+        counts[r.status] = counts.get(r.status, 0) + 1
+    parts = [f"{ICONS[s]} {n}" for s, n in counts.items()]
+    pending = total - len(results)
+    if pending:
+        parts.append(f"⏳ {pending}")
+    return " · ".join(parts)
+
+def summarize(results):
+    """Group hosts with identical output, failures last: (headline, body)."""
+    groups = {}
+    for r in results:
+        text = r.text if r.status == "ok" else (r.error or r.status)
+        groups.setdefault((r.status, text), []).append(r)
+    order = sorted(groups.items(), key=lambda kv: (kv[0][0] != "ok", -len(kv[1])))
+    blocks = []
+    for (status, text), members in order:
+        names = ", ".join(m.host.name for m in members)
+        slowest = max(m.ms or 0 for m in members)
+        blocks.append(f"{ICONS.get(status, '❓')} {names} ({slowest} ms)\n{text or '(no output)'}")
+    ok = sum(1 for r in results if r.status == "ok")
+    times = sorted(r.ms for r in results if r.ms is not None)
+    headline = f"{ok}/{len(results)} ok"
+    if times:
+        headline += f", slowest {times[-1]} ms"
+    return headline, "\n\n".join(blocks)
+
+def chunks(text, limit=MESSAGE_LIMIT):
+    out, current = [], ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > limit:
+            out.append(current + line[:limit - len(current)])
+            line, current = line[limit - len(current):], ""
+        if len(current) + len(line) > limit:
+            out.append(current)
+            current = ""
+        current += line
+    if current.strip():
+        out.append(current)
+    return out
+
+async def dispatch(cmd, update, context):
+    """Controller side of `/cmd args @targets`."""
+    if not core.check_auth(update): return
+    if cmd in NOT_REMOTE:
+        await update.message.reply_text(f"❌ /{cmd} can't run in fleet mode")
+        return
+    if not core.FLEET_SECRET:
+        await update.message.reply_text("❌ Fleet mode needs FLEET_SECRET in telegram.conf")
+        return
+    configured = load_hosts()
+    args, selectors = split_targets(context.args, configured)
+    try:
+        hosts = select(configured, selectors)
+    except FleetError as e:
+        await update.message.reply_text(f"❌ {e}\nHosts are listed in {FLEET_FILE}, see /fleet")
+        return
+
+    title = " ".join([f"/{cmd}"] + args)
+    progress = await update.message.reply_text(f"🛰️ `{title}` → {len(hosts)} hosts", parse_mode='Markdown')
+    done, last_edit = [], [0.0]
+
+    async def on_result(result):
+        done.append(result)
+        now = time.monotonic()
+        if now - last_edit[0] < PROGRESS_EVERY and len(done) < len(hosts):
+            return
+        last_edit[0] = now
+        finished = ", ".join(f"{ICONS[r.status]}{r.host.name}" for r in done[-15:])
+        try:
+            await progress.edit_text(f"🛰️ `{title}` → {len(hosts)} hosts\n{progress_line(done, len(hosts))}\n{finished}",
+                                     parse_mode='Markdown')
+        except Exception:
+            pass    # not modified / flood control; the summary follows anyway
+
+    user = update.effective_user
+    request = {"op": "run", "cmd": cmd, "args": args, "user": user.username or user.id}
+    document = getattr(update.message.reply_to_message, "document", None)
+    if document and (document.file_size or 0) <= MAX_FILE:
+        data = await (await document.get_file()).download_as_bytearray()
+        request["attachment"] = {"name": document.file_name, "data": base64.b64encode(bytes(data)).decode()}
+    results = await fan_out(hosts, request, on_result=on_result)
+
+    headline, body = summarize(results)
+    await update.message.reply_text(f"🛰️ {title}: {headline}")
+    if len(body) > INLINE_LIMIT:
+        await update.message.reply_document(document=body.encode(), filename=f"fleet-{cmd}-{time.strftime('%Y%m%d-%H%M%S')}.txt",
+                                            caption=f"{title}: {headline}")
+    else:
+        for part in chunks(body):
+            await update.message.reply_text(part)
+    for r in results:
+        for f in r.files:
+            data, caption = base64.b64decode(f["data"]), f"{r.host.name}: {f.get('caption') or f['name']}"
+            if f.get("photo"):
+                await update.message.reply_photo(photo=data, caption=caption)
+            else:
+                await update.message.reply_document(document=data, filename=f["name"], caption=caption)
+
+async def ping(hosts, secret=None):
+    return await fan_out(hosts, {"op": "ping"}, secret)
+
+def render_ping(results):
+    lines = []
+    for r in results:
+        if r.status == "ok":
+            up = r.info.get("uptime")
+            load = r.info.get("load")
+            lines.append(f"{ICONS['ok']} {r.host.name:<14} v{r.info.get('version', '?'):<8} {r.ms:>5} ms"
+                         + (f"  load {load:.2f}" if load is not None else "")
+                         + (f"  up {up / 86400:.0f}d" if up else ""))
+        else:
+            lines.append(f"{ICONS.get(r.status, '❓')} {r.host.name:<14} {r.error}")
+    return "\n".join(lines)
+
+async def run_agent(listen=None):
+    """Standalone agent for hosts without their own bot: RPC plus the data loops handlers read."""
+    from bdrbot import probes, logindex, metrics, tlsscan
+    server = await start_agent(listen)
+    loops = [probes.get_engine().run(), logindex.get_index().run(), metrics.get_collector().run(), tlsscan.get_scanner().sweep_loop(None)]
+    async with server:
+        await asyncio.gather(server.serve_forever(), *loops)
+
+if __name__ == "__main__":
+    # python3 -m bdrbot.fleet agent [--listen ADDR] [--name NAME]
+    # python3 -m bdrbot.fleet ping [@sel...] | run @sel... <cmd> [args...]   (--hosts FILE, --config FILE)
+    argv = sys.argv[1:]
+
+    def option(flag):
+        if flag in argv:
+            i = argv.index(flag)
+            value = argv[i + 1]
+            del argv[i:i + 2]
+            return value
+        return None
+
+    core.CONFIG_FILE = option("--config") or core.CONFIG_FILE
+    hosts_file, listen, name = option("--hosts"), option("--listen"), option("--name")
+    core.load_config()
+    core.SERVER_NAME = name or core.SERVER_NAME
+    mode = argv.pop(0) if argv else "ping"
+
+    if mode == "agent":
+        core.setup_logging()
+        asyncio.run(run_agent(listen))
+    else:
+        plain, selectors = split_targets(argv)
+        try:
+            chosen = select(load_hosts(hosts_file), selectors or ["all"])
+        except FleetError as e:
+            sys.exit(f"❌ {e}")
+        if mode == "ping":
+            print(render_ping(asyncio.run(ping(chosen))))
+        elif mode == "run" and plain:
+            async def printer(result):
+                print(f"--- {ICONS.get(result.status, '?')} {result.host.name} ({result.ms} ms)\n{result.text or result.error or ''}", flush=True)
+            results = asyncio.run(fan_out(chosen, {"op": "run", "cmd": plain[0].lstrip("/"), "args": plain[1:], "user": "cli"},
+                                          on_result=printer))
+            print(summarize(results)[0])
+        else:
+            sys.exit(__doc__)
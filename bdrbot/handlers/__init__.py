@@ -0,0 +1,12 @@
+"""
+Command handler modules, imported lazily by bdrbot.registry on first use.
+
+Conversation states live here so the registry can build ConversationHandlers
+without importing the (heavier) handler modules.
+"""
+
+# PIN protected commands
+PIN_STATE = 1
+
+# VPN conversation
+VPN_MENU, VPN_ADD_NAME, VPN_SELECT_QR, VPN_SELECT_DELETE = range(4)
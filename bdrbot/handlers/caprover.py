@@ -0,0 +1,182 @@
+"""
+CapRover management commands
+"""
+import shlex
+from telegram import Update
+from telegram.ext import ContextTypes
+from bdrbot.core import check_auth, arun_cmd, human_bytes
+from bdrbot import containers, pager
+
+async def capstatus_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    
+    # Check if CapRover is installed
+    caprover_check = await arun_cmd("docker ps --filter name=captain-captain --format '{{.Status}}'")
+    if not caprover_check or "Error" in caprover_check:
+        await update.message.reply_text("❌ CapRover not found\nIs it installed?")
+        return
+    
+    # Get CapRover status
+    captain_status = await arun_cmd("docker ps --filter name=captain-captain --format '{{.Names}}|{{.Status}}'")
+    nginx_status = await arun_cmd("docker ps --filter name=captain-nginx --format '{{.Names}}|{{.Status}}'")
+    certbot_status = await arun_cmd("docker ps --filter name=captain-certbot --format '{{.Names}}|{{.Status}}'")
+    
+    # Count apps
+    apps_count = await arun_cmd("docker ps --filter name=captain-captain --format '{{.Names}}' | grep -v 'captain-captain\|captain-nginx\|captain-certbot' | wc -l")
+    
+    msg = f"🚢 *CapRover Status*\n\n"
+    
+    # Core services
+    if "Up" in captain_status:
+        msg += "✅ Captain: Running\n"
+    else:
+        msg += "❌ Captain: Down\n"
+    
+    if "Up" in nginx_status:
+        msg += "✅ Nginx: Running\n"
+    else:
+        msg += "⚠️ Nginx: Down\n"
+    
+    if "Up" in certbot_status:
+        msg += "✅ Certbot: Running\n"
+    else:
+        msg += "⚠️ Certbot: Down\n"
+    
+    msg += f"\n📦 Apps: `{apps_count.strip()}` running"
+    
+    await update.message.reply_text(msg, parse_mode='Markdown')
+
+async def capapps_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    
+    # Get all CapRover apps (containers starting with captain- but not core services)
+    apps = await arun_cmd("docker ps -a --filter name=captain- --format '{{.Names}}|{{.Status}}' | grep -v 'captain-captain\|captain-nginx\|captain-certbot\|captain-registry'")
+    
+    if not apps or apps.strip() == "":
+        await update.message.reply_text("📦 No apps deployed")
+        return
+    
+    lines = [l for l in apps.split('\n') if l.strip()]
+    rows = []
+    for line in lines:
+        parts = line.split('|')
+        if len(parts) == 2:
+            name, status = parts
+            # Remove captain- prefix for readability
+            app_name = name.replace('captain-', '')
+            icon = "🟢" if "Up" in status else "🔴"
+            rows.append(f"{icon} {app_name}")
+    
+    await pager.reply(update, f"📦 *CapRover Apps ({len(lines)})*", "\n".join(rows), filename="capapps")
+
+async def caplogs_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    
+    if not context.args:
+        await update.message.reply_text(
+            "Usage: /caplogs <app_name>\n\n"
+            "Example: /caplogs myapp\n"
+            "(Don't include 'captain-' prefix)"
+        )
+        return
+    
+    app_name = shlex.quote(context.args[0])
+    # Add captain- prefix if not present
+    if not app_name.startswith('captain-'):
+        container_name = f"captain-{app_name}"
+    else:
+        container_name = app_name
+    
+    logs = await arun_cmd(f"docker logs --tail 50 {container_name} 2>&1")
+    
+    if "Error" in logs and "No such container" in logs:
+        await update.message.reply_text(f"❌ App `{app_name}` not found")
+        return
+    
+    await pager.reply(update, f"📜 *{app_name}*", logs, filename=f"caplogs-{context.args[0]}", last=True)
+
+async def caprestart_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    
+    if not context.args:
+        await update.message.reply_text(
+            "Usage: /caprestart <app_name|all>\n\n"
+            "Examples:\n"
+            "/caprestart myapp - Restart specific app\n"
+            "/caprestart all - Restart CapRover core"
+        )
+        return
+    
+    target = shlex.quote(context.args[0])
+    
+    if target == "all":
+        await update.message.reply_text("🔄 Restarting CapRover core...")
+        await arun_cmd("docker restart captain-captain captain-nginx captain-certbot")
+        await update.message.reply_text("✅ CapRover core restarted")
+    else:
+        # Add captain- prefix if not present
+        if not target.startswith('captain-'):
+            container_name = f"captain-{target}"
+        else:
+            container_name = target
+        
+        await update.message.reply_text(f"🔄 Restarting `{target}`...")
+        result = await arun_cmd(f"docker restart {container_name}")
+        
+        if "Error" in result:
+            await update.message.reply_text(f"❌ Failed: {result}")
+        else:
+            await update.message.reply_text(f"✅ `{target}` restarted")
+
+async def capinfo_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    
+    # Get CapRover version
+    version = await arun_cmd("docker exec captain-captain cat /usr/src/app/package.json 2>/dev/null | grep '\"version\"' | head -1 | awk -F'\"' '{print $4}'")
+    
+    # Get domain from config
+    domain = await arun_cmd("docker exec captain-captain cat /captain/data/config-captain.json 2>/dev/null | grep -o '\"customDomain\":\"[^\"]*\"' | cut -d'\"' -f4")
+    
+    msg = "🚢 *CapRover Info*\n\n"
+    
+    # Version with checkmark
+    if version and version.strip() and version.strip() != "":
+        msg += f"📌 Version: ✅ `{version.strip()}`\n"
+    else:
+        msg += "📌 Version: ❌ Not found\n"
+    
+    # Domain with checkmark
+    if domain and domain.strip() and domain.strip() != "":
+        msg += f"🌐 Domain: ✅ `{domain.strip()}`\n"
+    else:
+        msg += "🌐 Domain: ❌ Not configured\n"
+    
+    # Resources (cgroup accounting, no docker stats round trip)
+    if containers.is_cgroup_v2():
+        captain = [st for st in await containers.get_collector().collect() if st.app == "captain-captain"]
+        if captain:
+            msg += f"\n📊 *Resources*\n"
+            msg += f"CPU: `{captain[0].cpu_percent:.1f}%`\n"
+            msg += f"RAM: `{human_bytes(captain[0].memory)}`\n"
+    
+    # Get app count
+    app_count = await arun_cmd("docker ps --filter name=captain- --format '{{.Names}}' | grep -v 'captain-captain\|captain-nginx\|captain-certbot\|captain-registry' | wc -l")
+    msg += f"\n📦 Total Apps: `{app_count.strip()}`"
+    
+    await update.message.reply_text(msg, parse_mode='Markdown')
+
+async def captop_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    sort = context.args[0].lower() if context.args else "cpu"
+    if sort not in containers.SORT_KEYS:
+        await update.message.reply_text("Usage: /captop [cpu|mem|io]")
+        return
+    if not containers.is_cgroup_v2():
+        await update.message.reply_text("❌ cgroup v2 not available on this host")
+        return
+    apps = [st for st in await containers.get_collector().collect() if st.app]
+    if not apps:
+        await update.message.reply_text("📦 No CapRover containers running")
+        return
+    table = containers.leaderboard(apps, sort, label=lambda st: st.app)
+    await update.message.reply_text(f"🚢 *CapRover apps by {sort}*\n```\n{table}\n```", parse_mode='Markdown')
@@ -0,0 +1,109 @@
+"""
+Docker container commands
+"""
+import asyncio
+import shlex
+import time
+from telegram import Update
+from telegram.ext import ContextTypes
+from bdrbot.core import check_auth, arun_cmd, human_bytes
+from bdrbot import containers, dockerclean, pager
+
+async def docker_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    if context.args and context.args[0].lower() == "stats":
+        await docker_stats(update, context.args[1:])
+        return
+    out = await arun_cmd("docker ps -a --format '{{.Names}}|{{.Status}}'")
+    if "Error" in out:
+        await update.message.reply_text(f"❌ {out}")
+        return
+    lines = [l for l in out.split('\n') if l]
+    msg = f"🐳 *Docker ({len(lines)})*\n\n"
+    for line in lines[:20]:
+        parts = line.split('|')
+        if len(parts) == 2:
+            name, status = parts
+            icon = "🟢" if "Up" in status else "🔴"
+            msg += f"{icon} `{name}`\n"
+    await update.message.reply_text(msg, parse_mode='Markdown')
+
+async def docker_stats(update: Update, args):
+    """/docker stats [cpu|mem|io] - leaderboard of all containers from cgroup v2"""
+    sort = args[0].lower() if args else "cpu"
+    if sort not in containers.SORT_KEYS:
+        await update.message.reply_text("Usage: /docker stats [cpu|mem|io]")
+        return
+    if not containers.is_cgroup_v2():
+        await update.message.reply_text("❌ cgroup v2 not available on this host")
+        return
+    stats = await containers.get_collector().collect()
+    if not stats:
+        await update.message.reply_text("🐳 No running containers")
+        return
+    table = containers.leaderboard(stats, sort, label=lambda st: containers.service_name(st.name))
+    await update.message.reply_text(f"🐳 *Containers by {sort} ({len(stats)})*\n```\n{table}\n```", parse_mode='Markdown')
+
+async def logs_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    if not context.args:
+        await update.message.reply_text("Usage: /logs <container>")
+        return
+    name = shlex.quote(context.args[0])
+    logs = await arun_cmd(f"docker logs --tail 50 {name} 2>&1")
+    await pager.reply(update, f"📜 *{name}*", logs, filename=f"logs-{context.args[0]}", last=True)
+
+async def restart_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    if not context.args:
+        await update.message.reply_text("Usage: /restart <container>")
+        return
+    name = shlex.quote(context.args[0])
+    await update.message.reply_text(f"🔄 Restarting `{name}`...")
+    await arun_cmd(f"docker restart {name}")
+    await update.message.reply_text("✅ Restarted")
+
+async def dockerclean_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/dockerclean [plan|refresh|run N...|run safe] - ranked reclaimable space, targeted cleanup"""
+    if not check_auth(update): return
+    args = [a.lower() for a in context.args or []] or ["plan"]
+    try:
+        if args[0] in ("plan", "refresh"):
+            items = await asyncio.to_thread(dockerclean.make_plan, args[0] == "refresh")
+            await update.message.reply_text(
+                f"🧹 *Reclaimable Docker space* (best MB/s first)\n```\n{dockerclean.render_plan(items)}\n```\n"
+                "`/dockerclean run 1 3` or `/dockerclean run safe`", parse_mode='Markdown')
+            return
+        if args[0] != "run" or not args[1:]:
+            await update.message.reply_text("Usage: /dockerclean [plan|refresh|run N...|run safe]")
+            return
+        items = await asyncio.to_thread(dockerclean.load_plan)
+        if items is None:
+            await update.message.reply_text("❌ No recent plan. Run /dockerclean first.")
+            return
+        chosen = dockerclean.select(items, args[1:])
+        await asyncio.to_thread(dockerclean.verify, chosen)
+    except dockerclean.DockerError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    if not chosen:
+        await update.message.reply_text("🧹 Nothing selected")
+        return
+
+    status = await update.message.reply_text(f"🧹 Cleaning {len(chosen)} item(s)...")
+    done = []
+    started = time.perf_counter()
+
+    async def progress(item, freed, error):
+        done.append(f"{'✅' if error is None else '❌'} {item.label}: {error or human_bytes(freed)}")
+        try:
+            await status.edit_text(f"🧹 {len(done)}/{len(chosen)}\n" + "\n".join(done[-15:]))
+        except Exception:
+            pass
+
+    results = await dockerclean.execute(chosen, progress)
+    total = sum(freed or 0 for _, freed, _ in results)
+    failed = sum(1 for _, _, error in results if error)
+    await update.message.reply_text(
+        f"{'✅' if not failed else '⚠️'} Freed *{human_bytes(total)}* in {time.perf_counter() - started:.1f}s"
+        + (f", {failed} failed" if failed else ""), parse_mode='Markdown')
@@ -0,0 +1,79 @@
+"""
+General commands: start, help, version, scheduler, audit, fleet, paging
+"""
+from telegram import Update
+from telegram.ext import ContextTypes
+import asyncio
+from bdrbot import core, audit, pager
+from bdrbot.core import check_auth, arun_cmd, get_version
+from bdrbot.registry import help_text
+from bdrbot.scheduler import get_scheduler
+
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    await update.message.reply_text(
+        f"🤖 *BDRman v{get_version()}*\n🖥️ `{core.SERVER_NAME}`\n\nUse /help for commands",
+        parse_mode='Markdown'
+    )
+
+async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    await update.message.reply_text(help_text(), parse_mode='Markdown')
+
+async def version_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    os_info = await arun_cmd("lsb_release -d | cut -f2")
+    kernel = await arun_cmd("uname -r")
+    msg = (
+        f"📦 *Version Info*\n\n"
+        f"🤖 BDRman: `v{get_version()}`\n"
+        f"🐧 OS: `{os_info}`\n"
+        f"⚙️ Kernel: `{kernel}`\n"
+        f"💻 Server: `{core.SERVER_NAME}`"
+    )
+    await update.message.reply_text(msg, parse_mode='Markdown')
+
+async def sched_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    await update.message.reply_text(get_scheduler().render_stats(), parse_mode='Markdown')
+
+async def audit_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    match = context.args[0].lstrip("/") if context.args else None
+    records = await asyncio.to_thread(audit.recent, 25, match)
+    if not records:
+        await update.message.reply_text("📜 No audit records" + (f" for `{match}`" if match else ""), parse_mode='Markdown')
+        return
+    text = audit.render(records).replace("`", "'")
+    title = f"📜 *Audit trail*" + (f" `{match}`" if match else "")
+    await update.message.reply_text(f"{title}\n```\n{text}\n```", parse_mode='Markdown')
+
+async def fleet_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    from bdrbot import fleet
+    hosts = fleet.load_hosts()
+    if not hosts:
+        await update.message.reply_text(
+            f"🛰️ No fleet hosts\n\nList agents in `{fleet.FLEET_FILE}`:\n`name  host:port  [tags]  [timeout=N]`\n"
+            "Then run any command with targets: `/status @all`, `/capapps @eu`", parse_mode='Markdown')
+        return
+    if not core.FLEET_SECRET:
+        await update.message.reply_text("❌ Fleet mode needs FLEET_SECRET in telegram.conf")
+        return
+    _, selectors = fleet.split_targets(context.args)
+    try:
+        hosts = fleet.select(hosts, selectors or ["all"])
+    except fleet.FleetError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    results = await fleet.ping(hosts)
+    await update.message.reply_text(
+        f"🛰️ *Fleet* ({fleet.progress_line(results, len(results))})\n```\n{fleet.render_ping(results)}\n```",
+        parse_mode='Markdown')
+
+async def page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Inline ◀️ / ▶️ buttons under paged output (bdrbot.pager)."""
+    if not check_auth(update):
+        await update.callback_query.answer()
+        return
+    await pager.on_callback(update)
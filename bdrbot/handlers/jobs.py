@@ -0,0 +1,38 @@
+"""
+Background job commands: /jobs, /cancel <id>
+"""
+from telegram import Update
+from telegram.ext import ContextTypes
+from bdrbot.core import check_auth
+from bdrbot.jobs import get_manager
+
+async def jobs_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    manager = get_manager()
+
+    if context.args and context.args[0].isdigit():
+        job = manager.get(int(context.args[0]))
+        if not job:
+            await update.message.reply_text(f"❌ Job #{context.args[0]} not found")
+            return
+        await update.message.reply_text(job.render(), parse_mode='Markdown')
+        return
+
+    active = manager.active()
+    recent = [j for j in manager.recent(10) if j not in active]
+    msg = "🧵 *Jobs*\n\n"
+    if active:
+        msg += "*Active*\n" + "\n".join(j.summary() for j in active) + "\n\n"
+    if recent:
+        msg += "*Recent*\n" + "\n".join(j.summary() for j in recent) + "\n\n"
+    if not active and not recent:
+        msg += "No jobs yet\n\n"
+    msg += "Details: /jobs <id>"
+    await update.message.reply_text(msg, parse_mode='Markdown')
+
+async def cancel_job_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    if not context.args or not context.args[0].lstrip('#').isdigit():
+        await update.message.reply_text("Usage: /cancel <job_id>\nSee /jobs for running jobs")
+        return
+    await update.message.reply_text(get_manager().cancel(int(context.args[0].lstrip('#'))))
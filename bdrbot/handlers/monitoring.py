@@ -0,0 +1,208 @@
+"""
+Monitoring commands: status, health, alerts, top, mem, disk, du, search, report, uptime
+"""
+import asyncio
+import os
+import shlex
+import sys
+import time
+import psutil
+from telegram import Update
+from telegram.ext import ContextTypes
+from bdrbot import core, procs, diskusage, logindex, metrics, pager, alertstore
+from bdrbot.jobs import get_manager
+from bdrbot.core import check_auth, arun_cmd, get_bar, colorize_log, get_version, logger, human_bytes
+
+async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    try:
+        await update.message.reply_text("📊 Collecting...")
+        cpu = await asyncio.to_thread(psutil.cpu_percent, interval=1)
+        mem = psutil.virtual_memory()
+        disk = psutil.disk_usage('/')
+        uptime = await arun_cmd("uptime -p")
+        load = os.getloadavg()
+        
+        msg1 = (
+            f"📊 *{core.SERVER_NAME}*\n"
+            f"⚙️ BDRman v{get_version()}\n"
+            f"━━━━━━━━━━━━━━━━━━\n\n"
+            f"⏱️ Uptime: `{uptime}`\n"
+            f"📈 Load: `{load[0]:.2f}, {load[1]:.2f}, {load[2]:.2f}`\n\n"
+            f"🖥️ CPU: {cpu}% {get_bar(cpu)}\n"
+            f"🧠 RAM: {mem.percent}% {get_bar(mem.percent)}\n"
+            f"   `{mem.used//1024//1024//1024}GB / {mem.total//1024//1024//1024}GB`\n"
+            f"💾 Disk: {disk.percent}% {get_bar(disk.percent)}\n"
+            f"   `{disk.free//1024//1024//1024}GB free`"
+        )
+        await update.message.reply_text(msg1, parse_mode='Markdown')
+        
+        logs_raw = await arun_cmd("journalctl -n 10 --no-pager -o short")
+        logs = "\n".join(colorize_log(line) for line in logs_raw.split('\n')[:10] if line.strip())
+        await pager.reply(update, "📜 *Recent Logs*", logs or "No journal entries", filename="status-logs", last=True)
+    except Exception as e:
+        logger.error(f"Status error: {e}")
+        await update.message.reply_text(f"❌ Error: {str(e)}")
+
+async def health_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    msg = f"🏥 *Health - {core.SERVER_NAME}*\n\n"
+    services = {"docker": "Docker", "nginx": "Nginx", "ssh": "SSH", "ufw": "Firewall"}
+    all_ok = True
+    for svc, name in services.items():
+        status = await arun_cmd(f"systemctl is-active {svc} 2>/dev/null || echo inactive")
+        if "active" in status:
+            msg += f"✅ {name}\n"
+        else:
+            msg += f"❌ {name}\n"
+            all_ok = False
+    
+    cpu = await asyncio.to_thread(psutil.cpu_percent, interval=1)
+    mem = psutil.virtual_memory()
+    disk = psutil.disk_usage('/')
+    msg += f"\n📊 *Resources*\n"
+    msg += f"CPU: {cpu}% {'✅' if cpu < 80 else '⚠️' if cpu < 95 else '🔴'}\n"
+    msg += f"RAM: {mem.percent}% {'✅' if mem.percent < 80 else '⚠️' if mem.percent < 95 else '🔴'}\n"
+    msg += f"Disk: {disk.percent}% {'✅' if disk.percent < 80 else '⚠️' if disk.percent < 95 else '🔴'}\n"
+    msg += f"\n{'✅ Healthy' if all_ok and cpu < 80 and mem.percent < 80 else '⚠️ Issues'}"
+    await update.message.reply_text(msg, parse_mode='Markdown')
+
+async def alerts_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/alerts [history] - the security monitor's alert state, shared through bdrbot.alertstore"""
+    if not check_auth(update): return
+    settings = await asyncio.to_thread(alertstore.load_settings)
+    if context.args and context.args[0].lower() == "history":
+        rows = await asyncio.to_thread(alertstore.history)
+        if not rows:
+            await update.message.reply_text("📜 No alert history")
+            return
+        await pager.reply(update, f"📜 *Alert history* (kept {settings['ALERT_HISTORY_DAYS']} days)",
+                          alertstore.render_history(rows), filename="alert-history")
+        return
+
+    alerts, heartbeat = await asyncio.to_thread(alertstore.read)
+    if alertstore.monitor_alive(heartbeat, settings):
+        msg = f"🚨 *Alerts* (monitor checked {alertstore.ago(time.time() - heartbeat)} ago)\n\n"
+        active = alertstore.render_active(alerts, settings)
+        if active:
+            msg += active + "\n"
+        fired = sum(1 for _, _, event, _ in await asyncio.to_thread(alertstore.history, time.time() - 86400)
+                    if event == "firing")
+        footer = f"\n📜 {fired} fired in 24h: /alerts history"
+    else:
+        # No monitor to ask: sample now against the monitor's thresholds
+        msg = "🚨 *Alerts* (⚠️ security monitor not running)\n\n"
+        cpu = await asyncio.to_thread(psutil.cpu_percent, interval=1)
+        mem = psutil.virtual_memory()
+        disk = psutil.disk_usage('/')
+        if cpu > settings["CPU_ALERT_THRESHOLD"]:
+            msg += f"🔴 High CPU: {cpu}% (> {settings['CPU_ALERT_THRESHOLD']}%)\n"
+        if mem.percent > settings["MEMORY_ALERT_THRESHOLD"]:
+            msg += f"🔴 High RAM: {mem.percent}% (> {settings['MEMORY_ALERT_THRESHOLD']}%)\n"
+        if disk.percent > settings["DISK_ALERT_THRESHOLD"]:
+            msg += f"🔴 Low Disk: {disk.percent}% (> {settings['DISK_ALERT_THRESHOLD']}%)\n"
+        footer = ""
+    failed = await arun_cmd("systemctl --failed --no-pager --no-legend | wc -l")
+    if failed.isdigit() and int(failed) > 0:
+        msg += f"🔴 {failed} failed services\n"
+    if not any(line.startswith(("🔴", "〰️")) for line in msg.split("\n")):
+        msg += "✅ No alerts\n"
+    await update.message.reply_text(msg + footer, parse_mode='Markdown')
+
+async def top_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    await _process_report(update, context, "cpu")
+
+async def mem_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    await _process_report(update, context, "mem")
+
+async def _process_report(update: Update, context: ContextTypes.DEFAULT_TYPE, by):
+    """/top and /mem: per-interval sample from /proc; `apps` groups by app/container/unit"""
+    procs_list = await procs.get_sampler().sample()
+    grouped = bool(context.args) and context.args[0].lower() in ("apps", "groups", "g")
+    table = procs.group_table(procs_list, by) if grouped else procs.top_table(procs_list, by)
+    title = "📊 *Top CPU*" if by == "cpu" else "🧠 *Top RAM*"
+    hint = "" if grouped else f"\nGrouped: /{'top' if by == 'cpu' else 'mem'} apps"
+    await update.message.reply_text(f"{title} ({len(procs_list)} procs)\n```\n{table}\n```{hint}", parse_mode='Markdown')
+
+async def disk_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    df = await arun_cmd("df -h")
+    await pager.reply(update, "💾 *Disk*", df, "Breakdown: /du [path]", filename="disk")
+
+# Cached /du answers older than this trigger a background rescan
+DU_REFRESH_AGE = 15 * 60
+
+def _start_du_scan():
+    """Queue a scan job unless one is already queued or running."""
+    manager = get_manager()
+    for job in manager.active():
+        if job.name == "du scan":
+            return job
+    pkg_parent = os.path.dirname(os.path.dirname(diskusage.__file__))
+    cmd = f"cd {shlex.quote(pkg_parent)} && nice -n 10 ionice -c3 {sys.executable} -m bdrbot.diskusage {diskusage.DEFAULT_ROOT}"
+    return manager.submit("du scan", cmd, resource="disk")
+
+async def du_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    path = os.path.normpath(context.args[0]) if context.args else diskusage.DEFAULT_ROOT
+    if not path.startswith("/"):
+        await update.message.reply_text("Usage: /du [/absolute/path]")
+        return
+
+    tree = await asyncio.to_thread(diskusage.get_tree)
+    stale = tree is None or time.time() - tree.scanned > DU_REFRESH_AGE
+    job = _start_du_scan() if stale else None
+
+    if tree is None or not tree.covers(path):
+        msg = f"🔍 No cached usage for `{path}` yet"
+        if job:
+            msg += f"\n⏳ Scanning in background (job #{job.id}), try again in a few minutes"
+        await update.message.reply_text(msg, parse_mode='Markdown')
+        return
+
+    age = int((time.time() - tree.scanned) / 60)
+    msg = f"💾 *Usage: {path}* — `{human_bytes(tree.totals[path])}`\n"
+    msg += "```\n" + "\n".join(f"{human_bytes(size):>8}  {p}" for p, size in tree.children(path)) + "\n```\n"
+    growers = tree.growers(path)
+    if growers:
+        since = int((tree.scanned - tree.prev_scanned) / 60) if tree.prev_scanned else 0
+        msg += f"📈 *Grew since previous scan* ({since}m)\n```\n"
+        msg += "\n".join(f"+{human_bytes(delta):>7}  {p}" for p, delta in growers) + "\n```\n"
+    msg += f"🕐 Scanned {age}m ago"
+    if job:
+        msg += f", refreshing (job #{job.id})"
+    await update.message.reply_text(msg, parse_mode='Markdown')
+
+async def uptime_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    uptime = await arun_cmd("uptime -p")
+    since = await arun_cmd("uptime -s")
+    await update.message.reply_text(f"⏱️ *Uptime*\n{uptime}\nSince: `{since}`", parse_mode='Markdown')
+
+async def search_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    args = list(context.args or [])
+    since = logindex.parse_since(args[-1]) if len(args) > 1 else None
+    if since:
+        args = args[:-1]
+    if not args:
+        await update.message.reply_text("Usage: /search <term> [since: 30m, 6h, 2d, 1w]")
+        return
+    term = " ".join(args)
+    matches, stats = await asyncio.to_thread(logindex.get_index().search, term, since, 25)
+    if not matches:
+        await update.message.reply_text(f"🔍 No matches for `{term}` ({stats['ms']:.0f} ms)", parse_mode='Markdown')
+        return
+    await pager.reply(update, f"🔍 *{len(matches)} newest matches:* `{pager.escape(term)}`", logindex.render(matches, width=120),
+                      f"_{stats['read']} of {stats['segments']} segments read, {stats['ms']:.0f} ms_", filename="search", last=True)
+
+async def report_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    period = context.args[0].lower() if context.args else "week"
+    if period not in metrics.PERIODS:
+        await update.message.reply_text("Usage: /report [day|week|month]")
+        return
+    report = await asyncio.to_thread(metrics.render_report, period)
+    await update.message.reply_text(report, parse_mode='Markdown')
@@ -0,0 +1,83 @@
+"""
+Network diagnostics commands
+"""
+from telegram import Update
+from telegram.ext import ContextTypes
+from bdrbot import probes, pager
+from bdrbot.core import check_auth, arun_cmd
+
+async def network_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    connections = await arun_cmd("netstat -an | grep ESTABLISHED | wc -l")
+    listening = await arun_cmd("ss -tuln | grep LISTEN | wc -l")
+    ip = await arun_cmd("hostname -I | awk '{print $1}'")
+    msg = f"🌐 *Network*\n\n🔌 Connections: `{connections}`\n👂 Ports: `{listening}`\n🌍 IP: `{ip}`"
+    await update.message.reply_text(msg, parse_mode='Markdown')
+
+async def ports_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    ports = await arun_cmd("ss -tuln | grep LISTEN || netstat -tuln | grep LISTEN 2>/dev/null")
+    await pager.reply(update, "👂 *Ports*", ports, filename="ports")
+
+# Answer /ping and /dns from probe history this recent, else measure now
+RECENT_MINUTES = 5
+
+async def ping_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    if not context.args:
+        await update.message.reply_text("Usage: /ping <host>")
+        return
+    host = context.args[0]
+    engine = probes.get_engine()
+    t = engine.get(probes.PING, host)
+    if t is None or not sum(t.hist.summary(RECENT_MINUTES)[:2]):
+        t = await engine.measure_now(probes.PING, host, count=4)
+    ok, errors, p50, p99, err = probes.summary_line(t, RECENT_MINUTES)
+    msg = f"🏓 *Ping {host}*\n\n"
+    if t.last_error:
+        msg += f"❌ Last: `{t.last_error}`\n"
+    else:
+        msg += f"Last: `{probes.fmt_ms(t.last_ms)}`" + (f" ({t.detail})" if t.detail else "") + "\n"
+    msg += f"p50 `{probes.fmt_ms(p50)}`  p99 `{probes.fmt_ms(p99)}`  loss `{err}` ({ok + errors} probes, {RECENT_MINUTES}m)"
+    await update.message.reply_text(msg, parse_mode='Markdown')
+
+async def dns_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    if not context.args:
+        await update.message.reply_text("Usage: /dns <domain>")
+        return
+    domain = context.args[0].lower().rstrip(".")
+    engine = probes.get_engine()
+    t = engine.get(probes.DNS, domain)
+    if t is None or not sum(t.hist.summary(RECENT_MINUTES)[:2]):
+        t = await engine.measure_now(probes.DNS, domain)
+    ok, errors, p50, p99, err = probes.summary_line(t, RECENT_MINUTES)
+    msg = f"🔍 *DNS: {domain}*\n\n"
+    if t.last_error:
+        msg += f"❌ `{t.last_error}`\n"
+    if t.detail:
+        msg += "```\n" + "\n".join(t.detail) + "\n```\n"
+    msg += f"Resolver `{engine.dns.server[0]}`: p50 `{probes.fmt_ms(p50)}`  p99 `{probes.fmt_ms(p99)}`  errors `{err}`"
+    await update.message.reply_text(msg, parse_mode='Markdown')
+
+async def probe_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    engine = probes.get_engine()
+    targets = list(engine.targets.values())
+    if context.args:
+        targets = [t for t in targets if context.args[0] in t.name]
+    if not targets:
+        await update.message.reply_text("📡 No probe targets" + (" match" if context.args else " yet"))
+        return
+    failing = [t for t in targets if t.last_error]
+    msg = f"📡 *Probes* ({len(targets)} targets, last hour)\n"
+    if failing:
+        msg += f"❌ Failing now: `{len(failing)}`\n"
+    msg += f"```\n{probes.render(targets)}\n```"
+    await update.message.reply_text(msg, parse_mode='Markdown')
+
+async def speedtest_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    await update.message.reply_text("🚀 Running speedtest...")
+    speed = await arun_cmd("speedtest-cli --simple 2>/dev/null || echo 'Install: apt install speedtest-cli'", timeout=60)
+    await update.message.reply_text(f"📊 *Speed Test*\n```\n{speed}\n```", parse_mode='Markdown')
@@ -0,0 +1,103 @@
+"""
+Security commands: firewall, IP blocking, panic mode, SSL, logins
+"""
+import asyncio
+import shlex
+from datetime import datetime
+from telegram import Update
+from telegram.ext import ContextTypes
+from bdrbot import tlsscan, pager
+from bdrbot.core import check_auth, arun_cmd
+
+async def ssl_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    if not context.args:
+        await update.message.reply_text("Usage: /ssl <domain[:port]>\nAll domains: /cert")
+        return
+    target = context.args[0].lower()
+    r = (await tlsscan.get_scanner().scan([target], force=True, adhoc=True))[0]
+    if r.error:
+        await update.message.reply_text(f"❌ *SSL: {target}*\n`{r.error}`", parse_mode='Markdown')
+        return
+    days = r.days_left
+    icon = "🔴" if days <= 3 else "🟡" if days <= 14 else "🟢"
+    expires = datetime.fromtimestamp(r.not_after).strftime('%Y-%m-%d %H:%M')
+    msg = f"🔒 *SSL: {target}*\n\n{icon} Expires: `{expires}` ({days:.0f} days)\n"
+    if r.self_signed:
+        msg += "⚠️ Self-signed\n"
+    await update.message.reply_text(msg, parse_mode='Markdown')
+
+async def cert_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    if context.args and context.args[0] == "certbot":
+        certs = await arun_cmd("certbot certificates 2>/dev/null || echo 'Certbot not installed'")
+        await pager.reply(update, "🔒 *SSL Certificates*", certs, filename="certbot")
+        return
+    scanner = tlsscan.get_scanner()
+    force = bool(context.args) and context.args[0] == "refresh"
+    targets = await asyncio.to_thread(tlsscan.discover)
+    if not targets:
+        await update.message.reply_text("🔒 No TLS domains found in CapRover or nginx config")
+        return
+    stale = sum(1 for t in targets if force or not scanner.fresh(t))
+    if stale:
+        await update.message.reply_text(f"🔍 Checking {stale} of {len(targets)} domains...")
+    results = await scanner.scan(targets, force=force)
+    expiring = sum(1 for r in results if r.days_left is not None and r.days_left <= tlsscan.ALERT_DAYS[0])
+    failed = sum(1 for r in results if r.error)
+    title = f"🔒 *SSL Certificates* ({len(results)} domains)\n"
+    title += f"⚠️ Expiring within {tlsscan.ALERT_DAYS[0]} days: `{expiring}`  ❌ Unreachable: `{failed}`"
+    await pager.reply(update, title, tlsscan.render(results), "`/cert refresh` rescan, `/cert certbot` certbot view", filename="cert")
+
+async def firewall_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    status = await arun_cmd("ufw status numbered")
+    await pager.reply(update, "🛡️ *Firewall*", status, filename="firewall")
+
+async def block_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    if not context.args:
+        await update.message.reply_text("Usage: /block <ip>")
+        return
+    ip = shlex.quote(context.args[0])
+    await arun_cmd(f"ufw deny from {ip}")
+    await update.message.reply_text(f"🚫 Blocked: `{ip}`", parse_mode='Markdown')
+
+async def unblock_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    if not context.args:
+        await update.message.reply_text("Usage: /unblock <ip>")
+        return
+    ip = shlex.quote(context.args[0])
+    await arun_cmd(f"ufw delete deny from {ip}")
+    await update.message.reply_text(f"✅ Unblocked: `{ip}`", parse_mode='Markdown')
+
+async def panic_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    if not context.args:
+        await update.message.reply_text("⚠️ Usage: /panic <your_ip>")
+        return
+    ip = shlex.quote(context.args[0])
+    await update.message.reply_text(f"🚨 PANIC MODE for {ip}...")
+    cmds = ["ufw --force reset", "ufw default deny incoming", "ufw default allow outgoing", f"ufw allow from {ip} to any port 22", "ufw --force enable"]
+    for cmd in cmds:
+        await arun_cmd(cmd)
+    await update.message.reply_text("✅ PANIC ACTIVE")
+
+async def unpanic_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    await update.message.reply_text("🟢 Deactivating...")
+    cmds = ["ufw --force reset", "ufw default deny incoming", "ufw default allow outgoing", "ufw allow ssh", "ufw allow 80/tcp", "ufw allow 443/tcp", "ufw --force enable"]
+    for cmd in cmds:
+        await arun_cmd(cmd)
+    await update.message.reply_text("✅ Normal mode")
+
+async def users_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    users = await arun_cmd("who")
+    await update.message.reply_text(f"👥 *Logged Users*\n```\n{users}\n```", parse_mode='Markdown')
+
+async def last_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    last = await arun_cmd("last -n 10")
+    await update.message.reply_text(f"🔑 *Last Logins*\n```\n{last}\n```", parse_mode='Markdown')
@@ -0,0 +1,285 @@
+"""
+System commands: backups, updates, services, export/import, snapshot
+"""
+import asyncio
+import os
+import shlex
+import shutil
+from datetime import datetime
+from telegram import Update
+from telegram.ext import ContextTypes, ConversationHandler
+from bdrbot import core, hostconfig, pager
+from bdrbot.core import check_auth, arun_cmd, get_version
+from bdrbot.handlers import PIN_STATE
+from bdrbot.jobs import get_manager, growing_file, gzip_size, percent_parser, tar_parser, TAR_PROGRESS_OPTS
+
+BACKUP_DIR = "/var/backups/bdrman"
+SNAPSHOT_DIR = "/var/snapshots/emergency"
+IMPORT_MAX_BYTES = 1024 * 1024
+SNAPSHOT_EXCLUDES = ["/dev/*", "/proc/*", "/sys/*", "/tmp/*", "/run/*", "/mnt/*", "/media/*",
+                     "/lost+found", "/var/snapshots/*", "/var/backups/*"]
+
+async def backup_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Manage backups: create, list, download, delete
+    """
+    if not check_auth(update): return
+    
+    if not context.args:
+        help_text = (
+            "📦 *Backup Management*\n\n"
+            "`/backup create <type>` - Create backup (full/data/config)\n"
+            "`/backup list` - List local backups\n"
+            "`/backup download <file>` - Download backup file\n"
+            "`/backup restore <file>` - Restore from local backup\n"
+            "`/backup delete <file>` - Delete local backup"
+        )
+        await update.message.reply_text(help_text, parse_mode='Markdown')
+        return
+
+    action = context.args[0].lower()
+    
+    if action == "create":
+        if len(context.args) < 2:
+            await update.message.reply_text("⚠️ Usage: `/backup create <full|data|config>`", parse_mode='Markdown')
+            return
+        b_type = context.args[1].lower()
+        if b_type not in ("full", "data", "config"):
+            await update.message.reply_text("⚠️ Usage: `/backup create <full|data|config>`", parse_mode='Markdown')
+            return
+        msg = await update.message.reply_text(f"⏳ Queueing `{b_type}` backup...", parse_mode='Markdown')
+        get_manager().submit(
+            f"backup {b_type}", f"/usr/local/bin/bdrman backup create {b_type}", resource="disk",
+            poll=growing_file(f"{BACKUP_DIR}/backup_{b_type}_*.tar.gz"), message=msg
+        )
+
+    elif action == "list":
+        res = await arun_cmd("/usr/local/bin/bdrman backup list")
+        await pager.reply(update, "📂 *Local Backups:*", res, filename="backups")
+
+    elif action == "download":
+        if len(context.args) < 2:
+            await update.message.reply_text("⚠️ Usage: `/backup download <filename>`", parse_mode='Markdown')
+            return
+        filename = shlex.quote(context.args[1])
+        filepath = f"/var/backups/bdrman/{filename}"
+        
+        # Security check: prevent path traversal
+        if ".." in filename or "/" in filename:
+             await update.message.reply_text("❌ Invalid filename", parse_mode='Markdown')
+             return
+
+        if not os.path.exists(filepath):
+            await update.message.reply_text(f"❌ File not found: `{filename}`", parse_mode='Markdown')
+            return
+
+        await update.message.reply_text(f"⏳ Sending `{filename}`...", parse_mode='Markdown')
+        try:
+            await update.message.reply_document(document=open(filepath, 'rb'), filename=filename)
+        except Exception as e:
+            await update.message.reply_text(f"❌ Failed to send file: {str(e)}", parse_mode='Markdown')
+
+    elif action == "restore":
+        if len(context.args) < 2:
+            await update.message.reply_text("⚠️ Usage: `/backup restore <filename>`", parse_mode='Markdown')
+            return
+        filename = context.args[1]
+        filepath = f"{BACKUP_DIR}/{filename}"
+
+        # Security check: prevent path traversal
+        if ".." in filename or "/" in filename:
+             await update.message.reply_text("❌ Invalid filename", parse_mode='Markdown')
+             return
+
+        if not os.path.exists(filepath):
+            await update.message.reply_text(f"❌ File not found: `{filename}`", parse_mode='Markdown')
+            return
+
+        msg = await update.message.reply_text(f"⚠️ Restoring `{filename}`...", parse_mode='Markdown')
+        get_manager().submit(
+            f"restore {filename}", f"tar -xzf {shlex.quote(filepath)} -C / {TAR_PROGRESS_OPTS}", resource="disk",
+            parser=tar_parser(gzip_size(filepath)), message=msg
+        )
+
+    elif action == "delete":
+        if len(context.args) < 2:
+            await update.message.reply_text("⚠️ Usage: `/backup delete <filename>`", parse_mode='Markdown')
+            return
+        filename = shlex.quote(context.args[1])
+        cmd = f"bash -c 'source /usr/local/lib/bdrman/backup.sh; BACKUP_DIR=/var/backups/bdrman; backup_delete_local {filename}'"
+        res = await arun_cmd(cmd)
+        await update.message.reply_text(f"🗑️ Result:\n```\n{res}\n```", parse_mode='Markdown')
+
+    else:
+        await update.message.reply_text("❌ Unknown action. Use create, list, download, restore, delete.")
+
+async def update_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    msg = await update.message.reply_text("🔄 Updating packages...")
+    get_manager().submit(
+        "apt upgrade", "export DEBIAN_FRONTEND=noninteractive; apt-get update && apt-get upgrade -y",
+        resource="disk", message=msg
+    )
+
+async def updatebdr_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    
+    if not context.args or context.args[0] != 'confirm':
+        current_version = get_version()
+        msg = (
+            f"🔄 *BDRman Update*\n\n"
+            f"📌 Current: `v{current_version}`\n"
+            f"📥 Will update to latest from GitHub\n\n"
+            f"⚠️ *Bot will restart*\n\n"
+            f"To confirm, send:\n"
+            f"`/updatebdr confirm`"
+        )
+        await update.message.reply_text(msg, parse_mode='Markdown')
+        return
+    
+    await update.message.reply_text("🔄 *Starting Update...*", parse_mode='Markdown')
+    
+    update_script = f"""#!/bin/bash
+exec > /tmp/bdrman_update.log 2>&1
+cd /tmp
+echo "Starting update process..."
+sleep 2
+systemctl stop bdrman-telegram
+curl -s https://raw.githubusercontent.com/burakdarende/bdrman/main/install.sh -o bdrman_update.sh
+echo "yes" | bash bdrman_update.sh
+systemctl daemon-reload
+systemctl restart bdrman-telegram
+"""
+    with open('/tmp/bdrman_updater.sh', 'w') as f:
+        f.write(update_script)
+    await arun_cmd("chmod +x /tmp/bdrman_updater.sh")
+    # The updater stops this service, so run it outside our cgroup when systemd is available
+    launcher = ["systemd-run", "--collect", "--quiet"] if shutil.which("systemd-run") else ["setsid"]
+    job = await get_manager().spawn_detached("updatebdr", ["/bin/bash", "/tmp/bdrman_updater.sh"],
+                                             log_file="/tmp/bdrman_update.log", launcher=launcher)
+    
+    await update.message.reply_text(f"⏳ *Update in progress...* (job #{job.id})\nLog: `/tmp/bdrman_update.log`", parse_mode='Markdown')
+
+async def export_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    try:
+        import json
+        await update.message.reply_text("📤 Exporting...")
+        state = await asyncio.to_thread(hostconfig.export_state)
+        await update.message.reply_document(
+            document=json.dumps(state, indent=2).encode(),
+            filename=f"bdrman_{core.SERVER_NAME}.json",
+            caption="📋 Config Export\nReply to it with /import to converge a host"
+        )
+    except Exception as e:
+        await update.message.reply_text(f"❌ Export failed: {str(e)}")
+
+async def import_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    replied = update.message.reply_to_message
+    document = getattr(replied, "document", None)
+    if not document:
+        await update.message.reply_text(
+            "📥 *Import*\n\nReply to an exported JSON file with:\n"
+            "`/import` - dry run, show what would change\n"
+            "`/import apply` - apply only those changes\n\n"
+            "Start with `@hosts` to converge several servers at once: `/import @web apply`", parse_mode='Markdown')
+        return
+    if (document.file_size or 0) > IMPORT_MAX_BYTES:
+        await update.message.reply_text("❌ File too large for a config export")
+        return
+    try:
+        data = await (await document.get_file()).download_as_bytearray()
+        doc = hostconfig.load(bytes(data))
+        changes = await asyncio.to_thread(hostconfig.plan, doc)
+    except hostconfig.ConfigError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+
+    plan = hostconfig.render_plan(changes)
+    source = doc.get("server") or "export"
+    if not (context.args and context.args[0] == "apply") or not hostconfig.actionable(changes):
+        hint = "\n\nApply with `/import apply`" if hostconfig.actionable(changes) else ""
+        await update.message.reply_text(f"📥 *Import plan* from `{source}`\n```\n{plan}\n```{hint}", parse_mode='Markdown')
+        return
+    try:
+        applied = await asyncio.to_thread(hostconfig.apply, doc, changes)
+    except hostconfig.ConfigError as e:
+        await update.message.reply_text(f"❌ {e}\n```\n{plan}\n```", parse_mode='Markdown')
+        return
+    await update.message.reply_text(f"✅ *Imported* {applied} change(s) from `{source}`\n```\n{plan}\n```", parse_mode='Markdown')
+
+async def services_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    failed = await arun_cmd("systemctl --failed --no-pager --no-legend")
+    key_services = ["docker", "nginx", "ssh", "ufw", "cron"]
+    running = []
+    stopped = []
+    for svc in key_services:
+        status = await arun_cmd(f"systemctl is-active {svc} 2>/dev/null || echo inactive")
+        if "active" in status:
+            running.append(svc)
+        else:
+            stopped.append(svc)
+    
+    msg = f"⚙️ *Services*\n\n✅ Running ({len(running)})\n"
+    for svc in running:
+        msg += f"  • {svc}\n"
+    if stopped:
+        msg += f"\n⚠️ Stopped ({len(stopped)})\n"
+        for svc in stopped:
+            msg += f"  • {svc}\n"
+    if failed and "0 loaded" not in failed:
+        await pager.reply(update, msg + "\n❌ Failed", failed, filename="failed-units")
+        return
+    msg += "\n✅ No failures"
+    await update.message.reply_text(msg, parse_mode='Markdown')
+
+async def running_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    running = await arun_cmd("systemctl list-units --type=service --state=running --no-pager --no-legend | awk '{print $1}'")
+    services = [svc.replace('.service', '') for svc in running.split('\n') if svc.strip()]
+    await pager.reply(update, f"✅ *Running ({len(services)})*", "\n".join(services), filename="running")
+
+async def nginx_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    status = await arun_cmd("systemctl status nginx --no-pager -l")
+    await pager.reply(update, "🌐 *Nginx*", status, filename="nginx")
+
+async def kernel_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    kernel = await arun_cmd("uname -a")
+    await update.message.reply_text(f"🐧 *Kernel*\n```\n{kernel}\n```", parse_mode='Markdown')
+
+async def reboot_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return
+    await update.message.reply_text("⚠️ Rebooting in 1 minute...")
+    await arun_cmd("shutdown -r +1")
+    await update.message.reply_text("✅ Reboot scheduled")
+
+async def pin_request(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return ConversationHandler.END
+    context.user_data['cmd'] = update.message.text.split()[0]
+    await update.message.reply_text("🔒 Enter PIN:")
+    return PIN_STATE
+
+async def pin_verify(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    pin = update.message.text.strip()
+    if pin == core.PIN_CODE:
+        cmd = context.user_data.get('cmd')
+        await update.message.reply_text("✅ PIN OK")
+        if cmd == '/snapshot':
+            msg = await update.message.reply_text("📸 Creating snapshot...")
+            excludes = " ".join(f"--exclude={shlex.quote(p)}" for p in SNAPSHOT_EXCLUDES)
+            get_manager().submit(
+                "snapshot", f"rsync -aAX --delete --info=progress2 --no-inc-recursive {excludes} / {SNAPSHOT_DIR}/",
+                resource="disk", parser=percent_parser, message=msg
+            )
+        return ConversationHandler.END
+    else:
+        await update.message.reply_text("❌ Wrong PIN")
+        return ConversationHandler.END
+
+async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text("🚫 Cancelled")
+    return ConversationHandler.END
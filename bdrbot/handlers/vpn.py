@@ -0,0 +1,156 @@
+"""
+WireGuard VPN conversation (peers are managed natively by bdrbot.wireguard)
+"""
+import asyncio
+import re
+from telegram import Update
+from telegram.ext import ContextTypes, ConversationHandler
+from bdrbot import wireguard
+from bdrbot.core import check_auth, logger
+from bdrbot.handlers import VPN_MENU, VPN_ADD_NAME, VPN_SELECT_QR, VPN_SELECT_DELETE
+
+# Clients per bulk add; each new peer holds a pipe during `wg set`
+BULK_MAX = 100
+
+def _names(text):
+    return [n for n in re.split(r"[\s,]+", text.strip()) if n]
+
+async def _send_client(update, name):
+    """Client config plus its (cached) QR code."""
+    try:
+        path = await asyncio.to_thread(wireguard.client_path, name)
+    except wireguard.WireGuardError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    if not path:
+        await update.message.reply_text(f"❌ No config file for `{name}`", parse_mode='Markdown')
+        return
+    try:
+        png = await asyncio.to_thread(wireguard.qr_png, path)
+        with open(png, 'rb') as f:
+            await update.message.reply_photo(photo=f, caption=f"📱 `{name}`", parse_mode='Markdown')
+    except wireguard.WireGuardError as e:
+        await update.message.reply_text(f"⚠️ QR: {e}")
+    with open(path, 'rb') as f:
+        await update.message.reply_document(document=f, filename=f"{name}.conf")
+
+async def _add(update, names):
+    if len(names) > BULK_MAX:
+        await update.message.reply_text(f"❌ At most {BULK_MAX} clients per command")
+        return
+    try:
+        created = await asyncio.to_thread(wireguard.add_peers, names)
+    except wireguard.WireGuardError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    except OSError as e:
+        logger.error(f"VPN add failed: {e}")
+        await update.message.reply_text(f"❌ {e}")
+        return
+    await update.message.reply_text(f"✅ Created {len(created)} client(s): `{' '.join(n for n, _ in created)}`", parse_mode='Markdown')
+    for name, _ in created:
+        await _send_client(update, name)
+
+async def _list(update):
+    try:
+        rows = await asyncio.to_thread(wireguard.clients)
+    except wireguard.WireGuardError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return None
+    online = sum(1 for _, _, peer in rows if peer and peer.online)
+    await update.message.reply_text(
+        f"👥 *VPN Clients* ({online}/{len(rows)} online)\n```\n{wireguard.render(rows)}\n```", parse_mode='Markdown')
+    return rows
+
+async def vpn_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not check_auth(update): return ConversationHandler.END
+
+    # Quick commands: /vpn list | add a b c | qr <name> | del <name> | <name>
+    if context.args:
+        action, rest = context.args[0].lower(), context.args[1:]
+        if action == "list":
+            await _list(update)
+        elif action == "add" and rest:
+            await _add(update, _names(" ".join(rest)))
+        elif action == "qr" and rest:
+            await _send_client(update, rest[0])
+        elif action in ("del", "delete", "remove") and rest:
+            await _remove(update, rest[0])
+        else:
+            # Backward compatibility: /vpn <username>
+            await _add(update, _names(" ".join(context.args)))
+        return ConversationHandler.END
+
+    msg = (
+        "🔐 *VPN Management*\n\n"
+        "1️⃣ List Clients\n"
+        "2️⃣ Add New Client(s)\n"
+        "3️⃣ Get QR Code\n"
+        "4️⃣ Delete Client\n"
+        "0️⃣ Cancel\n\n"
+        "Reply with choice number:"
+    )
+    await update.message.reply_text(msg, parse_mode='Markdown')
+    return VPN_MENU
+
+async def vpn_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    choice = update.message.text.strip()
+
+    if choice == "1":
+        await _list(update)
+        return ConversationHandler.END
+
+    elif choice == "2":
+        await update.message.reply_text("👤 Enter client name(s), space separated (letters, digits, _ and -):")
+        return VPN_ADD_NAME
+
+    elif choice in ("3", "4"):
+        rows = await _list(update)
+        if not rows:
+            return ConversationHandler.END
+        if choice == "3":
+            await update.message.reply_text("📱 Reply with client name for the QR code:")
+            return VPN_SELECT_QR
+        await update.message.reply_text("🗑️ Reply with client name to DELETE:")
+        return VPN_SELECT_DELETE
+
+    elif choice == "0":
+        await update.message.reply_text("🚫 Cancelled.")
+        return ConversationHandler.END
+
+    else:
+        await update.message.reply_text("❌ Invalid choice. Reply 1-4 or 0.")
+        return VPN_MENU
+
+async def vpn_add_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    names = _names(update.message.text)
+    bad = [n for n in names if not wireguard.NAME_RE.match(n)]
+    if not names or bad:
+        await update.message.reply_text("❌ Invalid name. Letters, digits, _ and - (max 15). Try again or /cancel.")
+        return VPN_ADD_NAME
+    await _add(update, names)
+    return ConversationHandler.END
+
+async def vpn_qr_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    name = update.message.text.strip()
+    if not wireguard.NAME_RE.match(name):
+        await update.message.reply_text("❌ Invalid name format.")
+        return ConversationHandler.END
+    await _send_client(update, name)
+    return ConversationHandler.END
+
+async def _remove(update, name):
+    try:
+        await asyncio.to_thread(wireguard.remove_peer, name)
+    except wireguard.WireGuardError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    await update.message.reply_text(f"🗑️ Deleted `{name}` (disconnected now)", parse_mode='Markdown')
+
+async def vpn_delete_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    name = update.message.text.strip()
+    if not wireguard.NAME_RE.match(name):
+        await update.message.reply_text("❌ Invalid name format.")
+        return ConversationHandler.END
+    await _remove(update, name)
+    return ConversationHandler.END
@@ -0,0 +1,389 @@
+"""
+Structured host configuration: export, diff and idempotent import.
+
+The export is a JSON document describing desired state: ufw enabled,
+default policies and rules, blocked IPs, which of the managed services
+are enabled, and bdrman settings (config.conf, non-secret telegram.conf
+keys). Importing reads the current state the same way, plans the minimal
+set of changes and applies them as one batch: a single shell script with
+`set -e`, settings files rewritten atomically afterwards, and a rollback
+of firewall files and of the service steps that ran if any step fails.
+Re-running an import that already converged plans nothing.
+
+Settings are only set, never removed, so host-local keys survive, and
+services outside MANAGED_SERVICES are never touched. bdrman's own units
+(bdrman-telegram, bdrman-agent) are left out: they decide whether a host
+is a controller or an agent, which is per-host like SERVER_NAME.
+"""
+import ipaddress
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from bdrbot import core
+from bdrbot.core import logger
+
+FORMAT = "bdrman-config"
+VERSION = 1
+
+MANAGED_SERVICES = ("docker", "nginx", "ufw", "cron", "fail2ban", "wg-quick@wg0")
+SETTINGS_FILES = {"config": "/etc/bdrman/config.conf", "telegram": core.CONFIG_FILE}
+# Never exported: credentials and per-host identity
+PRIVATE_KEYS = {"BOT_TOKEN", "CHAT_ID", "PIN_CODE", "FLEET_SECRET", "SERVER_NAME", "FLEET_LISTEN"}
+# Restored on rollback; the rules files are what `ufw reload` loads
+UFW_FILES = ("/etc/ufw/user.rules", "/etc/ufw/user6.rules", "/etc/ufw/ufw.conf", "/etc/default/ufw")
+
+RULE_ACTIONS = {"allow", "deny", "reject", "limit", "route"}
+POLICIES = {"allow", "deny", "reject"}
+DIRECTIONS = {"incoming", "outgoing", "routed"}
+KEY_RE = re.compile(r"^[A-Z_][A-Z0-9_]*$")
+UNSAFE_VALUE = re.compile(r'["$`\\\n]')     # values are written into files bash sources
+BLOCK_RE = re.compile(r"^deny from (\S+)$")
+STEP_MARK = "@@bdrman-step"     # echoed by the apply script before each command
+
+class ConfigError(Exception):
+    pass
+
+def _sh(cmd, timeout=30):
+    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=timeout)
+    return result.returncode, result.stdout
+
+# --- Reading state ---
+
+def read_firewall():
+    """ufw state, or None when ufw is not installed."""
+    if not shutil.which("ufw"):
+        return None
+    _, status = _sh("ufw status verbose")
+    _, added = _sh("ufw show added")
+    defaults = {}
+    m = re.search(r"^Default:\s*(.+)$", status, re.M)
+    if m:
+        for policy, direction in re.findall(r"(\w+) \((\w+)\)", m.group(1)):
+            if policy in POLICIES:
+                defaults[direction] = policy
+    rules, blocked = [], []
+    for line in added.splitlines():
+        if not line.startswith("ufw "):
+            continue
+        rule = normalize_rule(line[4:])
+        b = BLOCK_RE.match(rule)
+        try:
+            blocked.append(_ip(b.group(1)))
+        except (AttributeError, ConfigError):
+            rules.append(rule)      # not a plain "deny from <ip>"
+    return {"enabled": bool(re.search(r"^Status: active", status, re.M)), "defaults": defaults,
+            "rules": rules, "blocked_ips": blocked}
+
+def read_services():
+    """{service: enabled} for managed services that exist on this host."""
+    _, out = _sh("systemctl list-unit-files --type=service --no-legend --no-pager")
+    states = {}
+    for line in out.splitlines():
+        fields = line.split()
+        if len(fields) >= 2 and fields[0].endswith(".service"):
+            states[fields[0][:-len(".service")]] = fields[1]
+    # wg-quick@wg0 is an instance; its template is what list-unit-files shows
+    _, wg = _sh("systemctl is-enabled wg-quick@wg0 2>/dev/null")
+    if wg.strip():
+        states["wg-quick@wg0"] = wg.strip()
+    return {s: states[s] == "enabled" for s in MANAGED_SERVICES if s in states}
+
+def read_settings(path):
+    settings = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                key, sep, value = line.strip().partition("=")
+                if sep and KEY_RE.match(key):
+                    settings[key] = value.strip().strip('"').strip("'")
+    except FileNotFoundError:
+        pass
+    return settings
+
+def export_state():
+    settings = {}
+    for name, path in SETTINGS_FILES.items():
+        values = {k: v for k, v in read_settings(path).items() if k not in PRIVATE_KEYS}
+        if values:
+            settings[name] = values
+    return {
+        "format": FORMAT,
+        "version": VERSION,
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+        "server": core.SERVER_NAME,
+        "bdrman_version": core.get_version(),
+        "firewall": read_firewall(),
+        "services": read_services(),
+        "settings": settings,
+    }
+
+# --- Validation ---
+
+def normalize_rule(rule):
+    """Canonical form of a ufw rule (quoting and spacing), rejecting anything that isn't a rule."""
+    if not isinstance(rule, str):
+        raise ConfigError(f"Bad firewall rule {rule!r}")
+    try:
+        words = shlex.split(rule)
+    except ValueError as e:
+        raise ConfigError(f"Bad firewall rule {rule!r}: {e}")
+    if not words or words[0] not in RULE_ACTIONS:
+        raise ConfigError(f"Bad firewall rule {rule!r}")
+    return shlex.join(words)
+
+def _ip(value):
+    if not isinstance(value, str):
+        raise ConfigError(f"Bad IP in blocked_ips: {value!r}")
+    try:
+        return str(ipaddress.ip_network(value, strict=False)) if "/" in value else str(ipaddress.ip_address(value))
+    except ValueError:
+        raise ConfigError(f"Bad IP in blocked_ips: {value!r}")
+
+def _expect(value, kind, what):
+    """value if it has the JSON type the format needs (None allowed), else ConfigError."""
+    if value is not None and (not isinstance(value, kind) or isinstance(value, bool) and kind is not bool):
+        raise ConfigError(f"Bad {what}: expected {kind.__name__}, got {type(value).__name__}")
+    return value
+
+def validate(doc):
+    if not isinstance(doc, dict) or doc.get("format") != FORMAT:
+        raise ConfigError("Not a bdrman config export")
+    version = _expect(doc.get("version"), int, "version") or 0
+    if version > VERSION:
+        raise ConfigError(f"Export format v{version} is newer than this bdrman (v{VERSION})")
+    fw = _expect(doc.get("firewall"), dict, "firewall")
+    if fw:
+        _expect(fw.get("enabled"), bool, "firewall.enabled")
+        for direction, policy in (_expect(fw.get("defaults"), dict, "firewall.defaults") or {}).items():
+            if direction not in DIRECTIONS or policy not in POLICIES:
+                raise ConfigError(f"Bad default policy {policy} ({direction})")
+        rules, blocked = [], [_ip(ip) for ip in _expect(fw.get("blocked_ips"), list, "firewall.blocked_ips") or []]
+        for rule in map(normalize_rule, _expect(fw.get("rules"), list, "firewall.rules") or []):
+            b = BLOCK_RE.match(rule)
+            if b:
+                blocked.append(_ip(b.group(1)))
+            else:
+                rules.append(rule)
+        fw["rules"], fw["blocked_ips"] = rules, list(dict.fromkeys(blocked))
+    for service, enabled in (_expect(doc.get("services"), dict, "services") or {}).items():
+        if service not in MANAGED_SERVICES:
+            raise ConfigError(f"Unmanaged service {service!r}")
+        if not isinstance(enabled, bool):
+            raise ConfigError(f"Bad services.{service}: expected true or false")
+    for name, values in (_expect(doc.get("settings"), dict, "settings") or {}).items():
+        if name not in SETTINGS_FILES:
+            raise ConfigError(f"Unknown settings file {name!r}")
+        for key, value in (_expect(values, dict, f"settings.{name}") or {}).items():
+            if isinstance(value, (dict, list)) or value is None:
+                raise ConfigError(f"Bad setting {key}: expected a string or number")
+            if not KEY_RE.match(key) or key in PRIVATE_KEYS or UNSAFE_VALUE.search(str(value)):
+                raise ConfigError(f"Bad setting {key}")
+    return doc
+
+# --- Planning ---
+
+class Change:
+    __slots__ = ("section", "symbol", "text", "cmd", "undo")
+
+    def __init__(self, section, symbol, text, cmd=None, undo=None):
+        self.section = section
+        self.symbol = symbol    # + add, - remove, ~ change
+        self.text = text
+        self.cmd = cmd          # shell command, None for settings edits
+        self.undo = undo        # shell command restoring the old state (services)
+
+def plan(doc, current=None):
+    """Changes needed to turn the current state into the document's."""
+    current = current or {"firewall": read_firewall(), "services": read_services(),
+                          "settings": {n: read_settings(p) for n, p in SETTINGS_FILES.items()}}
+    changes = []
+
+    want_fw, have_fw = doc.get("firewall"), current.get("firewall")
+    if want_fw and have_fw is None:
+        changes.append(Change("firewall", "!", "ufw is not installed, firewall skipped"))
+    elif want_fw:
+        have_rules = set(have_fw["rules"])
+        have_blocked = set(have_fw["blocked_ips"])
+        # Additions before deletions, so a replaced allow rule never leaves a gap
+        for rule in want_fw["rules"]:
+            if rule not in have_rules:
+                changes.append(Change("firewall", "+", rule, f"ufw {rule}"))
+        for ip in want_fw["blocked_ips"]:
+            if ip not in have_blocked:
+                changes.append(Change("blocked", "+", ip, f"ufw deny from {shlex.quote(ip)}"))
+        wanted_rules = set(want_fw["rules"])
+        for rule in have_fw["rules"]:
+            if rule not in wanted_rules:
+                changes.append(Change("firewall", "-", rule, f"ufw delete {rule}"))
+        wanted_blocked = set(want_fw["blocked_ips"])
+        for ip in have_fw["blocked_ips"]:
+            if ip not in wanted_blocked:
+                changes.append(Change("blocked", "-", ip, f"ufw delete deny from {shlex.quote(ip)}"))
+        for direction, policy in (want_fw.get("defaults") or {}).items():
+            if have_fw["defaults"].get(direction) != policy:
+                changes.append(Change("firewall", "~", f"default {policy} {direction}", f"ufw default {policy} {direction}"))
+        if want_fw.get("enabled") is not None and want_fw["enabled"] != have_fw["enabled"]:
+            changes.append(Change("firewall", "~", "enable" if want_fw["enabled"] else "disable",
+                                  "ufw --force enable" if want_fw["enabled"] else "ufw disable"))
+
+    have_services = current.get("services") or {}
+    for service, enabled in (doc.get("services") or {}).items():
+        if service not in have_services:
+            if enabled:
+                changes.append(Change("services", "!", f"{service} not installed"))
+            continue
+        if have_services[service] != enabled:
+            on, off = f"systemctl enable --now {service}", f"systemctl disable --now {service}"
+            changes.append(Change("services", "~", f"{'enable' if enabled else 'disable'} {service}",
+                                  on if enabled else off, off if enabled else on))
+
+    have_settings = current.get("settings") or {}
+    for name, values in (doc.get("settings") or {}).items():
+        have = have_settings.get(name, {})
+        for key, value in values.items():
+            if have.get(key) != str(value):
+                symbol = "~" if key in have else "+"
+                changes.append(Change(f"settings:{name}", symbol, f"{key}={value}"))
+    return changes
+
+def actionable(changes):
+    """Changes that do something ("!" entries are warnings)."""
+    return [c for c in changes if c.symbol != "!"]
+
+def render_plan(changes):
+    lines = [f"{c.symbol} {c.section:<16} {c.text}" for c in changes]
+    todo = len(actionable(changes))
+    lines.append(f"{todo} change(s)" if todo else "✅ Already in sync, nothing to do")
+    return "\n".join(lines)
+
+# --- Applying ---
+
+def _write_settings(path, updates):
+    """Set KEY="value" lines in place (or append them); atomic rewrite, mode kept."""
+    try:
+        with open(path) as f:
+            lines = f.readlines()
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        lines, mode = [], 0o600
+    pending = dict(updates)
+    for i, line in enumerate(lines):
+        key = line.split("=", 1)[0].strip()
+        if "=" in line and key in pending:
+            lines[i] = f'{key}="{pending.pop(key)}"\n'
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+    lines += [f'{k}="{v}"\n' for k, v in pending.items()]
+    tmp = f"{path}.tmp{os.getpid()}"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    with os.fdopen(fd, "w") as f:
+        f.writelines(lines)
+    os.replace(tmp, path)
+
+def _steps_started(output):
+    """How many commands the apply script reached, from its STEP_MARK lines."""
+    if isinstance(output, bytes):
+        output = output.decode(errors="replace")
+    return sum(line == STEP_MARK for line in (output or "").splitlines())
+
+def apply(doc, changes):
+    """Apply a plan as one batch; on failure restore firewall files and the services it touched and re-raise."""
+    commands = [c for c in changes if c.cmd]
+    settings = {}
+    for c in changes:
+        if c.section.startswith("settings:"):
+            name = c.section.split(":", 1)[1]
+            key = c.text.split("=", 1)[0]
+            settings.setdefault(name, {})[key] = str(doc["settings"][name][key])
+    if not commands and not settings:
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="bdrman-import-") as snapshot:
+        saved = []
+        for path in UFW_FILES + tuple(SETTINGS_FILES.values()):
+            if os.path.exists(path):
+                shutil.copy2(path, os.path.join(snapshot, path.strip("/").replace("/", "__")))
+                saved.append(path)
+        started = 0
+        try:
+            if commands:
+                # A marker before each step: with set -e the script stops at the first failure,
+                # and only the steps it reached (the failed one included) need undoing
+                script = "set -e\n" + "".join(f"echo {STEP_MARK}\n{c.cmd}\n" for c in commands)
+                try:
+                    result = subprocess.run(["bash", "-c", script], capture_output=True, text=True,
+                                            timeout=60 + 5 * len(commands))
+                except subprocess.TimeoutExpired as e:
+                    started = _steps_started(e.stdout)
+                    raise ConfigError(f"apply timed out at step {started} of {len(commands)}")
+                started = _steps_started(result.stdout)
+                if result.returncode != 0:
+                    output = [line for line in (result.stderr or result.stdout).strip().splitlines() if line != STEP_MARK]
+                    raise ConfigError(output[-1] if output else "apply failed")
+            for name, updates in settings.items():
+                _write_settings(SETTINGS_FILES[name], updates)
+        except Exception as e:
+            logger.error(f"Config import failed, rolling back: {e}")
+            for path in saved:
+                shutil.copy2(os.path.join(snapshot, path.strip("/").replace("/", "__")), path)
+            ran = commands[:started]
+            undo = [c.undo for c in reversed(ran) if c.undo]
+            if shutil.which("ufw") and any(c.section in ("firewall", "blocked") for c in ran):
+                undo.append("ufw reload")
+            failed = []
+            for cmd in undo:
+                try:
+                    result = subprocess.run(["bash", "-c", cmd], capture_output=True, text=True, timeout=60)
+                except subprocess.TimeoutExpired:
+                    failed.append(f"{cmd} (timed out)")
+                    continue
+                if result.returncode != 0:
+                    output = (result.stderr or result.stdout).strip().splitlines()
+                    failed.append(f"{cmd} ({output[-1] if output else f'exit {result.returncode}'})")
+            if failed:
+                logger.error(f"Config import rollback incomplete: {'; '.join(failed)}")
+                raise ConfigError(f"Import failed: {e}. Rollback incomplete, these undo steps failed: {'; '.join(failed)}")
+            raise ConfigError(f"Import rolled back: {e}")
+    if settings:
+        core.load_config()
+    logger.info(f"Config import applied {len(commands)} command(s), {sum(map(len, settings.values()))} setting(s)")
+    return len(commands) + sum(map(len, settings.values()))
+
+def load(data):
+    try:
+        return validate(json.loads(data))
+    except ValueError as e:
+        raise ConfigError(f"Invalid JSON: {e}")
+
+if __name__ == "__main__":
+    # bdrman config: python3 -m bdrbot.hostconfig export [file] | import <file> [--apply]
+    core.load_config()
+    args = sys.argv[1:]
+    try:
+        if args[:1] == ["export"]:
+            text = json.dumps(export_state(), indent=2)
+            if len(args) > 1:
+                with open(args[1], "w") as f:
+                    f.write(text + "\n")
+                print(f"✅ Exported to {args[1]}")
+            else:
+                print(text)
+        elif args[:1] == ["import"] and len(args) > 1:
+            with open(args[1]) as f:
+                doc = load(f.read())
+            changes = plan(doc)
+            print(render_plan(changes))
+            if "--apply" in args and actionable(changes):
+                print(f"✅ Applied {apply(doc, changes)} change(s)")
+            elif actionable(changes):
+                print("Dry run. Re-run with --apply to make these changes.")
+        else:
+            sys.exit("Usage: python3 -m bdrbot.hostconfig export [file] | import <file> [--apply]")
+    except (ConfigError, OSError) as e:
+        sys.exit(f"❌ {e}")
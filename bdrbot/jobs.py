@@ -0,0 +1,428 @@
+"""
+Tracked background jobs for long-running operations.
+
+Jobs run as subprocesses in their own process group, are limited per
+resource class (disk-heavy work runs one at a time) and report progress
+by editing a single Telegram message. History is kept in STATE_DIR so
+/jobs still shows what happened after the bot restarts.
+"""
+import asyncio
+import glob
+import json
+import os
+import re
+import signal
+import time
+from collections import deque
+from bdrbot import core
+from bdrbot.core import logger, human_bytes
+
+JOBS_FILE = os.path.join(core.STATE_DIR, "jobs.json")
+HISTORY_SIZE = 50
+RESOURCE_LIMITS = {"disk": 1, "light": 2}
+EDIT_INTERVAL = 3  # seconds between live message edits
+OUTPUT_TAIL = 15
+
+# tar checkpoints: echo the record count (10 KiB records) every TAR_CHECKPOINT records
+TAR_CHECKPOINT = 1000
+TAR_RECORD_SIZE = 10240
+TAR_PROGRESS_OPTS = f"--checkpoint={TAR_CHECKPOINT} --checkpoint-action=echo=#%u"
+
+STATUS_ICONS = {
+    "queued": "⏳", "running": "🔄", "detached": "🚀", "done": "✅",
+    "failed": "❌", "cancelled": "🚫", "interrupted": "⚠️",
+}
+FINISHED = ("done", "failed", "cancelled", "interrupted")
+
+# Wraps detached commands: "pid N" while running, "exit N" when done ($0 is the status file)
+DETACHED_WRAPPER = 'echo "pid $$" > "$0"; "$@"; echo "exit $?" > "$0"'
+DETACHED_GRACE = 60     # seconds a launcher may take before the wrapper writes its status
+
+_PERCENT_RE = re.compile(r"(\d{1,3}(?:\.\d+)?)%")
+_TAR_CHECKPOINT_RE = re.compile(r"#(\d+)\s*$")
+
+def human_duration(seconds):
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+
+# === PROGRESS PARSERS ===
+# A parser takes one output line and returns (percent or None, detail or None).
+
+def percent_parser(line):
+    """rsync --info=progress2, apt and anything else that prints NN%."""
+    m = _PERCENT_RE.search(line)
+    if m:
+        return min(float(m.group(1)), 100.0), line.strip()[:80]
+    return None, None
+
+def tar_parser(total_bytes=None):
+    """Parse tar checkpoint lines (see TAR_PROGRESS_OPTS) into bytes processed."""
+    def parse(line):
+        m = _TAR_CHECKPOINT_RE.search(line)
+        if not m:
+            return None, None
+        done = int(m.group(1)) * TAR_RECORD_SIZE
+        if total_bytes:
+            return min(done * 100.0 / total_bytes, 99.9), f"{human_bytes(done)} / {human_bytes(total_bytes)}"
+        return None, f"{human_bytes(done)} processed"
+    return parse
+
+def growing_file(pattern):
+    """Poll helper: report the size of the newest file matching a glob (e.g. an archive being written)."""
+    def poll(job):
+        files = [f for f in glob.glob(pattern) if os.path.getmtime(f) >= (job.started or 0) - 1]
+        if not files:
+            return None, None
+        newest = max(files, key=os.path.getmtime)
+        return None, f"{os.path.basename(newest)}: {human_bytes(os.path.getsize(newest))} written"
+    return poll
+
+def gzip_size(path):
+    """Uncompressed size from the gzip trailer (only exact below 4 GiB)."""
+    try:
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            f.seek(-4, os.SEEK_END)
+            isize = int.from_bytes(f.read(4), 'little')
+        # ISIZE is mod 2^32; a value far below the compressed size means it wrapped
+        return isize if isize >= size // 2 else None
+    except Exception:
+        return None
+
+# === JOBS ===
+
+class Job:
+    def __init__(self, job_id, name, cmd, resource="light", parser=None, poll=None, log_file=None):
+        self.id = job_id
+        self.name = name
+        self.cmd = cmd
+        self.resource = resource
+        self.parser = parser
+        self.poll = poll
+        self.log_file = log_file
+        self.status = "queued"
+        self.percent = None
+        self.detail = ""
+        self.returncode = None
+        self.pid = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.output = deque(maxlen=OUTPUT_TAIL)
+        self.message = None
+        self.proc = None
+        self.cancel_requested = False
+
+    @property
+    def elapsed(self):
+        if not self.started:
+            return 0
+        return (self.finished or time.time()) - self.started
+
+    def summary(self):
+        line = f"{STATUS_ICONS.get(self.status, '•')} `#{self.id}` {self.name} — {self.status}"
+        if self.status == "running":
+            if self.percent is not None:
+                line += f" {self.percent:.0f}%"
+            line += f" ({human_duration(self.elapsed)})"
+        elif self.finished and self.started:
+            line += f" in {human_duration(self.elapsed)}"
+        return line
+
+    def render(self):
+        msg = f"{STATUS_ICONS.get(self.status, '•')} *Job #{self.id}: {self.name}*\n\n"
+        msg += f"Status: `{self.status}`\n"
+        if self.started:
+            msg += f"Elapsed: `{human_duration(self.elapsed)}`\n"
+        if self.percent is not None and self.status == "running":
+            msg += f"{core.get_bar(self.percent)} {self.percent:.0f}%\n"
+        if self.detail:
+            msg += f"`{self.detail}`\n"
+        if self.status in FINISHED and self.output:
+            tail = "\n".join(self.output)[-1500:]
+            msg += f"\n```\n{tail}\n```"
+        if self.status in ("queued", "running"):
+            msg += f"\nCancel: /cancel {self.id}"
+        return msg
+
+    def to_dict(self):
+        return {
+            "id": self.id, "name": self.name, "cmd": self.cmd, "resource": self.resource,
+            "status": self.status, "percent": self.percent, "detail": self.detail,
+            "returncode": self.returncode, "pid": self.pid, "log_file": self.log_file,
+            "created": self.created, "started": self.started, "finished": self.finished,
+            "output": list(self.output),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        job = cls(d["id"], d["name"], d["cmd"], d.get("resource", "light"), log_file=d.get("log_file"))
+        for key in ("status", "percent", "detail", "returncode", "pid", "created", "started", "finished"):
+            setattr(job, key, d.get(key))
+        job.output.extend(d.get("output", []))
+        return job
+
+class JobManager:
+    def __init__(self, jobs_file=JOBS_FILE):
+        self.jobs_file = jobs_file
+        self.jobs = {}
+        self.next_id = 1
+        self._limits = {res: asyncio.Semaphore(n) for res, n in RESOURCE_LIMITS.items()}
+        self._load()
+
+    # --- persistence ---
+
+    def _load(self):
+        try:
+            with open(self.jobs_file, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error(f"Cannot read job history: {e}")
+            return
+        self.next_id = data.get("next_id", 1)
+        for d in data.get("jobs", []):
+            job = Job.from_dict(d)
+            if job.status in ("queued", "running"):
+                # The bot died while this job was in flight
+                job.status = "interrupted"
+                job.finished = job.finished or time.time()
+            elif job.status == "detached":
+                self._check_detached(job)
+            self.jobs[job.id] = job
+
+    def _save(self):
+        history = sorted(self.jobs.values(), key=lambda j: j.id)[-HISTORY_SIZE:]
+        self.jobs = {j.id: j for j in history}
+        try:
+            os.makedirs(os.path.dirname(self.jobs_file), exist_ok=True)
+            tmp = self.jobs_file + ".tmp"
+            with open(tmp, 'w') as f:
+                json.dump({"next_id": self.next_id, "jobs": [j.to_dict() for j in history]}, f)
+            os.replace(tmp, self.jobs_file)
+        except Exception as e:
+            logger.error(f"Cannot save job history: {e}")
+
+    def _status_file(self, job):
+        return os.path.join(os.path.dirname(self.jobs_file), f"job-{job.id}.status")
+
+    @staticmethod
+    def _alive(pid):
+        try:
+            os.kill(pid, 0)
+            return True
+        except (ProcessLookupError, TypeError, ValueError):
+            return False
+        except PermissionError:
+            return True
+
+    def _check_detached(self, job):
+        """Detached jobs outlive the bot (e.g. /updatebdr); settle them from their status file and log."""
+        path = self._status_file(job)
+        try:
+            with open(path) as f:
+                kind, _, value = f.read().strip().partition(" ")
+        except OSError:
+            kind, value = None, ""
+        if kind == "exit" and value.lstrip("-").isdigit():
+            job.returncode = int(value)
+            job.status = "done" if job.returncode == 0 else "failed"
+        elif kind == "pid" and value.isdigit() and self._alive(int(value)):
+            return
+        elif kind is None and (self._alive(job.pid) or time.time() - (job.started or 0) < DETACHED_GRACE):
+            return      # launcher still starting it
+        else:
+            job.status = "interrupted"      # gone without an exit status
+        job.finished = job.finished or time.time()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        if job.log_file and os.path.exists(job.log_file):
+            with open(job.log_file, 'r', errors='replace') as f:
+                job.output.extend(line.rstrip() for line in deque(f, maxlen=OUTPUT_TAIL))
+
+    # --- queries ---
+
+    def _settle_detached(self):
+        detached = [j for j in self.jobs.values() if j.status == "detached"]
+        for job in detached:
+            self._check_detached(job)
+        if any(j.status != "detached" for j in detached):
+            self._save()
+
+    def get(self, job_id):
+        self._settle_detached()
+        return self.jobs.get(job_id)
+
+    def active(self):
+        self._settle_detached()
+        return [j for j in self.jobs.values() if j.status in ("queued", "running", "detached")]
+
+    def recent(self, n=10):
+        self._settle_detached()
+        return sorted(self.jobs.values(), key=lambda j: j.id, reverse=True)[:n]
+
+    # --- control ---
+
+    def submit(self, name, cmd, resource="light", parser=None, poll=None, message=None):
+        """Queue a shell command; returns the Job immediately.
+
+        parser(line) and poll(job) both return (percent or None, detail or None);
+        poll is called on every refresh for jobs whose output says nothing useful.
+        """
+        job = Job(self.next_id, name, cmd, resource, parser, poll)
+        job.message = message
+        self.next_id += 1
+        self.jobs[job.id] = job
+        self._save()
+        self._audit(job)
+        asyncio.get_running_loop().create_task(self._run(job))
+        return job
+
+    @staticmethod
+    def _audit(job):
+        # Link the job to the audit record of the command that started it
+        record = core.audit_record.get()
+        if record is not None:
+            record.setdefault("jobs", []).append(job.id)
+
+    async def spawn_detached(self, name, cmd, log_file=None, launcher=()):
+        """Start a process that must survive a bot restart; it is only tracked, not awaited.
+
+        launcher (e.g. systemd-run) starts the wrapped cmd, which records its exit status.
+        """
+        job = Job(self.next_id, name, cmd, "light", log_file=log_file)
+        self.next_id += 1
+        os.makedirs(os.path.dirname(self.jobs_file), exist_ok=True)
+        proc = await asyncio.create_subprocess_exec(
+            *launcher, "/bin/bash", "-c", DETACHED_WRAPPER, self._status_file(job), *cmd, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL, start_new_session=True
+        )
+        job.pid = proc.pid
+        job.status = "detached"
+        job.started = time.time()
+        self.jobs[job.id] = job
+        self._save()
+        self._audit(job)
+        return job
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if not job:
+            return f"❌ Job #{job_id} not found"
+        if job.status == "queued":
+            job.cancel_requested = True
+            job.status = "cancelled"
+            job.finished = time.time()
+            self._save()
+            return f"🚫 Job #{job_id} removed from queue"
+        if job.status == "running" and job.proc:
+            job.cancel_requested = True
+            try:
+                os.killpg(job.proc.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            return f"🚫 Cancelling job #{job_id}..."
+        if job.status == "detached":
+            return f"⚠️ Job #{job_id} runs detached and cannot be cancelled"
+        return f"ℹ️ Job #{job_id} already {job.status}"
+
+    # --- execution ---
+
+    async def _run(self, job):
+        async with self._limits[job.resource]:
+            if job.cancel_requested:
+                job.status = "cancelled"
+                job.finished = time.time()
+                self._save()
+                await self._publish(job, force=True)
+                return
+            job.status = "running"
+            job.started = time.time()
+            self._save()
+            await self._publish(job, force=True)
+            ticker = asyncio.get_running_loop().create_task(self._tick(job))
+            try:
+                job.proc = await asyncio.create_subprocess_shell(
+                    job.cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+                    stdin=asyncio.subprocess.DEVNULL, start_new_session=True
+                )
+                job.pid = job.proc.pid
+                await self._pump(job)
+                job.returncode = await job.proc.wait()
+                if job.cancel_requested:
+                    job.status = "cancelled"
+                else:
+                    job.status = "done" if job.returncode == 0 else "failed"
+            except Exception as e:
+                logger.error(f"Job #{job.id} error: {e}")
+                job.output.append(f"Error: {e}")
+                job.status = "failed"
+            ticker.cancel()
+            job.finished = time.time()
+            job.proc = None
+            self._save()
+            logger.info(f"Job #{job.id} ({job.name}) {job.status} in {human_duration(job.elapsed)}")
+            await self._publish(job, force=True)
+
+    async def _tick(self, job):
+        while True:
+            await asyncio.sleep(EDIT_INTERVAL)
+            if job.poll:
+                try:
+                    percent, detail = job.poll(job)
+                except Exception:
+                    percent, detail = None, None
+                if percent is not None:
+                    job.percent = percent
+                if detail:
+                    job.detail = detail
+            await self._publish(job)
+
+    async def _pump(self, job):
+        """Read output; rsync and tar redraw with \\r so split on both line endings."""
+        buf = ""
+        while True:
+            chunk = await job.proc.stdout.read(4096)
+            if not chunk:
+                break
+            buf += chunk.decode(errors='replace')
+            *lines, buf = re.split(r"[\r\n]", buf)
+            for line in lines:
+                if not line.strip():
+                    continue
+                if not job.parser:
+                    job.detail = line.strip()[:80]
+                    job.output.append(line[:200])
+                    continue
+                percent, detail = job.parser(line)
+                if percent is not None:
+                    job.percent = percent
+                if detail:
+                    job.detail = detail
+                elif percent is None:
+                    job.output.append(line[:200])
+
+    async def _publish(self, job, force=False):
+        if not job.message:
+            return
+        try:
+            await job.message.edit_text(job.render(), parse_mode='Markdown')
+        except Exception as e:
+            # "Message is not modified" and flood limits are expected on ticks
+            if force:
+                logger.warning(f"Job #{job.id} message update failed: {e}")
+
+_manager = None
+
+def get_manager():
+    global _manager
+    if _manager is None:
+        _manager = JobManager()
+    return _manager
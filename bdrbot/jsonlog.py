@@ -0,0 +1,118 @@
+"""
+Non-blocking JSON-lines logging.
+
+Handlers only put records on a queue; one background thread formats and
+writes them, so a slow disk (backups, restores) never stalls the event
+loop. The file is rotated by size with logrotate's naming (.1, .2.gz...)
+and the writer follows logrotate's own renames, so whichever rotates
+first the other carries on (see logrotate.bdrman).
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime
+
+MAX_BYTES = 10 * 1024 * 1024
+BACKUPS = 5
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        audit = getattr(record, "audit", None)
+        if audit is not None:
+            entry["audit"] = audit
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class RotatingJsonHandler(logging.Handler):
+    """Append-only file handler with size rotation that also notices external rotation."""
+
+    def __init__(self, path, max_bytes=MAX_BYTES, backups=BACKUPS):
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.stream = None
+        self._inode = None
+        self.setFormatter(JsonFormatter())
+
+    def _open(self):
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+        self.stream = os.fdopen(fd, 'a', encoding='utf-8')
+        self._inode = os.fstat(fd).st_ino
+
+    def _rotate(self):
+        # Not open yet when the process starts with the file already over max_bytes
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        last = f"{self.path}.{self.backups}"
+        for stale in (last, last + ".gz"):
+            if os.path.exists(stale):
+                os.remove(stale)
+        for i in range(self.backups - 1, 0, -1):
+            for suffix in ("", ".gz"):
+                src = f"{self.path}.{i}{suffix}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}{suffix}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def emit(self, record):
+        try:
+            line = self.format(record) + "\n"
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                st = None
+            if self.stream is not None and (st is None or st.st_ino != self._inode):
+                # logrotate moved the file away
+                self.stream.close()
+                self.stream = None
+            elif st is not None and st.st_size + len(line) > self.max_bytes:
+                self._rotate()
+            if self.stream is None:
+                self._open()
+            self.stream.write(line)
+            self.stream.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        super().close()
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Keep the traceback apart from the message (stock prepare merges them)
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def setup(path, level=logging.INFO):
+    """Route all logging through a queue to the JSON file and stderr."""
+    q = queue.SimpleQueue()
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    listener = logging.handlers.QueueListener(q, console, RotatingJsonHandler(path), respect_handler_level=True)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.handlers[:] = [_QueueHandler(q)]
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
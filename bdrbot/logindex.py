@@ -0,0 +1,463 @@
+"""
+Incremental log index for /search.
+
+Syslog (or the journal where there is no syslog file), the bdrman logs
+and the security alert log are tailed every few seconds. New lines go to
+a small active buffer; once it holds SEGMENT_BYTES it is sealed into a
+gzip segment with:
+  - hourly time buckets (first line of each hour), to skip by time
+  - a bloom filter of the segment's tokens, to skip segments without
+    the search term
+so a search only decompresses the few segments that can match, newest
+first, and stops once it has enough results.
+
+A term matches where it starts and ends on word boundaries (like grep -w),
+in the active buffer and in sealed segments alike. Every word of the term
+is then a whole word of the line, which is what the bloom filters hold.
+"""
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from bdrbot import core
+from bdrbot.core import logger
+
+INDEX_DIR = os.path.join(core.STATE_DIR, "logindex")
+SOURCES = {
+    "syslog": "/var/log/syslog",
+    "bdrman": "/var/log/bdrman.log",
+    "audit": "/var/log/bdrman_audit.log",
+    "security": "/var/log/bdrman_security_alerts.log",
+    "recovery": "/var/log/bdrman_recovery.log",
+    "bot": core.LOG_FILE,
+}
+JOURNAL = "journal"             # used instead of syslog when there is no syslog file
+JOURNAL_BACKFILL = "-7 days"
+
+TAIL_INTERVAL = 10
+SEGMENT_BYTES = 8 * 1024 * 1024
+SEAL_AGE = 3600                 # seal a partly filled buffer after this long
+BUCKET_SECONDS = 3600
+BLOOM_FP = 0.01
+MAX_LINE = 4096
+MAX_READ = 16 * 1024 * 1024     # per source per tick, so a backlog is indexed gradually
+RETENTION_DAYS = 30
+MAX_INDEX_BYTES = 1024 ** 3
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[._:@/-]+[a-z0-9]+)*")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_ISO_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2})")
+_BSD_RE = re.compile(r"^([A-Z][a-z]{2}) +(\d{1,2}) (\d{2}:\d{2}:\d{2})")
+_DATE_RE = re.compile(r"^[A-Z][a-z]{2} ([A-Z][a-z]{2}) +(\d{1,2}) (\d{2}:\d{2}:\d{2}) \S+ (\d{4})")
+_SINCE_RE = re.compile(r"^(\d+)([mhdw])$")
+_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+def tokens(line):
+    """Index tokens: compound tokens (IPs, unit names, paths) and their words."""
+    found = set()
+    for tok in _TOKEN_RE.findall(line.lower()):
+        found.add(tok)
+        if not tok.isalnum():
+            found.update(_WORD_RE.findall(tok))
+    return found
+
+def query_tokens(term):
+    """Words every matching line contains whole (see matcher)."""
+    return set(_WORD_RE.findall(term.lower()))
+
+def matcher(term):
+    """Predicate for lowercased lines containing term on word boundaries."""
+    needle = term.lower()
+    pattern = re.escape(needle)
+    if needle[:1].isascii() and needle[:1].isalnum():
+        pattern = r"(?<![a-z0-9])" + pattern
+    if needle[-1:].isascii() and needle[-1:].isalnum():
+        pattern += r"(?![a-z0-9])"
+    return re.compile(pattern).search
+
+def parse_since(text):
+    """'30m', '6h', '2d', '1w' -> epoch seconds, or None."""
+    m = _SINCE_RE.match(text)
+    if not m:
+        return None
+    return time.time() - int(m.group(1)) * _UNITS[m.group(2)]
+
+def journal_line(entry):
+    """A `journalctl -o json` entry as the line `-o short-iso` would print (one line)."""
+    message = entry.get("MESSAGE") or ""
+    if isinstance(message, list):       # non-UTF-8 messages come as byte arrays
+        message = bytes(message).decode("utf-8", "replace")
+    ts = int(entry.get("__REALTIME_TIMESTAMP") or 0) / 1e6
+    stamp = datetime.fromtimestamp(ts).astimezone().strftime("%Y-%m-%dT%H:%M:%S%z")
+    ident = entry.get("SYSLOG_IDENTIFIER") or entry.get("_COMM") or "unknown"
+    pid = entry.get("_PID") or entry.get("SYSLOG_PID")
+    return f"{stamp} {entry.get('_HOSTNAME', '')} {ident}{f'[{pid}]' if pid else ''}: {' '.join(str(message).splitlines())}"
+
+def parse_time(line, now=None):
+    """Leading timestamp of a log line (ISO, BSD syslog or `date` format), or None."""
+    if line.startswith('{"ts": "'):
+        line = line[8:]     # bot JSON log
+    m = _ISO_RE.match(line)
+    try:
+        if m:
+            return time.mktime(time.strptime(f"{m.group(1)} {m.group(2)}", "%Y-%m-%d %H:%M:%S"))
+        m = _BSD_RE.match(line)
+        if m:
+            now = now or time.time()
+            year = time.localtime(now).tm_year
+            ts = time.mktime(time.strptime(f"{year} {m.group(1)} {m.group(2)} {m.group(3)}", "%Y %b %d %H:%M:%S"))
+            # No year in BSD timestamps: December lines read in January
+            return ts if ts <= now + 86400 else time.mktime(time.strptime(f"{year - 1} {m.group(1)} {m.group(2)} {m.group(3)}", "%Y %b %d %H:%M:%S"))
+        m = _DATE_RE.match(line)
+        if m:
+            return time.mktime(time.strptime(f"{m.group(4)} {m.group(1)} {m.group(2)} {m.group(3)}", "%Y %b %d %H:%M:%S"))
+    except ValueError:
+        pass
+    return None
+
+class Bloom:
+    def __init__(self, m, k, bits=None):
+        self.m = m
+        self.k = k
+        self.bits = bits if bits is not None else bytearray((m + 7) // 8)
+
+    @classmethod
+    def for_count(cls, n, fp=BLOOM_FP):
+        n = max(n, 1)
+        m = max(int(-n * math.log(fp) / math.log(2) ** 2), 64)
+        return cls(m, max(int(round(m / n * math.log(2))), 1))
+
+    def _positions(self, token):
+        h = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(h[:8], "big"), int.from_bytes(h[8:], "big") | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def add(self, token):
+        for p in self._positions(token):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, token):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(token))
+
+    def dump(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.m.to_bytes(4, "big") + bytes([self.k]) + bytes(self.bits))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        return cls(int.from_bytes(data[:4], "big"), data[4], bytearray(data[5:]))
+
+class LogIndex:
+    def __init__(self, index_dir=INDEX_DIR, sources=None):
+        self.dir = index_dir
+        self.sources = dict(sources if sources is not None else SOURCES)
+        if sources is None and not os.path.exists(self.sources["syslog"]) and shutil.which("journalctl"):
+            del self.sources["syslog"]
+            self.sources[JOURNAL] = None
+        self.meta = {"next_id": 1, "segments": [], "files": {}}
+        self.active = {}        # source -> [(ts, line)]
+        self.active_since = {}
+        self._blooms = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    # Persistence
+
+    def _path(self, name):
+        return os.path.join(self.dir, name)
+
+    def _load(self):
+        try:
+            with open(self._path("index.json"), 'r') as f:
+                self.meta = json.load(f)
+        except (OSError, ValueError):
+            pass
+        for source in self.sources:
+            entries = []
+            try:
+                with open(self._path(f"active-{source}.log"), 'r', errors='replace') as f:
+                    for row in f:
+                        ts, _, line = row.rstrip("\n").partition("\t")
+                        entries.append((float(ts), line))
+            except (OSError, ValueError):
+                pass
+            self.active[source] = entries
+            self.active_since[source] = time.time()
+
+    def _save_meta(self):
+        os.makedirs(self.dir, exist_ok=True)
+        tmp = self._path("index.json.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self._path("index.json"))
+
+    # Ingestion
+
+    def _read_file(self, source, path):
+        """New complete lines of a log file since the last read, following rotation."""
+        state = self.meta["files"].setdefault(source, {"inode": None, "offset": 0})
+        try:
+            st = os.stat(path)
+        except OSError:
+            return []
+        chunks = []
+        if state["inode"] != st.st_ino:
+            # Rotated: finish the previous file (now path.1) before starting the new one
+            if state["inode"] is not None:
+                try:
+                    if os.stat(path + ".1").st_ino == state["inode"]:
+                        chunks.append(self._read_from(path + ".1", state["offset"])[0])
+                except OSError:
+                    pass
+            state["inode"], state["offset"] = st.st_ino, 0
+        elif st.st_size < state["offset"]:
+            state["offset"] = 0     # truncated (copytruncate)
+        data, state["offset"] = self._read_from(path, state["offset"])
+        chunks.append(data)
+        return b"".join(chunks).decode("utf-8", "replace").splitlines()
+
+    @staticmethod
+    def _read_from(path, offset):
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(MAX_READ)
+        end = data.rfind(b"\n") + 1
+        return data[:end], offset + end
+
+    def _read_journal(self):
+        """New journal entries as short-iso lines, streamed and capped at MAX_READ per pass.
+
+        The cursor of the last entry taken is kept in the index meta, so a capped pass
+        (the 7 day backfill on a busy host) resumes exactly where it stopped.
+        """
+        state = self.meta.setdefault("journal", {})
+        if "cursor" not in state:
+            try:
+                # Cursor file of the old `journalctl --cursor-file` reader
+                with open(self._path("journal.cursor")) as f:
+                    state["cursor"] = f.read().strip() or None
+            except OSError:
+                state["cursor"] = None
+        cmd = ["journalctl", "-o", "json", "--no-pager", "-q"]
+        cmd.append(f"--after-cursor={state['cursor']}" if state["cursor"] else f"--since={JOURNAL_BACKFILL}")
+        try:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            logger.error(f"Journal read failed: {e}")
+            return []
+        lines, size = [], 0
+        try:
+            for raw in proc.stdout:
+                try:
+                    entry = json.loads(raw)
+                except ValueError:
+                    continue
+                line = journal_line(entry)
+                lines.append(line)
+                size += len(line)
+                state["cursor"] = entry.get("__CURSOR") or state["cursor"]
+                if size >= MAX_READ:
+                    break
+        finally:
+            proc.kill()
+            proc.wait()
+            proc.stdout.close()
+        return lines
+
+    def _append(self, source, lines):
+        entries = []
+        last = self.active[source][-1][0] if self.active[source] else time.time()
+        now = time.time()
+        for line in lines:
+            line = line[:MAX_LINE].replace("\t", " ")
+            ts = parse_time(line, now)
+            # Continuation lines (tracebacks...) inherit the previous timestamp
+            last = ts if ts is not None else last
+            entries.append((last, line))
+        with open(self._path(f"active-{source}.log"), 'a') as f:
+            f.writelines(f"{ts:.0f}\t{line}\n" for ts, line in entries)
+        with self._lock:
+            self.active[source].extend(entries)
+
+    def _seal(self, source):
+        entries = self.active[source]
+        seg_id = self.meta["next_id"]
+        toks, buckets = set(), []
+        for i, (ts, line) in enumerate(entries):
+            toks |= tokens(line)
+            bucket = int(ts // BUCKET_SECONDS) * BUCKET_SECONDS
+            if not buckets or buckets[-1][0] != bucket:
+                buckets.append([bucket, i])
+        bloom = Bloom.for_count(len(toks))
+        for tok in toks:
+            bloom.add(tok)
+        bloom.dump(self._path(f"{seg_id}.bloom"))
+        with gzip.open(self._path(f"{seg_id}.log.gz"), 'wt', compresslevel=6) as f:
+            f.writelines(f"{ts:.0f}\t{line}\n" for ts, line in entries)
+        seg = {
+            "id": seg_id,
+            "source": source,
+            "first_ts": min(ts for ts, _ in entries),
+            "last_ts": max(ts for ts, _ in entries),
+            "lines": len(entries),
+            "buckets": buckets,
+            "size": os.path.getsize(self._path(f"{seg_id}.log.gz")) + os.path.getsize(self._path(f"{seg_id}.bloom")),
+        }
+        with self._lock:
+            self.meta["segments"].append(seg)
+            self.meta["next_id"] = seg_id + 1
+            self._blooms[seg_id] = bloom
+            self.active[source] = []
+        self._save_meta()
+        open(self._path(f"active-{source}.log"), 'w').close()
+        self.active_since[source] = time.time()
+
+    def _retention(self):
+        cutoff = time.time() - RETENTION_DAYS * 86400
+        with self._lock:
+            segments = sorted(self.meta["segments"], key=lambda s: s["last_ts"])
+            total = sum(s["size"] for s in segments)
+            dropped = []
+            while segments and (total > MAX_INDEX_BYTES or segments[0]["last_ts"] < cutoff):
+                seg = segments.pop(0)
+                total -= seg["size"]
+                dropped.append(seg)
+            self.meta["segments"] = [s for s in self.meta["segments"] if s not in dropped]
+        for seg in dropped:
+            self._blooms.pop(seg["id"], None)
+            for suffix in (".log.gz", ".bloom"):
+                try:
+                    os.remove(self._path(f"{seg['id']}{suffix}"))
+                except OSError:
+                    pass
+
+    def update(self):
+        """One tailing pass over every source; returns the number of new lines."""
+        os.makedirs(self.dir, exist_ok=True)
+        added = 0
+        for source, path in self.sources.items():
+            lines = self._read_journal() if source == JOURNAL else self._read_file(source, path)
+            added += len(lines)
+            size = sum(len(line) for _, line in self.active[source])
+            # Feed in pieces so a large backlog still becomes SEGMENT_BYTES segments
+            start = 0
+            for i, line in enumerate(lines):
+                size += len(line)
+                if size >= SEGMENT_BYTES:
+                    self._append(source, lines[start:i + 1])
+                    self._seal(source)
+                    start, size = i + 1, 0
+            if start < len(lines):
+                self._append(source, lines[start:])
+            if self.active[source] and time.time() - self.active_since[source] > SEAL_AGE:
+                self._seal(source)
+        self._retention()
+        self._save_meta()
+        return added
+
+    async def run(self):
+        import asyncio
+        while True:
+            try:
+                await asyncio.to_thread(self.update)
+            except Exception as e:
+                logger.error(f"Log index update failed: {e}")
+            await asyncio.sleep(TAIL_INTERVAL)
+
+    # Search
+
+    def _bloom(self, seg_id):
+        bloom = self._blooms.get(seg_id)
+        if bloom is None:
+            bloom = self._blooms[seg_id] = Bloom.load(self._path(f"{seg_id}.bloom"))
+        return bloom
+
+    def _read_segment(self, seg, since):
+        start = 0
+        if since:
+            for bucket, first in seg["buckets"]:
+                if bucket + BUCKET_SECONDS > since:
+                    start = first
+                    break
+        with gzip.open(self._path(f"{seg['id']}.log.gz"), 'rt', errors='replace') as f:
+            for i, row in enumerate(f):
+                if i >= start:
+                    ts, _, line = row.rstrip("\n").partition("\t")
+                    yield float(ts), line
+
+    def search(self, term, since=None, limit=50, source=None):
+        """Newest matching lines as [(ts, source, line)] plus scan stats."""
+        started = time.perf_counter()
+        match = matcher(term)
+        wanted = query_tokens(term)
+        with self._lock:
+            segments = sorted(self.meta["segments"], key=lambda s: s["last_ts"], reverse=True)
+            active = {s: list(e) for s, e in self.active.items()}
+
+        matches = []
+        for src, entries in active.items():
+            if source and src != source:
+                continue
+            matches.extend((ts, src, line) for ts, line in entries
+                           if match(line.lower()) and (not since or ts >= since))
+
+        stats = {"segments": len(segments), "skipped": 0, "read": 0}
+        for seg in segments:
+            if (source and seg["source"] != source) or (since and seg["last_ts"] < since):
+                continue
+            # Enough results, and nothing in older segments can be newer
+            if len(matches) >= limit:
+                matches.sort(key=lambda m: m[0], reverse=True)
+                del matches[limit:]
+                if seg["last_ts"] < matches[-1][0]:
+                    break
+            try:
+                if not all(tok in self._bloom(seg["id"]) for tok in wanted):
+                    stats["skipped"] += 1
+                    continue
+                stats["read"] += 1
+                matches.extend((ts, seg["source"], line) for ts, line in self._read_segment(seg, since)
+                               if match(line.lower()) and (not since or ts >= since))
+            except OSError:
+                continue
+        matches.sort(key=lambda m: m[0], reverse=True)
+        stats["ms"] = (time.perf_counter() - started) * 1000
+        return matches[:limit], stats
+
+def render(matches, width=160):
+    lines = []
+    for ts, source, line in reversed(matches):
+        stamp = datetime.fromtimestamp(ts).strftime('%m-%d %H:%M')
+        lines.append(f"{stamp} {source[:8]:<8} {line[:width]}")
+    return "\n".join(lines)
+
+_index = None
+
+def get_index():
+    global _index
+    if _index is None:
+        _index = LogIndex()
+    return _index
+
+if __name__ == "__main__":
+    # bdrman's log menu searches through here: python3 -m bdrbot.logindex <term> [since]
+    if len(sys.argv) < 2:
+        print("Usage: python3 -m bdrbot.logindex <term> [since e.g. 6h]")
+        sys.exit(1)
+    args = sys.argv[1:]
+    since = parse_since(args[-1]) if len(args) > 1 else None
+    if since:
+        args = args[:-1]
+    found, info = LogIndex().search(" ".join(args), since, limit=20)
+    print(render(found, width=300) or "No matches")
+    print(f"({info['read']} of {info['segments']} segments read, {info['ms']:.0f} ms)")
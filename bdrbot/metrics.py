@@ -0,0 +1,331 @@
+"""
+Metric history and period reports.
+
+The bot samples the host every COLLECT_INTERVAL and folds each sample
+straight into hourly rollups in SQLite (count, sum, min, max, a percent
+histogram for p95, first/last for growth). Service up/down samples,
+container restarts and alerts are hourly counters. A report for any
+period only reads those buckets, never raw samples.
+
+The weekly report is sent by the bot every Monday at 12:00, replacing
+the old cron script that showed a single instant.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime
+from bdrbot import core
+from bdrbot.core import logger, human_bytes
+
+DB_FILE = os.path.join(core.STATE_DIR, "metrics.db")
+ALERT_LOG = "/var/log/bdrman_security_alerts.log"
+DOCKER_ROOT = "/var/lib/docker/containers"
+
+COLLECT_INTERVAL = 60
+BUCKET = 3600
+RETENTION_DAYS = 400
+DISK_PATHS = ("/",)
+SERVICES = {"Docker": "docker", "Nginx": "nginx", "WireGuard": "wg-quick@wg0", "SSH": "ssh"}
+REPORT_WEEKDAY, REPORT_HOUR = 0, 12     # Monday 12:00, as the old cron entry
+PERIODS = {"day": 86400, "week": 7 * 86400, "month": 30 * 86400}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup (
+    bucket INTEGER, metric TEXT,
+    n INTEGER, total REAL, min REAL, max REAL, first REAL, last REAL, hist TEXT,
+    PRIMARY KEY (bucket, metric)
+);
+CREATE TABLE IF NOT EXISTS counter (
+    bucket INTEGER, kind TEXT, subject TEXT, n INTEGER,
+    PRIMARY KEY (bucket, kind, subject)
+);
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def bucket_of(ts):
+    return int(ts // BUCKET) * BUCKET
+
+class MetricStore:
+    def __init__(self, path=DB_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def get_state(self, key, default=None):
+        row = self.db.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO state VALUES (?, ?)", (key, json.dumps(value)))
+
+    def observe(self, metric, value, ts=None, percent=True):
+        """Fold one sample into its hourly rollup."""
+        b = bucket_of(ts or time.time())
+        row = self.db.execute("SELECT n, total, min, max, first, hist FROM rollup WHERE bucket = ? AND metric = ?", (b, metric)).fetchone()
+        if row is None:
+            n, total, lo, hi, first, hist = 0, 0.0, value, value, value, {}
+        else:
+            n, total, lo, hi, first, hist = row[0], row[1], row[2], row[3], row[4], json.loads(row[5] or "{}")
+        if percent:
+            key = str(min(int(value), 100))
+            hist[key] = hist.get(key, 0) + 1
+        self.db.execute(
+            "INSERT OR REPLACE INTO rollup VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (b, metric, n + 1, total + value, min(lo, value), max(hi, value), first, value, json.dumps(hist) if percent else None),
+        )
+
+    def count(self, kind, subject, n=1, ts=None):
+        self.db.execute(
+            "INSERT INTO counter VALUES (?, ?, ?, ?) ON CONFLICT(bucket, kind, subject) DO UPDATE SET n = n + excluded.n",
+            (bucket_of(ts or time.time()), kind, subject, n),
+        )
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def prune(self):
+        cutoff = time.time() - RETENTION_DAYS * 86400
+        self.db.execute("DELETE FROM rollup WHERE bucket < ?", (cutoff,))
+        self.db.execute("DELETE FROM counter WHERE bucket < ?", (cutoff,))
+
+    # Reads (pre-aggregated buckets only)
+
+    def summary(self, metric, since, until):
+        """{min, avg, p95, max, first, last, first_at, last_at} over the period, or None without data."""
+        rows = self.db.execute(
+            "SELECT n, total, min, max, first, last, hist, bucket FROM rollup WHERE metric = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+            (metric, bucket_of(since), until),
+        ).fetchall()
+        if not rows:
+            return None
+        n = sum(r[0] for r in rows)
+        hist = {}
+        for r in rows:
+            for k, v in json.loads(r[6] or "{}").items():
+                hist[int(k)] = hist.get(int(k), 0) + v
+        p95, seen = None, 0
+        for k in sorted(hist):
+            seen += hist[k]
+            if seen >= 0.95 * n:
+                p95 = k
+                break
+        return {
+            "min": min(r[2] for r in rows), "max": max(r[3] for r in rows),
+            "avg": sum(r[1] for r in rows) / n, "p95": p95,
+            "first": rows[0][4], "last": rows[-1][5], "hours": len(rows),
+            "first_at": rows[0][7], "last_at": rows[-1][7],
+        }
+
+    def counters(self, kind, since, until):
+        return dict(self.db.execute(
+            "SELECT subject, SUM(n) FROM counter WHERE kind = ? AND bucket >= ? AND bucket < ? GROUP BY subject ORDER BY SUM(n) DESC",
+            (kind, bucket_of(since), until),
+        ).fetchall())
+
+def _service_states(units):
+    """unit -> active bool, for units that exist on this host."""
+    try:
+        out = subprocess.run(["systemctl", "show", "-p", "Id,LoadState,ActiveState", *units],
+                             capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return {}
+    states = {}
+    for block in out.strip().split("\n\n"):
+        props = dict(line.split("=", 1) for line in block.splitlines() if "=" in line)
+        if props.get("LoadState") == "loaded":
+            states[props["Id"].replace(".service", "")] = props.get("ActiveState") == "active"
+    return states
+
+def _container_starts(docker_root=DOCKER_ROOT):
+    """container id -> (name, StartedAt) from Docker's on-disk state."""
+    starts = {}
+    try:
+        ids = os.listdir(docker_root)
+    except OSError:
+        return starts
+    for cid in ids:
+        try:
+            with open(os.path.join(docker_root, cid, "config.v2.json"), 'r') as f:
+                cfg = json.load(f)
+        except (OSError, ValueError):
+            continue
+        starts[cid] = (cfg.get("Name", "").lstrip("/"), cfg.get("State", {}).get("StartedAt", ""))
+    return starts
+
+class MetricsCollector:
+    def __init__(self, store=None):
+        self.store = store or MetricStore()
+        self._starts = None
+
+    def collect(self):
+        import psutil
+        from bdrbot import containers
+        s = self.store
+        now = time.time()
+        # cpu_percent(None) averages since the previous call, i.e. the whole interval
+        s.observe("cpu", psutil.cpu_percent(interval=None), now)
+        s.observe("mem", psutil.virtual_memory().percent, now)
+        for path in DISK_PATHS:
+            try:
+                du = psutil.disk_usage(path)
+            except OSError:
+                continue
+            s.observe(f"disk:{path}", du.percent, now)
+            s.observe(f"disk_used:{path}", du.used, now, percent=False)
+            s.set_state(f"disk_free:{path}", du.free)
+
+        units = {unit: label for label, unit in SERVICES.items()}
+        for unit, up in _service_states(list(units)).items():
+            s.count("service_up" if up else "service_down", units.get(unit, unit))
+
+        # A container restarted if its StartedAt moved. A new container for a
+        # known service is not counted: every CapRover deploy creates one
+        starts = _container_starts()
+        if self._starts is not None:
+            for cid, (name, started) in starts.items():
+                prev = self._starts.get(cid)
+                if prev and prev[1] != started:
+                    s.count("restart", containers.service_name(name))
+        self._starts = starts
+
+        self._tail_alerts()
+        s.prune()
+        s.commit()
+
+    def _tail_alerts(self):
+        """Count new '[type] ALERT SENT' lines of the security monitor's log."""
+        state = self.store.get_state("alert_log", {"inode": None, "offset": 0})
+        try:
+            st = os.stat(ALERT_LOG)
+        except OSError:
+            return
+        if state["inode"] != st.st_ino or st.st_size < state["offset"]:
+            state = {"inode": st.st_ino, "offset": 0 if state["inode"] else st.st_size}
+        with open(ALERT_LOG, 'r', errors='replace') as f:
+            f.seek(state["offset"])
+            for line in f:
+                if "ALERT SENT" in line and "[" in line:
+                    self.store.count("alert", line[line.index("[") + 1:line.index("]")] if "]" in line else "unknown")
+            state["offset"] = f.tell()
+        self.store.set_state("alert_log", state)
+
+    async def run(self, bot=None):
+        import psutil
+        psutil.cpu_percent(interval=None)
+        while True:
+            await asyncio.sleep(COLLECT_INTERVAL)
+            try:
+                await asyncio.to_thread(self.collect)
+            except Exception as e:
+                logger.error(f"Metric collection failed: {e}")
+            if bot:
+                await self._maybe_send_weekly(bot)
+
+    async def _maybe_send_weekly(self, bot):
+        now = datetime.now()
+        if now.weekday() != REPORT_WEEKDAY or now.hour < REPORT_HOUR:
+            return
+        today = now.strftime('%Y-%m-%d')
+        if self.store.get_state("weekly_sent") == today:
+            return
+        self.store.set_state("weekly_sent", today)
+        self.store.commit()
+        try:
+            report = await asyncio.to_thread(build_report, self.store, "week")
+            await bot.send_message(chat_id=core.CHAT_ID, text=report, parse_mode='Markdown')
+        except Exception as e:
+            logger.error(f"Weekly report failed: {e}")
+
+def _icon(value, warn=80, crit=90):
+    return "🔴" if value >= crit else "🟡" if value >= warn else "🟢"
+
+def build_report(store, period="week", until=None):
+    until = until or time.time()
+    since = until - PERIODS[period]
+    title = {"day": "DAILY", "week": "WEEKLY", "month": "MONTHLY"}[period]
+    start = datetime.fromtimestamp(since).strftime('%d.%m %H:%M')
+    end = datetime.fromtimestamp(until).strftime('%d.%m %H:%M')
+    msg = f"📊 *{title} REPORT* - `{core.SERVER_NAME}`\n{start} → {end}\n━━━━━━━━━━━━━━━━━━\n\n"
+
+    rows = []
+    for label, metric in [("CPU", "cpu"), ("Memory", "mem")] + [(f"Disk {p}", f"disk:{p}") for p in DISK_PATHS]:
+        s = store.summary(metric, since, until)
+        if s:
+            rows.append((label, s))
+    if not rows:
+        return msg + "No metric history yet for this period."
+    coverage = max(s["hours"] for _, s in rows) / (PERIODS[period] / 3600) * 100
+    msg += "*💻 Resources* (min/avg/p95/max %)\n```\n"
+    for label, s in rows:
+        msg += f"{label:<8} {s['min']:>4.0f} {s['avg']:>4.0f} {s['p95'] or 0:>4} {s['max']:>4.0f}\n"
+    msg += "```\n"
+    if coverage < 90:
+        msg += f"_History covers {coverage:.0f}% of the period_\n"
+
+    for path in DISK_PATHS:
+        s = store.summary(f"disk_used:{path}", since, until)
+        if not s or s["hours"] < 2:
+            continue
+        # Over the time between the first and last bucket: gaps in collection don't shorten it
+        days = (s["last_at"] - s["first_at"]) / 86400
+        if days <= 0:
+            continue
+        rate = (s["last"] - s["first"]) / days
+        free = store.get_state(f"disk_free:{path}")
+        msg += f"\n*💾 Disk growth* `{path}`: `{'+' if rate >= 0 else '-'}{human_bytes(abs(rate))}/day`"
+        if rate > 0 and free:
+            msg += f", full in ~`{free / rate:.0f}` days"
+        msg += "\n"
+
+    up, down = store.counters("service_up", since, until), store.counters("service_down", since, until)
+    if up or down:
+        msg += "\n*⚙️ Service uptime*\n"
+        for name in sorted(set(up) | set(down)):
+            pct = up.get(name, 0) / (up.get(name, 0) + down.get(name, 0)) * 100
+            msg += f"{_icon(100 - pct, 0.5, 2)} {name}: `{pct:.2f}%`\n"
+
+    restarts = store.counters("restart", since, until)
+    msg += f"\n*🐳 Container restarts*: `{sum(restarts.values())}`\n"
+    for name, n in list(restarts.items())[:5]:
+        msg += f"  `{name}`: {n}\n"
+
+    alerts = store.counters("alert", since, until)
+    msg += f"\n*🚨 Alerts*: `{sum(alerts.values())}`\n"
+    for name, n in alerts.items():
+        msg += f"  `{name}`: {n}\n"
+    return msg
+
+def render_report(period="week", path=DB_FILE):
+    """build_report on its own short-lived connection: the collector writes from its thread."""
+    store = MetricStore(path)
+    try:
+        return build_report(store, period)
+    finally:
+        store.close()
+
+_collector = None
+
+def get_collector():
+    global _collector
+    if _collector is None:
+        _collector = MetricsCollector()
+    return _collector
+
+if __name__ == "__main__":
+    # bdrman's "test weekly report": python3 -m bdrbot.metrics [day|week|month] [--send]
+    period = next((a for a in sys.argv[1:] if a in PERIODS), "week")
+    core.load_config()
+    report = render_report(period)
+    if "--send" in sys.argv:
+        import requests
+        requests.post(f"https://api.telegram.org/bot{core.BOT_TOKEN}/sendMessage",
+                      data={"chat_id": core.CHAT_ID, "text": report, "parse_mode": "Markdown"}, timeout=10)
+    else:
+        print(report)
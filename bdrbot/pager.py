@@ -0,0 +1,141 @@
+"""
+Paginated output for long command results.
+
+reply() splits a result on line boundaries into pages that fit one Telegram
+message and sends the first (or last, for logs) with ◀️ / ▶️ buttons. Pages
+are escaped once and kept in an LRU cache keyed by (chat, message), so
+paging edits the message in place without running the command again.
+Results too long to page through are sent as a .txt.gz attachment.
+Replies to a fleet controller get every page in order (no buttons there).
+"""
+import gzip
+import io
+import re
+import time
+from collections import OrderedDict
+
+PAGE_CHARS = 3500           # body per page; title, footer and markup fit in the rest of 4096
+ATTACH_CHARS = 60000        # longer results go out as one gzip attachment
+CACHE_TTL = 3600
+CACHE_MAX = 200             # results, ~ATTACH_CHARS each at worst
+CALLBACK_PREFIX = "pg:"
+
+class Pages:
+    __slots__ = ("title", "pages", "footer", "raw", "filename", "created")
+
+    def __init__(self, title, pages, footer, raw, filename):
+        self.title = title
+        self.pages = pages
+        self.footer = footer
+        self.raw = raw
+        self.filename = filename
+        self.created = time.time()
+
+    def render(self, n):
+        head = f"{self.title} ({n + 1}/{len(self.pages)})" if len(self.pages) > 1 else self.title
+        return f"{head}\n```\n{self.pages[n]}\n```" + (f"\n{self.footer}" if self.footer else "")
+
+_cache = OrderedDict()
+
+def escape(text):
+    """Make command output safe inside a Markdown code block."""
+    return text.replace("`", "'")
+
+def split(text, limit=PAGE_CHARS):
+    """Pages of at most limit chars, cut at newlines (overlong lines are cut hard)."""
+    pages, current, size = [], [], 0
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                pages.append("\n".join(current))
+                current, size = [], 0
+            pages.append(line[:limit])
+            line = line[limit:]
+        if current and size + len(line) + 1 > limit:
+            pages.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        pages.append("\n".join(current))
+    return pages or [""]
+
+def remember(key, pages):
+    _cache[key] = pages
+    _cache.move_to_end(key)
+    now = time.time()
+    while _cache and (len(_cache) > CACHE_MAX or now - next(iter(_cache.values())).created > CACHE_TTL):
+        _cache.popitem(last=False)
+
+def lookup(key):
+    pages = _cache.get(key)
+    if pages is None or time.time() - pages.created > CACHE_TTL:
+        _cache.pop(key, None)
+        return None
+    _cache.move_to_end(key)
+    return pages
+
+def keyboard(pages, n):
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+    total = len(pages.pages)
+    row = []
+    if n > 0:
+        row.append(InlineKeyboardButton("⏮", callback_data=f"{CALLBACK_PREFIX}0"))
+        row.append(InlineKeyboardButton("◀️", callback_data=f"{CALLBACK_PREFIX}{n - 1}"))
+    row.append(InlineKeyboardButton(f"{n + 1}/{total}", callback_data=f"{CALLBACK_PREFIX}{n}"))
+    if n < total - 1:
+        row.append(InlineKeyboardButton("▶️", callback_data=f"{CALLBACK_PREFIX}{n + 1}"))
+        row.append(InlineKeyboardButton("⏭", callback_data=f"{CALLBACK_PREFIX}{total - 1}"))
+    return InlineKeyboardMarkup([row, [InlineKeyboardButton("📎 .gz", callback_data=f"{CALLBACK_PREFIX}file")]])
+
+def compressed(pages):
+    data = gzip.compress(pages.raw.encode(errors="replace"), 6)
+    name = re.sub(r"[^\w.-]", "_", pages.filename)
+    return io.BytesIO(data), f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.txt.gz"
+
+async def reply(update, title, text, footer="", filename="output", last=False):
+    """Send text as a code block under a Markdown title, paged if it is long."""
+    from telegram import Message
+    text = text.rstrip("\n")
+    pages = Pages(title, split(escape(text)), footer, text, filename)
+    if len(text) > ATTACH_CHARS:
+        document, name = compressed(pages)
+        lines = text.count("\n") + 1
+        await update.message.reply_document(document=document, filename=name,
+                                            caption=f"{title}\n{lines} lines, {len(text) // 1024} KB", parse_mode='Markdown')
+        return
+    if len(pages.pages) == 1:
+        await update.message.reply_text(pages.render(0), parse_mode='Markdown')
+        return
+    if not isinstance(update.message, Message):
+        # Fleet agent: the controller merges replies, buttons would not reach us
+        for n in range(len(pages.pages)):
+            await update.message.reply_text(pages.render(n), parse_mode='Markdown')
+        return
+    n = len(pages.pages) - 1 if last else 0
+    sent = await update.message.reply_text(pages.render(n), parse_mode='Markdown', reply_markup=keyboard(pages, n))
+    remember((sent.chat_id, sent.message_id), pages)
+
+async def on_callback(update):
+    """◀️ / ▶️ / 📎 button press on a paged message."""
+    query = update.callback_query
+    pages = lookup((query.message.chat_id, query.message.message_id))
+    if pages is None:
+        await query.answer("Expired, run the command again")
+        await query.edit_message_reply_markup(reply_markup=None)
+        return
+    choice = query.data[len(CALLBACK_PREFIX):]
+    if choice == "file":
+        await query.answer()
+        document, name = compressed(pages)
+        await query.message.reply_document(document=document, filename=name, caption=pages.title, parse_mode='Markdown')
+        return
+    from telegram.error import BadRequest
+    n = min(max(int(choice), 0), len(pages.pages) - 1) if choice.isdigit() else 0
+    await query.answer()
+    try:
+        await query.edit_message_text(pages.render(n), parse_mode='Markdown', reply_markup=keyboard(pages, n))
+    except BadRequest as e:
+        # Pressing the page already shown: Telegram rejects an unchanged edit
+        if "not modified" not in str(e):
+            raise
@@ -0,0 +1,470 @@
+"""
+Synthetic probes: ICMP ping (TCP connect fallback), DNS and HTTP checks
+against many targets from one event loop.
+
+Every probe is a coroutine on the bot's loop: ICMP goes through one
+shared socket, DNS queries through one shared UDP socket, HTTP through
+asyncio streams, so thousands of targets need no threads. Targets sit in
+a due-time heap and each one keeps a rolling latency histogram (one
+sparse bucket map per minute), which /ping, /dns and /probe answer from.
+"""
+import asyncio
+import bisect
+import heapq
+import itertools
+import os
+import random
+import socket
+import ssl
+import struct
+import time
+from collections import deque
+from urllib.parse import urlsplit
+from bdrbot import core
+from bdrbot.core import logger
+
+PING, TCP, DNS, HTTP = "ping", "tcp", "dns", "http"
+INTERVALS = {PING: 30, TCP: 30, DNS: 60, HTTP: 60}
+TIMEOUT = 5
+CONCURRENCY = 200           # probes in flight at once
+ADHOC_TTL = 3600            # targets added by /ping or /dns are dropped after this
+REDISCOVER_INTERVAL = 600
+DEFAULT_PING_TARGETS = ("1.1.1.1", "8.8.8.8")
+
+# Histogram buckets: 0.1 ms to ~50 s, 25% apart
+BOUNDS = [0.1 * 1.25 ** i for i in range(60)]
+SLOT_SECONDS = 60
+SLOTS = 60                  # one hour of history
+
+class RollingHistogram:
+    """Latency histogram over the last SLOTS minutes."""
+
+    def __init__(self):
+        self.slots = deque()    # [minute, {bucket: count}, errors]
+
+    def _slot(self):
+        minute = int(time.time() // SLOT_SECONDS)
+        if not self.slots or self.slots[-1][0] != minute:
+            self.slots.append([minute, {}, 0])
+            while self.slots[0][0] <= minute - SLOTS:
+                self.slots.popleft()
+        return self.slots[-1]
+
+    def record(self, ms):
+        slot = self._slot()
+        if ms is None:
+            slot[2] += 1
+        else:
+            b = bisect.bisect_left(BOUNDS, ms)
+            slot[1][b] = slot[1].get(b, 0) + 1
+
+    def summary(self, minutes=SLOTS):
+        """(ok count, error count, p50 ms, p99 ms) over the last minutes."""
+        since = int(time.time() // SLOT_SECONDS) - minutes
+        counts, errors = {}, 0
+        for minute, buckets, errs in self.slots:
+            if minute <= since:
+                continue
+            errors += errs
+            for b, n in buckets.items():
+                counts[b] = counts.get(b, 0) + n
+        ok = sum(counts.values())
+        return ok, errors, self._percentile(counts, ok, 0.50), self._percentile(counts, ok, 0.99)
+
+    @staticmethod
+    def _percentile(counts, total, p):
+        if not total:
+            return None
+        seen, rank = 0, p * total
+        for b in sorted(counts):
+            seen += counts[b]
+            if seen >= rank:
+                return BOUNDS[min(b, len(BOUNDS) - 1)]
+        return BOUNDS[-1]
+
+class Target:
+    __slots__ = ("kind", "name", "interval", "hist", "last_ms", "last_error", "last_at", "detail", "addr", "addr_at", "adhoc_until")
+
+    def __init__(self, kind, name, interval=None, adhoc=False):
+        self.kind = kind
+        self.name = name
+        self.interval = interval or INTERVALS[kind]
+        self.hist = RollingHistogram()
+        self.last_ms = None
+        self.last_error = None
+        self.last_at = None
+        self.detail = None      # DNS answers, HTTP status
+        self.addr = None        # resolved address for ping/tcp
+        self.addr_at = 0.0
+        self.adhoc_until = time.time() + ADHOC_TTL if adhoc else None
+
+    @property
+    def key(self):
+        return f"{self.kind}:{self.name}"
+
+    def record(self, ms, error=None, detail=None):
+        self.hist.record(None if error else ms)
+        self.last_ms, self.last_error, self.last_at = ms, error, time.time()
+        if detail is not None:
+            self.detail = detail
+
+def _checksum(data):
+    if len(data) % 2:
+        data += b"\0"
+    s = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    s = (s >> 16) + (s & 0xffff)
+    s += s >> 16
+    return ~s & 0xffff
+
+class IcmpPinger:
+    """Echo requests over one socket; replies are matched by sequence number.
+
+    Uses an unprivileged ICMP datagram socket when the kernel allows it,
+    else a raw socket (root). If neither opens, available is False from
+    then on: privileges do not change at runtime, so it is not retried.
+    """
+
+    def __init__(self):
+        self.sock = None
+        self.raw = False
+        self.failed = False
+        self.ident = os.getpid() & 0xffff
+        self._seq = itertools.count(random.randrange(0xffff))
+        self._waiting = {}
+
+    @property
+    def available(self):
+        return self._open()
+
+    def _open(self):
+        if self.sock:
+            return True
+        if self.failed:
+            return False
+        for kind, raw in ((socket.SOCK_DGRAM, False), (socket.SOCK_RAW, True)):
+            try:
+                self.sock = socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP)
+                self.raw = raw
+                break
+            except OSError:
+                continue
+        else:
+            self.failed = True
+            logger.info("ICMP sockets unavailable, ping falls back to TCP connect")
+            return False
+        self.sock.setblocking(False)
+        asyncio.get_running_loop().add_reader(self.sock.fileno(), self._on_readable)
+        return True
+
+    def _on_readable(self):
+        while True:
+            try:
+                data = self.sock.recv(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            if self.raw:
+                data = data[(data[0] & 0x0f) * 4:]
+            if len(data) < 8 or data[0] != 0:
+                continue
+            ident, seq = struct.unpack("!HH", data[4:8])
+            if self.raw and ident != self.ident:
+                continue
+            fut = self._waiting.pop(seq, None)
+            if fut and not fut.done():
+                fut.set_result(time.perf_counter())
+
+    async def ping(self, addr, timeout=TIMEOUT):
+        """Round trip in ms; raises asyncio.TimeoutError on loss."""
+        seq = next(self._seq) & 0xffff
+        header = struct.pack("!BBHHH", 8, 0, 0, self.ident, seq)
+        payload = b"bdrman-probe"
+        packet = struct.pack("!BBHHH", 8, 0, _checksum(header + payload), self.ident, seq) + payload
+        fut = asyncio.get_running_loop().create_future()
+        self._waiting[seq] = fut
+        sent = time.perf_counter()
+        try:
+            self.sock.sendto(packet, (addr, 0))
+            received = await asyncio.wait_for(fut, timeout)
+        finally:
+            self._waiting.pop(seq, None)
+        return (received - sent) * 1000
+
+def _nameserver():
+    try:
+        with open("/etc/resolv.conf", 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == "nameserver":
+                    return parts[1]
+    except OSError:
+        pass
+    return "127.0.0.53"
+
+class _DnsProtocol(asyncio.DatagramProtocol):
+    def __init__(self, waiting):
+        self.waiting = waiting
+
+    def datagram_received(self, data, addr):
+        if len(data) >= 12:
+            fut = self.waiting.pop(struct.unpack("!H", data[:2])[0], None)
+            if fut and not fut.done():
+                fut.set_result(data)
+
+class DnsClient:
+    """A-record queries over one UDP socket, matched by transaction id."""
+
+    RCODES = {1: "FORMERR", 2: "SERVFAIL", 3: "NXDOMAIN", 5: "REFUSED"}
+
+    def __init__(self, nameserver=None, port=53):
+        self.server = (nameserver or _nameserver(), port)
+        self.transport = None
+        self._waiting = {}
+        self._ids = itertools.count(random.randrange(0xffff))
+
+    async def _ensure(self):
+        if self.transport is None:
+            self.transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                lambda: _DnsProtocol(self._waiting), remote_addr=self.server)
+
+    @staticmethod
+    def build_query(qid, name):
+        qname = b"".join(bytes([len(label)]) + label.encode("idna") for label in name.rstrip(".").split(".")) + b"\0"
+        return struct.pack("!HHHHHH", qid, 0x0100, 1, 0, 0, 0) + qname + struct.pack("!HH", 1, 1)
+
+    @staticmethod
+    def _skip_name(data, pos):
+        while True:
+            length = data[pos]
+            if length & 0xc0:
+                return pos + 2
+            if length == 0:
+                return pos + 1
+            pos += length + 1
+
+    @classmethod
+    def parse_answer(cls, data):
+        """(rcode, [IPv4 addresses]) from a response."""
+        _, flags, qd, an, _, _ = struct.unpack("!HHHHHH", data[:12])
+        pos = 12
+        for _ in range(qd):
+            pos = cls._skip_name(data, pos) + 4
+        addrs = []
+        for _ in range(an):
+            pos = cls._skip_name(data, pos)
+            rtype, _, _, rdlen = struct.unpack("!HHIH", data[pos:pos + 10])
+            pos += 10
+            if rtype == 1 and rdlen == 4:
+                addrs.append(socket.inet_ntoa(data[pos:pos + 4]))
+            pos += rdlen
+        return flags & 0x0f, addrs
+
+    async def resolve(self, name, timeout=TIMEOUT):
+        """(ms, [addresses]); raises LookupError on an error rcode."""
+        await self._ensure()
+        qid = next(self._ids) & 0xffff
+        fut = asyncio.get_running_loop().create_future()
+        self._waiting[qid] = fut
+        started = time.perf_counter()
+        try:
+            self.transport.sendto(self.build_query(qid, name))
+            data = await asyncio.wait_for(fut, timeout)
+        finally:
+            self._waiting.pop(qid, None)
+        ms = (time.perf_counter() - started) * 1000
+        rcode, addrs = self.parse_answer(data)
+        if rcode:
+            raise LookupError(self.RCODES.get(rcode, f"rcode {rcode}"))
+        return ms, addrs
+
+async def tcp_connect(host, port, timeout=TIMEOUT):
+    started = time.perf_counter()
+    _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    ms = (time.perf_counter() - started) * 1000
+    writer.close()
+    return ms
+
+async def http_get(url, timeout=TIMEOUT):
+    """(ms to status line, status code). Certificates are not verified: /cert covers them."""
+    parts = urlsplit(url)
+    https = parts.scheme == "https"
+    port = parts.port or (443 if https else 80)
+    ctx = None
+    if https:
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+    started = time.perf_counter()
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, port, ssl=ctx, server_hostname=parts.hostname if https else None),
+            timeout,
+        )
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nUser-Agent: bdrman-probe\r\nConnection: close\r\n\r\n".encode())
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        ms = (time.perf_counter() - started) * 1000
+        fields = status_line.split()
+        if len(fields) < 2 or not fields[1].isdigit():
+            raise ValueError("bad HTTP response")
+        return ms, int(fields[1])
+    finally:
+        if writer:
+            writer.close()
+
+def parse_target(spec):
+    """Config entry -> (kind, name): URLs are HTTP, host:port is TCP, anything else ping."""
+    if spec.startswith(("http://", "https://")):
+        return HTTP, spec
+    if ":" in spec:
+        return TCP, spec
+    return PING, spec
+
+class ProbeEngine:
+    def __init__(self, nameserver=None, concurrency=CONCURRENCY):
+        self.targets = {}
+        self.icmp = IcmpPinger()
+        self.dns = DnsClient(nameserver)
+        self._heap = []
+        self._sem = asyncio.Semaphore(concurrency)
+        self._tasks = set()
+
+    def add(self, kind, name, interval=None, adhoc=False):
+        key = f"{kind}:{name}"
+        t = self.targets.get(key)
+        if t is None:
+            t = self.targets[key] = Target(kind, name, interval, adhoc)
+            # Spread the first round over the interval instead of a burst
+            heapq.heappush(self._heap, (time.monotonic() + random.uniform(0, t.interval), key))
+        elif t.adhoc_until:
+            if adhoc:
+                t.adhoc_until = time.time() + ADHOC_TTL
+            else:
+                t.adhoc_until = None
+        return t
+
+    def get(self, kind, name):
+        return self.targets.get(f"{kind}:{name}")
+
+    def discover(self):
+        """CapRover app endpoints plus PROBE_TARGETS from the bot config."""
+        from bdrbot import tlsscan
+        for domain in tlsscan.discover_caprover():
+            self.add(HTTP, f"https://{domain}/")
+            self.add(DNS, domain)
+        for spec in core.PROBE_TARGETS.split() or DEFAULT_PING_TARGETS:
+            self.add(*parse_target(spec))
+
+    async def _address(self, t, host):
+        if t.addr is None or time.time() - t.addr_at > REDISCOVER_INTERVAL:
+            try:
+                socket.inet_aton(host)
+                t.addr = host
+            except OSError:
+                _, addrs = await self.dns.resolve(host)
+                if not addrs:
+                    raise LookupError("no A record")
+                t.addr = addrs[0]
+            t.addr_at = time.time()
+        return t.addr
+
+    async def probe(self, t):
+        """Run one measurement for t and record it."""
+        try:
+            if t.kind == PING:
+                addr = await self._address(t, t.name)
+                if self.icmp.available:
+                    t.record(await self.icmp.ping(addr))
+                else:
+                    t.record(await tcp_connect(addr, 443), detail="tcp/443")
+            elif t.kind == TCP:
+                host, _, port = t.name.rpartition(":")
+                addr = await self._address(t, host)
+                t.record(await tcp_connect(addr, int(port)))
+            elif t.kind == DNS:
+                ms, addrs = await self.dns.resolve(t.name)
+                t.record(ms, detail=addrs)
+            elif t.kind == HTTP:
+                ms, status = await http_get(t.name)
+                t.record(ms, f"HTTP {status}" if status >= 500 else None, detail=status)
+        except asyncio.TimeoutError:
+            t.record(None, "timeout")
+        except (OSError, LookupError, ValueError, ssl.SSLError) as e:
+            t.record(None, str(e)[:60] or type(e).__name__)
+
+    async def _probe_bounded(self, t):
+        async with self._sem:
+            await self.probe(t)
+
+    async def measure_now(self, kind, name, count=1, spacing=0.2):
+        """Probe a target immediately (adding it as an ad-hoc target) and return it."""
+        t = self.add(kind, name, adhoc=True)
+        for i in range(count):
+            if i:
+                await asyncio.sleep(spacing)
+            await self.probe(t)
+        return t
+
+    async def run(self):
+        """Scheduler loop: start every probe that is due, forever."""
+        next_discovery = 0.0
+        while True:
+            now = time.monotonic()
+            if now >= next_discovery:
+                try:
+                    await asyncio.to_thread(self.discover)
+                except Exception as e:
+                    logger.error(f"Probe discovery failed: {e}")
+                next_discovery = now + REDISCOVER_INTERVAL
+            while self._heap and self._heap[0][0] <= now:
+                _, key = heapq.heappop(self._heap)
+                t = self.targets.get(key)
+                if t is None:
+                    continue
+                if t.adhoc_until and time.time() > t.adhoc_until:
+                    del self.targets[key]
+                    continue
+                task = asyncio.ensure_future(self._probe_bounded(t))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                heapq.heappush(self._heap, (now + t.interval, key))
+            delay = self._heap[0][0] - now if self._heap else 1.0
+            await asyncio.sleep(min(max(delay, 0.01), 1.0))
+
+def fmt_ms(ms):
+    if ms is None:
+        return "-"
+    return f"{ms:.1f}ms" if ms < 100 else f"{ms:.0f}ms"
+
+def summary_line(t, minutes=SLOTS):
+    ok, errors, p50, p99 = t.hist.summary(minutes)
+    total = ok + errors
+    err = f"{errors / total * 100:.0f}%" if total else "-"
+    return ok, errors, p50, p99, err
+
+def render(targets, limit=40):
+    """Monospace table: kind, target, samples, p50, p99, error rate over the last hour."""
+    rows = []
+    for t in targets:
+        ok, errors, p50, p99, err = summary_line(t)
+        rows.append((errors / (ok + errors) if ok + errors else 0, t, ok + errors, p50, p99, err))
+    rows.sort(key=lambda r: (-r[0], r[1].key))
+    lines = [f"{'KIND':<4} {'TARGET':<28} {'N':>4} {'P50':>7} {'P99':>7} {'ERR':>4}"]
+    for _, t, n, p50, p99, err in rows[:limit]:
+        name = t.name.replace("https://", "").replace("http://", "")
+        lines.append(f"{t.kind:<4} {name[:28]:<28} {n:>4} {fmt_ms(p50):>7} {fmt_ms(p99):>7} {err:>4}")
+    if len(rows) > limit:
+        lines.append(f"... {len(rows) - limit} more")
+    return "\n".join(lines)
+
+_engine = None
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = ProbeEngine()
+    return _engine
@@ -0,0 +1,172 @@
+"""
+/proc based process sampler.
+
+Two snapshots of /proc/[pid]/stat and statm give real per-interval CPU%,
+unlike `ps` which reports the lifetime average. Processes are grouped by
+CapRover app, Docker container or systemd unit, and one sample is shared
+by every request that arrives while it is fresh or still being taken.
+"""
+import asyncio
+import os
+import re
+import time
+from bdrbot import containers
+from bdrbot.core import human_bytes
+
+PROC = "/proc"
+SAMPLE_INTERVAL = 1.0
+CACHE_TTL = 3.0
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+_DOCKER_ID_RE = re.compile(r"(?:docker-|/docker/)([0-9a-f]{64})")
+_UNIT_RE = re.compile(r"/([^/]+\.(?:service|scope))$")
+
+def _boot_time():
+    try:
+        with open(os.path.join(PROC, "stat"), 'r') as f:
+            for line in f:
+                if line.startswith("btime "):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+class Proc:
+    __slots__ = ("pid", "comm", "ticks", "rss", "start", "cpu_percent", "group")
+
+    def __init__(self, pid, comm, ticks, rss, start):
+        self.pid = pid
+        self.comm = comm
+        self.ticks = ticks
+        self.rss = rss
+        self.start = start
+        self.cpu_percent = 0.0
+        self.group = "-"
+
+def read_proc(pid):
+    """One process from /proc, or None if it exited meanwhile."""
+    try:
+        with open(f"{PROC}/{pid}/stat", 'r') as f:
+            stat = f.read()
+        with open(f"{PROC}/{pid}/statm", 'r') as f:
+            rss_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    # comm may contain spaces and parens: it ends at the last ')'
+    end = stat.rfind(")")
+    comm = stat[stat.find("(") + 1:end]
+    fields = stat[end + 2:].split()
+    # fields[0] is state (field 3); utime/stime are 14/15, starttime is 22
+    ticks = int(fields[11]) + int(fields[12])
+    return Proc(pid, comm, ticks, rss_pages * PAGE_SIZE, int(fields[19]))
+
+def snapshot():
+    procs = {}
+    with os.scandir(PROC) as it:
+        for entry in it:
+            if entry.name.isdigit():
+                p = read_proc(int(entry.name))
+                if p:
+                    procs[p.pid] = p
+    return procs
+
+class ProcessSampler:
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self._groups = {}       # (pid, start) -> group label
+        self._boot = _boot_time()
+        self._last = None
+        self._last_at = 0.0
+        self._inflight = None
+
+    def group_of(self, p):
+        key = (p.pid, p.start)
+        group = self._groups.get(key)
+        if group is None:
+            group = "kernel" if p.rss == 0 else "other"
+            try:
+                with open(f"{PROC}/{p.pid}/cgroup", 'r') as f:
+                    cgroup = f.read()
+            except OSError:
+                cgroup = ""
+            m = _DOCKER_ID_RE.search(cgroup)
+            if m:
+                name = containers.get_collector().name_of(m.group(1))
+                app = containers.app_name(name)
+                group = f"app:{app}" if app else f"ctr:{containers.service_name(name)}"
+            else:
+                # Prefer the unified hierarchy (0::) line, else the systemd one
+                for line in cgroup.splitlines():
+                    if line.startswith("0::") or "name=systemd" in line:
+                        um = _UNIT_RE.search(line.strip())
+                        if um:
+                            group = um.group(1).replace(".service", "")
+                            break
+            self._groups[key] = group
+        return group
+
+    def _measure(self):
+        before = snapshot()
+        t0 = time.monotonic()
+        time.sleep(self.interval)
+        after = snapshot()
+        dt = time.monotonic() - t0
+        now = time.time()
+        for pid, p in after.items():
+            prev = before.get(pid)
+            if prev and prev.start == p.start:
+                used, window = p.ticks - prev.ticks, dt
+            else:
+                # Started during the window: average over its own lifetime
+                used = p.ticks
+                window = max(now - (self._boot + p.start / CLK_TCK), 0.01)
+            p.cpu_percent = used / CLK_TCK / window * 100
+            p.group = self.group_of(p)
+        alive = {(p.pid, p.start) for p in after.values()}
+        self._groups = {k: v for k, v in self._groups.items() if k in alive}
+        return list(after.values())
+
+    async def sample(self):
+        """Processes with interval CPU%; concurrent callers share one measurement."""
+        if self._last is not None and time.monotonic() - self._last_at < CACHE_TTL:
+            return self._last
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._refresh())
+        return await asyncio.shield(self._inflight)
+
+    async def _refresh(self):
+        try:
+            result = await asyncio.to_thread(self._measure)
+            self._last, self._last_at = result, time.monotonic()
+            return result
+        finally:
+            self._inflight = None
+
+def top_table(procs, by="cpu", limit=12):
+    key = (lambda p: p.cpu_percent) if by == "cpu" else (lambda p: p.rss)
+    lines = [f"{'PID':>7} {'CPU%':>6} {'RSS':>8}  {'NAME':<15} GROUP"]
+    for p in sorted(procs, key=key, reverse=True)[:limit]:
+        lines.append(f"{p.pid:>7} {p.cpu_percent:>6.1f} {human_bytes(p.rss):>8}  {p.comm[:15]:<15} {p.group[:20]}")
+    return "\n".join(lines)
+
+def group_table(procs, by="cpu", limit=12):
+    groups = {}
+    for p in procs:
+        g = groups.setdefault(p.group, [0.0, 0, 0])
+        g[0] += p.cpu_percent
+        g[1] += p.rss
+        g[2] += 1
+    idx = 0 if by == "cpu" else 1
+    lines = [f"{'GROUP':<22} {'CPU%':>6} {'RSS':>8} {'N':>4}"]
+    for name, (cpu, rss, n) in sorted(groups.items(), key=lambda kv: kv[1][idx], reverse=True)[:limit]:
+        lines.append(f"{name[:22]:<22} {cpu:>6.1f} {human_bytes(rss):>8} {n:>4}")
+    return "\n".join(lines)
+
+_sampler = None
+
+def get_sampler():
+    global _sampler
+    if _sampler is None:
+        _sampler = ProcessSampler()
+    return _sampler
@@ -0,0 +1,189 @@
+"""
+Declarative command registry.
+
+Every bot command is listed exactly once in COMMANDS. The same table drives
+handler registration and the /help menu. Handler modules are only imported
+the first time one of their commands is used, so startup stays cheap.
+"""
+import functools
+import importlib
+from bdrbot import core
+from bdrbot.scheduler import get_scheduler, EMERGENCY, NORMAL, LOW
+from bdrbot.handlers import PIN_STATE, VPN_MENU, VPN_ADD_NAME, VPN_SELECT_QR, VPN_SELECT_DELETE
+
+# (command, description, category, "module:function")
+# A handler of None means the command is the entry point of a conversation
+# defined in CONVERSATIONS below.
+COMMANDS = [
+    ("start", "Start bot", "General", "general:start"),
+    ("help", "Show this menu", "General", "general:help_cmd"),
+    ("version", "Show version info", "General", "general:version_cmd"),
+    ("status", "System status dashboard", "Monitoring", "monitoring:status"),
+    ("health", "Health check", "Monitoring", "monitoring:health_cmd"),
+    ("alerts", "Monitor's active alerts [history]", "Monitoring", "monitoring:alerts_cmd"),
+    ("top", "Top CPU processes", "Monitoring", "monitoring:top_cmd"),
+    ("mem", "Top RAM processes", "Monitoring", "monitoring:mem_cmd"),
+    ("disk", "Disk usage", "Monitoring", "monitoring:disk_cmd"),
+    ("du", "What filled the disk", "Monitoring", "monitoring:du_cmd"),
+    ("search", "Search logs: <term> [6h]", "Monitoring", "monitoring:search_cmd"),
+    ("report", "Period report [day|week|month]", "Monitoring", "monitoring:report_cmd"),
+    ("uptime", "System uptime", "Monitoring", "monitoring:uptime_cmd"),
+    ("docker", "List containers (stats: leaderboard)", "Docker", "docker:docker_list"),
+    ("logs", "View container logs", "Docker", "docker:logs_cmd"),
+    ("restart", "Restart container", "Docker", "docker:restart_cmd"),
+    ("dockerclean", "Reclaim Docker space [plan|run N..|run safe]", "Docker", "docker:dockerclean_cmd"),
+    ("network", "Network stats", "Network", "network:network_cmd"),
+    ("ports", "Open ports", "Network", "network:ports_cmd"),
+    ("ping", "Ping host", "Network", "network:ping_cmd"),
+    ("dns", "DNS lookup", "Network", "network:dns_cmd"),
+    ("probe", "Probe latency p50/p99 [filter]", "Network", "network:probe_cmd"),
+    ("speedtest", "Run speedtest", "Network", "network:speedtest_cmd"),
+    ("ssl", "Check SSL expiry", "Security", "security:ssl_cmd"),
+    ("cert", "Expiry of all TLS domains", "Security", "security:cert_cmd"),
+    ("firewall", "Show UFW status", "Security", "security:firewall_cmd"),
+    ("block", "Block IP", "Security", "security:block_cmd"),
+    ("unblock", "Unblock IP", "Security", "security:unblock_cmd"),
+    ("panic", "Enable Panic Mode", "Security", "security:panic_cmd"),
+    ("unpanic", "Disable Panic Mode", "Security", "security:unpanic_cmd"),
+    ("users", "Logged in users", "Security", "security:users_cmd"),
+    ("last", "Last logins", "Security", "security:last_cmd"),
+    ("vpn", "VPN clients [list|add a b|qr|del]", "Security", None),
+    ("backup", "Backup management", "System", "system:backup_cmd"),
+    ("update", "Update system packages", "System", "system:update_cmd"),
+    ("updatebdr", "Update BDRman", "System", "system:updatebdr_cmd"),
+    ("export", "Export config", "System", "system:export_cmd"),
+    ("import", "Converge to an export (reply) [apply]", "System", "system:import_cmd"),
+    ("services", "Service status", "System", "system:services_cmd"),
+    ("running", "Running services", "System", "system:running_cmd"),
+    ("nginx", "Nginx status", "System", "system:nginx_cmd"),
+    ("kernel", "Kernel info", "System", "system:kernel_cmd"),
+    ("reboot", "Reboot server", "System", "system:reboot_cmd"),
+    ("snapshot", "Create system snapshot", "System", None),
+    ("jobs", "Background jobs", "System", "jobs:jobs_cmd"),
+    ("sched", "Scheduler queues and load shedding", "System", "general:sched_cmd"),
+    ("audit", "Who ran what [cmd|user|status]", "System", "general:audit_cmd"),
+    ("fleet", "Fleet hosts and agent health [@hosts]", "System", "general:fleet_cmd"),
+    ("cancel", "Cancel a background job", "System", "jobs:cancel_job_cmd"),
+    ("capstatus", "CapRover status", "CapRover", "caprover:capstatus_cmd"),
+    ("capapps", "List CapRover apps", "CapRover", "caprover:capapps_cmd"),
+    ("caplogs", "App logs", "CapRover", "caprover:caplogs_cmd"),
+    ("caprestart", "Restart app/core", "CapRover", "caprover:caprestart_cmd"),
+    ("capinfo", "CapRover info", "CapRover", "caprover:capinfo_cmd"),
+    ("captop", "App resource leaderboard", "CapRover", "caprover:captop_cmd"),
+]
+
+# Scheduler lanes (everything else is NORMAL). Emergency commands must land
+# even when the box is overloaded; low priority ones are heavy and read-only.
+EMERGENCY_COMMANDS = {"block", "unblock", "panic", "unpanic", "restart", "caprestart", "reboot", "cancel"}
+LOW_PRIORITY_COMMANDS = {
+    "status", "health", "alerts", "top", "mem", "disk", "logs", "network", "ports", "speedtest",
+    "cert", "services", "running", "nginx", "export", "capstatus", "capapps", "caplogs", "capinfo",
+}
+
+# Commands that always run here, even with @targets (they take selectors themselves)
+LOCAL_COMMANDS = {"fleet"}
+
+def lane_for(cmd):
+    if cmd in EMERGENCY_COMMANDS:
+        return EMERGENCY
+    if cmd in LOW_PRIORITY_COMMANDS:
+        return LOW
+    return NORMAL
+
+# Conversations: entry command -> entry handler, text handlers per state
+CONVERSATIONS = {
+    "snapshot": {
+        "entry": "system:pin_request",
+        "states": {PIN_STATE: "system:pin_verify"},
+    },
+    "vpn": {
+        "entry": "vpn:vpn_start",
+        "states": {
+            VPN_MENU: "vpn:vpn_menu_handler",
+            VPN_ADD_NAME: "vpn:vpn_add_handler",
+            VPN_SELECT_QR: "vpn:vpn_qr_handler",
+            VPN_SELECT_DELETE: "vpn:vpn_delete_handler",
+        },
+        "allow_reentry": True,
+    },
+}
+
+CANCEL_HANDLER = "system:cancel"
+
+# Inline keyboard buttons: (callback_data pattern, audit name, "module:function")
+CALLBACKS = [
+    (r"^pg:", "page", "general:page_callback"),
+]
+
+_resolved = {}
+
+def resolve(spec):
+    """Import the handler module for "module:function" and return the function."""
+    func = _resolved.get(spec)
+    if func is None:
+        module_name, func_name = spec.split(":")
+        module = importlib.import_module(f"bdrbot.handlers.{module_name}")
+        func = getattr(module, func_name)
+        _resolved[spec] = func
+    return func
+
+def _fleet_targets(context):
+    """True for `/cmd @hosts ...` naming configured hosts: the command goes to fleet agents (see bdrbot.fleet)."""
+    args = getattr(context, "args", None) or ()
+    if not args or len(args[0]) < 2 or not args[0].startswith("@"):
+        return False
+    from bdrbot import fleet
+    return bool(fleet.split_targets(args, fleet.load_hosts())[1])
+
+def lazy(spec, name=None, lane=NORMAL):
+    """Return a coroutine callback that imports its real handler on first call
+    and runs it through the priority scheduler."""
+    name = name or spec.split(":")[1]
+    async def _handler(update, context):
+        if name not in LOCAL_COMMANDS and _fleet_targets(context):
+            from bdrbot import fleet
+            fan_lane = EMERGENCY if lane == EMERGENCY else NORMAL
+            return await get_scheduler().run(fan_lane, name, functools.partial(fleet.dispatch, name), update, context)
+        return await get_scheduler().run(lane, name, resolve(spec), update, context)
+    _handler.__name__ = spec.replace(":", ".")
+    return _handler
+
+@functools.lru_cache(maxsize=None)
+def help_text():
+    """Render the /help menu once; the command table never changes at runtime."""
+    cats = {}
+    for cmd, desc, cat, _ in COMMANDS:
+        cats.setdefault(cat, []).append((cmd, desc))
+
+    msg = f"🤖 *BDRman v{core.get_version()}*\n `{core.SERVER_NAME}`\n\n"
+    for cat, cmds in sorted(cats.items()):
+        msg += f"*{cat}*\n"
+        for cmd, desc in cmds:
+            msg += f"/{cmd} - {desc}\n"
+        msg += "\n"
+    return msg
+
+def register_handlers(app):
+    """Add every command and conversation from the tables to the application."""
+    from telegram.ext import CallbackQueryHandler, CommandHandler, ConversationHandler, MessageHandler, filters
+
+    text_only = filters.TEXT & ~filters.COMMAND
+    for cmd, conv in CONVERSATIONS.items():
+        app.add_handler(ConversationHandler(
+            entry_points=[CommandHandler(cmd, lazy(conv["entry"], cmd))],
+            states={
+                state: [MessageHandler(text_only, lazy(spec, cmd))]
+                for state, spec in conv["states"].items()
+            },
+            fallbacks=[CommandHandler("cancel", lazy(CANCEL_HANDLER, "cancel"))],
+            allow_reentry=conv.get("allow_reentry", False)
+        ))
+
+    # Plain commands after conversations, so /cancel inside a conversation
+    # ends the conversation instead of reaching the job canceller
+    for cmd, _, _, spec in COMMANDS:
+        if spec is not None:
+            app.add_handler(CommandHandler(cmd, lazy(spec, cmd, lane_for(cmd))))
+    for pattern, name, spec in CALLBACKS:
+        app.add_handler(CallbackQueryHandler(lazy(spec, name), pattern=pattern))
+    return len(COMMANDS)
@@ -0,0 +1,177 @@
+"""
+Priority scheduler in front of command execution.
+
+Three lanes:
+  emergency - /block, /panic, /restart...: own capacity and own shell threads,
+              never waits behind other work
+  normal    - everything else, shares the general pool
+  low       - heavy read-only commands (/speedtest, /status, log dumps);
+              limited further, and deferred or shed while the host is
+              under CPU or memory pressure
+"""
+import asyncio
+import os
+import time
+from bdrbot import core, audit
+from bdrbot.core import logger
+
+EMERGENCY, NORMAL, LOW = "emergency", "normal", "low"
+LANES = (EMERGENCY, NORMAL, LOW)
+
+EMERGENCY_SLOTS = 4     # reserved, not shared with the other lanes
+GENERAL_SLOTS = 6       # normal + low
+LOW_SLOTS = 2           # of the general slots, at most this many low
+
+# Host pressure: defer low priority work above these
+LOAD_PER_CPU_LIMIT = 1.5
+MEMORY_LIMIT = 90
+PRESSURE_TTL = 2        # seconds to reuse a pressure sample
+DEFER_TIMEOUT = 30      # seconds a deferred command waits before being shed
+
+class LaneStats:
+    def __init__(self):
+        self.waiting = 0
+        self.running = 0
+        self.done = 0
+        self.failed = 0
+        self.deferred = 0
+        self.shed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, waited):
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    @property
+    def avg_wait_ms(self):
+        started = self.done + self.failed + self.running
+        return self.total_wait / started * 1000 if started else 0.0
+
+class Scheduler:
+    def __init__(self):
+        self._emergency = asyncio.Semaphore(EMERGENCY_SLOTS)
+        self._general = asyncio.Semaphore(GENERAL_SLOTS)
+        self._low = asyncio.Semaphore(LOW_SLOTS)
+        self.stats = {lane: LaneStats() for lane in LANES}
+        self._pressure = (0.0, None)
+
+    def pressure(self):
+        """(load per CPU, memory %, reason or None), sampled at most every PRESSURE_TTL."""
+        sampled_at, value = self._pressure
+        if value is not None and time.monotonic() - sampled_at < PRESSURE_TTL:
+            return value
+        import psutil
+        load = os.getloadavg()[0] / (os.cpu_count() or 1)
+        mem = psutil.virtual_memory().percent
+        reason = None
+        if load > LOAD_PER_CPU_LIMIT:
+            reason = f"load {load:.2f}/CPU"
+        elif mem > MEMORY_LIMIT:
+            reason = f"memory {mem:.0f}%"
+        value = (load, mem, reason)
+        self._pressure = (time.monotonic(), value)
+        return value
+
+    async def _wait_for_headroom(self, update, name):
+        """Hold low priority work while the host is overloaded; False means shed."""
+        reason = self.pressure()[2]
+        if not reason:
+            return True
+        stats = self.stats[LOW]
+        stats.deferred += 1
+        logger.info(f"Deferring /{name}: {reason}")
+        if update.effective_message:
+            await update.effective_message.reply_text(f"⏳ Server under pressure ({reason}), /{name} deferred...")
+        deadline = time.monotonic() + DEFER_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(PRESSURE_TTL)
+            if not self.pressure()[2]:
+                return True
+        stats.shed += 1
+        logger.warning(f"Shed /{name}: {reason}")
+        if update.effective_message:
+            await update.effective_message.reply_text(f"🚫 /{name} dropped, server still under pressure. Try again later.")
+        return False
+
+    async def run(self, lane, name, callback, update, context):
+        stats = self.stats[lane]
+        record = audit.start(update, name, lane)
+        started = time.perf_counter()
+        try:
+            if lane == LOW and not await self._wait_for_headroom(update, name):
+                record["status"] = "shed"
+                return None
+            return await self._run_admitted(lane, name, callback, update, context, stats, record)
+        finally:
+            audit.finish(record, started)
+
+    async def _run_admitted(self, lane, name, callback, update, context, stats, record):
+        queued_at = time.monotonic()
+        stats.waiting += 1
+        try:
+            if lane == EMERGENCY:
+                await self._emergency.acquire()
+            else:
+                if lane == LOW:
+                    await self._low.acquire()
+                try:
+                    await self._general.acquire()
+                except BaseException:
+                    # Cancelled while queued for a general slot: give the LOW slot back
+                    if lane == LOW:
+                        self._low.release()
+                    raise
+        finally:
+            stats.waiting -= 1
+        waited = time.monotonic() - queued_at
+        stats.record_wait(waited)
+        record["wait_ms"] = round(waited * 1000)
+
+        stats.running += 1
+        token = core.emergency_lane.set(lane == EMERGENCY)
+        audit_token = core.audit_record.set(record)
+        try:
+            result = await callback(update, context)
+            stats.done += 1
+            return result
+        except Exception as e:
+            stats.failed += 1
+            record["status"] = "error"
+            record["error"] = str(e)[:200]
+            raise
+        finally:
+            core.audit_record.reset(audit_token)
+            core.emergency_lane.reset(token)
+            stats.running -= 1
+            if lane == EMERGENCY:
+                self._emergency.release()
+            else:
+                self._general.release()
+                if lane == LOW:
+                    self._low.release()
+
+    def render_stats(self):
+        load, mem, reason = self.pressure()
+        msg = "🚦 *Scheduler*\n\n"
+        msg += f"Load/CPU: `{load:.2f}` (limit {LOAD_PER_CPU_LIMIT})\n"
+        msg += f"Memory: `{mem:.0f}%` (limit {MEMORY_LIMIT}%)\n"
+        msg += f"{'🔴 Shedding low priority: ' + reason if reason else '🟢 No pressure'}\n\n"
+        for lane in LANES:
+            s = self.stats[lane]
+            msg += (
+                f"*{lane}*\n"
+                f"  queued `{s.waiting}` running `{s.running}` done `{s.done}` failed `{s.failed}`\n"
+                f"  wait avg `{s.avg_wait_ms:.0f}ms` max `{s.max_wait * 1000:.0f}ms`\n"
+            )
+            if lane == LOW:
+                msg += f"  deferred `{s.deferred}` shed `{s.shed}`\n"
+        return msg
+
+_scheduler = None
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler()
+    return _scheduler
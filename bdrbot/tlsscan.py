@@ -0,0 +1,310 @@
+"""
+Concurrent TLS certificate expiry scanner.
+
+Domains come from the CapRover config (apps with SSL enabled, the root
+dashboard) and from nginx server blocks listening on 443. Handshakes run
+on the event loop with bounded parallelism; the peer certificate is read
+without verification, so expired and self-signed certificates are still
+reported. Results are cached and a background sweep alerts once per
+threshold as expiry approaches.
+"""
+import asyncio
+import glob
+import json
+import os
+import re
+import ssl
+import time
+from datetime import datetime, timezone
+from bdrbot import core
+from bdrbot.core import logger
+
+CAPROVER_CONFIG = "/captain/data/config-captain.json"
+NGINX_CONF_GLOBS = (
+    "/etc/nginx/sites-enabled/*",
+    "/etc/nginx/conf.d/*.conf",
+    "/captain/generated/nginx/conf.d/*.conf",
+)
+STATE_FILE = os.path.join(core.STATE_DIR, "tls_scan.json")
+
+CONCURRENCY = 20
+HANDSHAKE_TIMEOUT = 10
+CACHE_TTL = 6 * 3600
+SWEEP_INTERVAL = 6 * 3600
+SWEEP_DELAY = 60            # first sweep after startup
+ALERT_DAYS = (14, 7, 3, 1)  # alert once when crossing each of these
+
+_SERVER_NAME_RE = re.compile(r"server_name\s+([^;]+);")
+_LISTEN_TLS_RE = re.compile(r"listen\s+[^;]*(?:443|ssl)")
+_IP_RE = re.compile(r"^[\d.]+$|:")
+
+def discover_caprover(path=CAPROVER_CONFIG):
+    """SSL enabled domains from CapRover: root dashboard, default subdomains, custom domains."""
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return set()
+    domains = set()
+    root = data.get("customDomain")
+    if root and data.get("hasRootSsl"):
+        domains.add(f"captain.{root}")
+    for name, app in (data.get("appDefinitions") or {}).items():
+        if root and app.get("hasDefaultSubDomainSsl"):
+            domains.add(f"{name}.{root}")
+        for cd in app.get("customDomain") or []:
+            if cd.get("hasSsl") and cd.get("publicDomain"):
+                domains.add(cd["publicDomain"])
+    return domains
+
+def discover_nginx(patterns=NGINX_CONF_GLOBS):
+    """server_name entries of nginx server blocks that listen for TLS."""
+    domains = set()
+    for pattern in patterns:
+        for path in glob.glob(pattern):
+            try:
+                with open(path, 'r', errors='replace') as f:
+                    conf = f.read()
+            except OSError:
+                continue
+            for block in re.split(r"\bserver\s*\{", conf)[1:]:
+                if not _LISTEN_TLS_RE.search(block):
+                    continue
+                for m in _SERVER_NAME_RE.finditer(block):
+                    for name in m.group(1).split():
+                        if name in ("_", "localhost") or name.startswith(("~", "*", "$")) or _IP_RE.search(name):
+                            continue
+                        domains.add(name.lower().rstrip("."))
+    return domains
+
+def discover():
+    return sorted(discover_caprover() | discover_nginx())
+
+# Minimal DER walk: only the fields needed for expiry, no extra dependency
+
+def _der(data, pos):
+    """(tag, content start, content end) of the element at pos."""
+    tag, length = data[pos], data[pos + 1]
+    pos += 2
+    if length & 0x80:
+        n = length & 0x7f
+        length = int.from_bytes(data[pos:pos + n], "big")
+        pos += n
+    return tag, pos, pos + length
+
+def _der_time(tag, raw):
+    text = raw.decode("ascii").rstrip("Z")
+    fmt = "%y%m%d%H%M%S" if tag == 0x17 else "%Y%m%d%H%M%S"
+    return datetime.strptime(text, fmt).replace(tzinfo=timezone.utc).timestamp()
+
+def parse_certificate(der):
+    """(not_before, not_after, self_signed) from a DER certificate."""
+    _, pos, _ = _der(der, 0)             # Certificate
+    _, pos, _ = _der(der, pos)           # tbsCertificate
+    tag, start, end = _der(der, pos)
+    if tag == 0xa0:                      # [0] version
+        pos = end
+    _, _, pos = _der(der, pos)           # serialNumber
+    _, _, pos = _der(der, pos)           # signature
+    _, start, pos = _der(der, pos)       # issuer
+    issuer = der[start:pos]
+    _, start, validity_end = _der(der, pos)
+    tag, s, e = _der(der, start)
+    not_before = _der_time(tag, der[s:e])
+    tag, s, e = _der(der, e)
+    not_after = _der_time(tag, der[s:e])
+    _, start, end = _der(der, validity_end)   # subject
+    return not_before, not_after, der[start:end] == issuer
+
+class CertResult:
+    __slots__ = ("target", "not_after", "self_signed", "error", "checked_at", "alerted")
+
+    def __init__(self, target, not_after=None, self_signed=False, error=None, checked_at=None, alerted=None):
+        self.target = target
+        self.not_after = not_after
+        self.self_signed = self_signed
+        self.error = error
+        self.checked_at = checked_at or time.time()
+        self.alerted = alerted      # lowest ALERT_DAYS threshold already alerted for this not_after
+
+    @property
+    def days_left(self):
+        if self.not_after is None:
+            return None
+        return (self.not_after - time.time()) / 86400
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(**{k: d.get(k) for k in cls.__slots__})
+
+def split_target(target):
+    """Split "example.com" or "example.com:8443" into (host, port); ValueError for a bad port."""
+    host, sep, port = target.partition(":")
+    if not sep:
+        return host, 443
+    if not port.isdigit() or not 1 <= int(port) <= 65535:
+        raise ValueError(f"bad port {port!r}")
+    return host, int(port)
+
+async def check(target, connect_host=None, timeout=HANDSHAKE_TIMEOUT):
+    """Handshake with target and read its certificate. connect_host overrides DNS."""
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    writer = None
+    try:
+        domain, port = split_target(target)
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(connect_host or domain, port, ssl=ctx, server_hostname=domain),
+            timeout,
+        )
+        der = writer.get_extra_info("ssl_object").getpeercert(binary_form=True)
+        if not der:
+            return CertResult(target, error="no certificate")
+        _, not_after, self_signed = parse_certificate(der)
+        return CertResult(target, not_after, self_signed)
+    except asyncio.TimeoutError:
+        return CertResult(target, error="timeout")
+    except (OSError, ssl.SSLError, ValueError, IndexError) as e:
+        return CertResult(target, error=str(e)[:80] or type(e).__name__)
+    finally:
+        if writer:
+            writer.close()
+
+class TLSScanner:
+    def __init__(self, state_file=STATE_FILE, concurrency=CONCURRENCY, ttl=CACHE_TTL):
+        self.state_file = state_file
+        self.ttl = ttl
+        self.concurrency = concurrency
+        self.results = {}
+        self.last_sweep = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.state_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.last_sweep = data.get("last_sweep")
+        for d in data.get("results", []):
+            r = CertResult.from_dict(d)
+            self.results[r.target] = r
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            tmp = self.state_file + ".tmp"
+            with open(tmp, 'w') as f:
+                json.dump({"last_sweep": self.last_sweep, "results": [r.to_dict() for r in self.results.values()]}, f)
+            os.replace(tmp, self.state_file)
+        except OSError as e:
+            logger.error(f"Cannot save TLS scan state: {e}")
+
+    def fresh(self, target):
+        r = self.results.get(target)
+        return r is not None and time.time() - r.checked_at < self.ttl
+
+    async def scan(self, targets, force=False, connect_host=None, adhoc=False):
+        """Results for targets; cached ones younger than the TTL are reused.
+
+        adhoc (one-off /ssl checks): targets not already tracked are checked but not cached.
+        """
+        sem = asyncio.Semaphore(self.concurrency)
+        found = {}
+
+        async def one(target):
+            async with sem:
+                result = await check(target, connect_host)
+            prev = self.results.get(target)
+            # Keep alert progress while the certificate is the same one
+            if prev and prev.not_after == result.not_after:
+                result.alerted = prev.alerted
+            found[target] = result
+            if prev or not adhoc:
+                self.results[target] = result
+
+        stale = [t for t in targets if force or not self.fresh(t)]
+        if stale:
+            await asyncio.gather(*(one(t) for t in stale))
+            self._save()
+        return [found.get(t) or self.results[t] for t in targets]
+
+    def forget_except(self, targets):
+        """Drop cached results for domains discovery no longer returns."""
+        keep = set(targets)
+        for target in [t for t in self.results if t not in keep]:
+            del self.results[target]
+
+    def due_alerts(self, results):
+        """(result, threshold) for results that crossed a new ALERT_DAYS threshold."""
+        due = []
+        for r in results:
+            days = r.days_left
+            if days is None:
+                continue
+            crossed = [t for t in ALERT_DAYS if days <= t]
+            if crossed and (r.alerted is None or min(crossed) < r.alerted):
+                due.append((r, min(crossed)))
+        return due
+
+    async def sweep(self, bot=None):
+        """Scan every discovered domain and send alerts for those close to expiry."""
+        targets = await asyncio.to_thread(discover)
+        self.forget_except(targets)
+        results = await self.scan(targets)
+        self.last_sweep = time.time()
+        due = self.due_alerts(results)
+        if due and bot and core.CHAT_ID:
+            msg = f"🔒 *Certificate expiry* - `{core.SERVER_NAME}`\n\n"
+            for r, _ in sorted(due, key=lambda d: d[0].not_after):
+                days = r.days_left
+                state = "EXPIRED" if days < 0 else f"{days:.0f} days left"
+                msg += f"{'🔴' if days <= 3 else '🟡'} `{r.target}`: {state}\n"
+            try:
+                await bot.send_message(chat_id=core.CHAT_ID, text=msg, parse_mode='Markdown')
+            except Exception as e:
+                # Not marked: the next sweep tries again
+                logger.error(f"Certificate alert failed: {e}")
+            else:
+                for r, threshold in due:
+                    r.alerted = threshold
+        self._save()
+        logger.info(f"TLS sweep: {len(targets)} domains, {len(due)} alerts")
+        return results
+
+    async def sweep_loop(self, bot):
+        await asyncio.sleep(SWEEP_DELAY)
+        while True:
+            try:
+                await self.sweep(bot)
+            except Exception as e:
+                logger.error(f"TLS sweep failed: {e}")
+            await asyncio.sleep(SWEEP_INTERVAL)
+
+def render(results, limit=40):
+    """Monospace table, soonest expiry and failures first."""
+    def key(r):
+        return (r.days_left is not None, r.days_left if r.days_left is not None else 0)
+    lines = []
+    for r in sorted(results, key=key)[:limit]:
+        days = r.days_left
+        if days is None:
+            lines.append(f"{'ERR':>5}  {r.target[:32]}  {r.error}")
+        else:
+            flag = " self-signed" if r.self_signed else ""
+            lines.append(f"{days:>5.0f}  {r.target[:32]}{flag}")
+    if len(results) > limit:
+        lines.append(f"... {len(results) - limit} more")
+    return "DAYS   DOMAIN\n" + "\n".join(lines)
+
+_scanner = None
+
+def get_scanner():
+    global _scanner
+    if _scanner is None:
+        _scanner = TLSScanner()
+    return _scanner
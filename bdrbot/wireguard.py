@@ -0,0 +1,437 @@
+"""
+Native WireGuard peer management.
+
+Works on the layout wireguard-install.sh leaves behind (/etc/wireguard/
+params, `### Client <name>` blocks in wg0.conf) so both tools keep
+working on the same server, but needs neither the script nor `wg genkey`:
+
+- one `wg show all dump` becomes the peer table (handshakes, transfer)
+- keys are generated in Python (X25519, RFC 7748), addresses allocated
+  from the interface subnet against config and live peers
+- peers are added/removed live with a single `wg set`, and wg0.conf is
+  rewritten atomically under a lock; bulk onboarding does one of each
+- QR images are cached by config hash, so a QR is only rendered again
+  when the client config actually changed
+"""
+import base64
+import fcntl
+import hashlib
+import ipaddress
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+from bdrbot import core
+from bdrbot.core import logger, human_bytes
+
+WG_DIR = "/etc/wireguard"
+INTERFACE = "wg0"
+PARAMS_FILE = f"{WG_DIR}/params"
+CLIENT_DIR = f"{WG_DIR}/clients"
+QR_CACHE_DIR = f"{core.STATE_DIR}/wg-qr"
+QR_CACHE_MAX = 500
+NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,15}$")
+HANDSHAKE_STALE = 180       # seconds; WireGuard re-handshakes every 2 minutes when active
+
+class WireGuardError(Exception):
+    pass
+
+# --- X25519 (RFC 7748) ---
+
+_P = 2 ** 255 - 19
+_A24 = 121665
+
+def _x25519(k, u):
+    k = bytearray(k)
+    k[0] &= 248
+    k[31] &= 127
+    k[31] |= 64
+    k = int.from_bytes(k, "little")
+    x1 = int.from_bytes(u, "little") & ((1 << 255) - 1)
+    x2, z2, x3, z3, swap = 1, 0, x1, 1, 0
+    for t in reversed(range(255)):
+        bit = (k >> t) & 1
+        swap ^= bit
+        if swap:
+            x2, x3, z2, z3 = x3, x2, z3, z2
+        swap = bit
+        a, b = x2 + z2, x2 - z2
+        aa, bb = a * a % _P, b * b % _P
+        e = aa - bb
+        c, d = x3 + z3, x3 - z3
+        da, cb = d * a % _P, c * b % _P
+        x3 = (da + cb) ** 2 % _P
+        z3 = x1 * (da - cb) ** 2 % _P
+        x2 = aa * bb % _P
+        z2 = e * (aa + _A24 * e) % _P
+    if swap:
+        x2, z2 = x3, z3
+    return (x2 * pow(z2, _P - 2, _P) % _P).to_bytes(32, "little")
+
+def genkey():
+    return base64.b64encode(os.urandom(32)).decode()
+
+def pubkey(private):
+    return base64.b64encode(_x25519(base64.b64decode(private), (9).to_bytes(32, "little"))).decode()
+
+def genpsk():
+    return base64.b64encode(os.urandom(32)).decode()
+
+# --- Live state ---
+
+class Peer:
+    __slots__ = ("interface", "public_key", "endpoint", "allowed_ips", "handshake", "rx", "tx", "keepalive", "name")
+
+    def __init__(self, interface, public_key, endpoint, allowed_ips, handshake, rx, tx, keepalive, name=None):
+        self.interface = interface
+        self.public_key = public_key
+        self.endpoint = None if endpoint == "(none)" else endpoint
+        self.allowed_ips = [] if allowed_ips == "(none)" else allowed_ips.split(",")
+        self.handshake = int(handshake)     # unix time, 0 = never
+        self.rx = int(rx)
+        self.tx = int(tx)
+        self.keepalive = None if keepalive == "off" else int(keepalive)
+        self.name = name
+
+    @property
+    def online(self):
+        return self.handshake and time.time() - self.handshake < HANDSHAKE_STALE
+
+def parse_dump(text):
+    """`wg show all dump` -> {interface: {public key: Peer}}. Interface lines have 5 fields, peers 9."""
+    table = {}
+    for line in text.splitlines():
+        fields = line.split("\t")
+        if len(fields) == 5:
+            table.setdefault(fields[0], {})
+        elif len(fields) == 9:
+            table.setdefault(fields[0], {})[fields[1]] = Peer(fields[0], fields[1], *fields[3:])
+    return table
+
+def _wg(*args, input=None):
+    try:
+        result = subprocess.run(["wg", *args], input=input, capture_output=True, text=True, timeout=15)
+    except FileNotFoundError:
+        raise WireGuardError("wg not installed (bdrman vpn -> Install WireGuard)")
+    if result.returncode != 0:
+        raise WireGuardError((result.stderr or result.stdout).strip() or f"wg {args[0]} failed")
+    return result.stdout
+
+def live_peers(interface=INTERFACE):
+    """Peers of the running interface, named from the config; {} when it is down."""
+    try:
+        table = parse_dump(_wg("show", "all", "dump")).get(interface, {})
+    except WireGuardError:
+        return {}
+    names = {p["PublicKey"]: p["name"] for p in ServerConfig.load(interface).peers}
+    for peer in table.values():
+        peer.name = names.get(peer.public_key)
+    return table
+
+# --- Config ---
+
+def _conf_path(interface):
+    return f"{WG_DIR}/{interface}.conf"
+
+def load_params():
+    """KEY=value pairs from wireguard-install.sh's params file, {} if absent."""
+    params = {}
+    try:
+        with open(PARAMS_FILE) as f:
+            for line in f:
+                key, sep, value = line.strip().partition("=")
+                if sep:
+                    params[key] = value.strip().strip('"')
+    except FileNotFoundError:
+        pass
+    return params
+
+class ServerConfig:
+    """wg0.conf split into the [Interface] section and named peer blocks."""
+
+    def __init__(self, interface, head, peers):
+        self.interface = interface
+        self.head = head        # text up to the first peer
+        self.peers = peers      # [{"name", "PublicKey", "AllowedIPs", ..., "text"}]
+
+    @classmethod
+    def load(cls, interface=INTERFACE):
+        try:
+            with open(_conf_path(interface)) as f:
+                text = f.read()
+        except FileNotFoundError:
+            raise WireGuardError(f"{_conf_path(interface)} not found, set up WireGuard first")
+        # A peer block starts at its "### Client" marker, or at [Peer] for unnamed ones
+        head, blocks, previous = [], [], ""
+        for line in text.splitlines(keepends=True):
+            if line.startswith("### Client ") or (line.startswith("[Peer]") and not previous.startswith("### Client ")):
+                blocks.append([])
+            (blocks[-1] if blocks else head).append(line)
+            previous = line
+        peers = []
+        for block in map("".join, blocks):
+            m = re.match(r"### Client (\S+)", block)
+            peer = {"name": m.group(1) if m else None, "text": block.rstrip("\n") + "\n"}
+            for key, value in re.findall(r"^(\w+)\s*=\s*(.+?)\s*$", block, re.M):
+                peer[key] = value
+            peers.append(peer)
+        return cls(interface, "".join(head), peers)
+
+    def value(self, key):
+        m = re.search(rf"^{key}\s*=\s*(.+?)\s*$", self.head, re.M)
+        return m.group(1) if m else None
+
+    def render(self):
+        text = self.head.rstrip("\n") + "\n"
+        for peer in self.peers:
+            text += "\n" + peer["text"]
+        return text
+
+    def save(self):
+        """Atomic rewrite: temp file in the same directory, fsync, rename."""
+        path = _conf_path(self.interface)
+        tmp = f"{path}.tmp{os.getpid()}"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(self.render())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def find(self, name):
+        return next((p for p in self.peers if p["name"] == name), None)
+
+class _Lock:
+    """Serializes config rewrites between the bot, CLI and parallel requests."""
+
+    def __init__(self, interface):
+        self.path = f"{WG_DIR}/.{interface}.lock"
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+
+def allocate(conf, live, count):
+    """Lowest free host addresses in each interface subnet, as AllowedIPs strings."""
+    networks = [ipaddress.ip_interface(a.strip()) for a in (conf.value("Address") or "").split(",") if a.strip()]
+    v4 = next((n for n in networks if n.version == 4), None)
+    if v4 is None:
+        raise WireGuardError(f"{conf.interface}.conf has no IPv4 Address")
+    used = {n.ip for n in networks}
+    for peer in conf.peers:
+        for ip in peer.get("AllowedIPs", "").split(","):
+            if ip.strip():
+                used.add(ipaddress.ip_interface(ip.strip()).ip)
+    for peer in live.values():
+        used.update(ipaddress.ip_interface(ip).ip for ip in peer.allowed_ips)
+
+    out = []
+    for host in v4.network.hosts():
+        if host in used:
+            continue
+        addrs = [f"{host}/32"]
+        for net in networks:
+            if net.version == 6:
+                # Same host part as IPv4, like wireguard-install.sh does
+                v6 = net.network.network_address + (int(host) - int(v4.network.network_address))
+                addrs.append(f"{v6}/128")
+        out.append(",".join(addrs))
+        if len(out) == count:
+            return out
+    raise WireGuardError(f"{v4.network} is full ({len(out)} of {count} addresses free)")
+
+def _endpoint(conf, params):
+    host = params.get("SERVER_PUB_IP")
+    if not host:
+        # Address of the default route; no packet is sent
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("1.1.1.1", 53))
+            host = s.getsockname()[0]
+    if ":" in host and not host.startswith("["):
+        host = f"[{host}]"
+    return f"{host}:{params.get('SERVER_PORT') or conf.value('ListenPort') or 51820}"
+
+def client_config(conf, params, private, psk, addresses):
+    server_pub = params.get("SERVER_PUB_KEY") or pubkey(conf.value("PrivateKey"))
+    dns = ",".join(d for d in (params.get("CLIENT_DNS_1", "1.1.1.1"), params.get("CLIENT_DNS_2", "1.0.0.1")) if d)
+    return (f"[Interface]\nPrivateKey = {private}\nAddress = {addresses}\nDNS = {dns}\n\n"
+            f"[Peer]\nPublicKey = {server_pub}\nPresharedKey = {psk}\n"
+            f"Endpoint = {_endpoint(conf, params)}\nAllowedIPs = {params.get('ALLOWED_IPS', '0.0.0.0/0,::/0')}\n")
+
+def check_name(name):
+    """Client names end up in file paths: reject anything but NAME_RE."""
+    if not NAME_RE.match(name or ""):
+        raise WireGuardError(f"Invalid name: {name} (letters, digits, _ and -, max 15)")
+
+def client_path(name, interface=INTERFACE):
+    """Our client file, or the one wireguard-install.sh left in a home directory."""
+    check_name(name)
+    ours = f"{CLIENT_DIR}/{name}.conf"
+    if os.path.exists(ours):
+        return ours
+    homes = ["/root"] + (sorted(e.path for e in os.scandir("/home") if e.is_dir()) if os.path.isdir("/home") else [])
+    for home in homes:
+        for candidate in (f"{home}/{interface}-client-{name}.conf", f"{home}/{name}.conf"):
+            if os.path.exists(candidate):
+                return candidate
+    return None
+
+def _write_private(path, text):
+    tmp = f"{path}.tmp{os.getpid()}"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def add_peers(names, interface=INTERFACE):
+    """Create clients; returns [(name, client config path)]. All or nothing per call."""
+    bad = [n for n in names if not NAME_RE.match(n)]
+    if bad:
+        raise WireGuardError(f"Invalid name(s): {', '.join(bad)} (letters, digits, _ and -, max 15)")
+    if len(set(names)) != len(names):
+        raise WireGuardError("Duplicate names")
+    params = load_params()
+    os.makedirs(CLIENT_DIR, mode=0o700, exist_ok=True)
+    with _Lock(interface):
+        conf = ServerConfig.load(interface)
+        taken = [n for n in names if conf.find(n)]
+        if taken:
+            raise WireGuardError(f"Already exists: {', '.join(taken)}")
+        addresses = allocate(conf, live_peers(interface), len(names))
+
+        created, new = [], []
+        for name, addrs in zip(names, addresses):
+            private, psk = genkey(), genpsk()
+            public = pubkey(private)
+            conf.peers.append({
+                "name": name, "PublicKey": public, "PresharedKey": psk, "AllowedIPs": addrs,
+                "text": f"### Client {name}\n[Peer]\nPublicKey = {public}\nPresharedKey = {psk}\nAllowedIPs = {addrs}\n",
+            })
+            path = f"{CLIENT_DIR}/{name}.conf"
+            _write_private(path, client_config(conf, params, private, psk, addrs))
+            created.append((name, path))
+            new.append((public, psk, addrs))
+
+        conf.save()
+        _apply_live(interface, new)
+    logger.info(f"WireGuard: added {', '.join(names)}")
+    return created
+
+def _apply_live(interface, peers):
+    """One `wg set` for all new peers; preshared keys go through pipes, never argv or disk."""
+    if not os.path.exists(f"/sys/class/net/{interface}"):
+        return  # interface down: wg-quick loads the config when it comes up
+    fds, args = [], []
+    try:
+        for public, psk, addrs in peers:
+            r, w = os.pipe()
+            os.write(w, psk.encode() + b"\n")
+            os.close(w)
+            fds.append(r)
+            args += ["peer", public, "preshared-key", f"/dev/fd/{r}", "allowed-ips", addrs]
+        result = subprocess.run(["wg", "set", interface, *args], capture_output=True, text=True, timeout=15, pass_fds=fds)
+        if result.returncode != 0:
+            raise WireGuardError(f"Config saved, live update failed: {result.stderr.strip()}")
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+def remove_peer(name, interface=INTERFACE):
+    check_name(name)
+    with _Lock(interface):
+        conf = ServerConfig.load(interface)
+        peer = conf.find(name)
+        if not peer:
+            raise WireGuardError(f"No client named {name}")
+        conf.peers.remove(peer)
+        conf.save()
+        if os.path.exists(f"/sys/class/net/{interface}"):
+            _wg("set", interface, "peer", peer["PublicKey"], "remove")
+    path = client_path(name, interface)
+    if path:
+        os.remove(path)
+    logger.info(f"WireGuard: removed {name}")
+
+def qr_png(conf_path):
+    """PNG of a client config, rendered once per distinct config (qrencode)."""
+    with open(conf_path, "rb") as f:
+        data = f.read()
+    png = f"{QR_CACHE_DIR}/{hashlib.sha256(data).hexdigest()[:24]}.png"
+    if os.path.exists(png):
+        os.utime(png)
+        return png
+    os.makedirs(QR_CACHE_DIR, mode=0o700, exist_ok=True)
+    tmp = f"{png}.tmp{os.getpid()}"
+    try:
+        subprocess.run(["qrencode", "-t", "PNG", "-o", tmp], input=data, check=True, capture_output=True, timeout=15)
+    except FileNotFoundError:
+        raise WireGuardError("qrencode not installed (apt install qrencode)")
+    except subprocess.CalledProcessError as e:
+        raise WireGuardError(f"qrencode failed: {e.stderr.decode(errors='replace').strip()}")
+    os.chmod(tmp, 0o600)
+    os.replace(tmp, png)
+    _prune_qr_cache()
+    return png
+
+def _prune_qr_cache():
+    entries = sorted(os.scandir(QR_CACHE_DIR), key=lambda e: e.stat().st_mtime)
+    for entry in entries[:max(len(entries) - QR_CACHE_MAX, 0)]:
+        os.remove(entry.path)
+
+def clients(interface=INTERFACE):
+    """Named clients from the config joined with live state: [(name, addresses, Peer or None)]."""
+    conf = ServerConfig.load(interface)
+    live = live_peers(interface)
+    return [(p["name"] or p.get("PublicKey", "?")[:8], p.get("AllowedIPs", ""), live.get(p.get("PublicKey")))
+            for p in conf.peers]
+
+def _ago(ts):
+    if not ts:
+        return "never"
+    secs = time.time() - ts
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if secs >= size:
+            return f"{secs / size:.0f}{unit} ago"
+    return f"{secs:.0f}s ago"
+
+def render(rows):
+    if not rows:
+        return "No clients"
+    lines = []
+    for name, addrs, peer in rows:
+        ip = addrs.split(",")[0].split("/")[0]
+        if peer is None:
+            lines.append(f"⚪ {name:<15} {ip:<15} not loaded")
+        else:
+            lines.append(f"{'🟢' if peer.online else '⚫'} {name:<15} {ip:<15} {_ago(peer.handshake):>9}"
+                         f"  ↓{human_bytes(peer.rx)} ↑{human_bytes(peer.tx)}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    # bdrman vpn: python3 -m bdrbot.wireguard list | add <name>... | remove <name> | qr <name>
+    cmd, names = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else ("list", [])
+    try:
+        if cmd == "list":
+            print(render(clients()))
+        elif cmd == "add" and names:
+            for name, path in add_peers(names):
+                print(f"✅ {name}: {path}")
+        elif cmd == "remove" and len(names) == 1:
+            remove_peer(names[0])
+            print(f"✅ Removed {names[0]}")
+        elif cmd == "qr" and len(names) == 1:
+            path = client_path(names[0])
+            if not path:
+                raise WireGuardError(f"No config for {names[0]}")
+            print(qr_png(path))
+        else:
+            sys.exit("Usage: python3 -m bdrbot.wireguard list | add <name>... | remove <name> | qr <name>")
+    except WireGuardError as e:
+        sys.exit(f"❌ {e}")
@@ -140,7 +140,7 @@ if [ $# -gt 0 ]; then
       case "$1" in
         create)
           info "Creating backup..."
-          backup_create
+          backup_create "${2:-config}"
           exit $?
           ;;
         list)
@@ -156,7 +156,7 @@ if [ $# -gt 0 ]; then
 Usage: bdrman backup <command>
 
 Commands:
-  create              Create a new backup
+  create [type]       Create a new backup (config|data|full, default: config)
   list                List all available backups
   restore             Restore from a backup
 
@@ -185,6 +185,8 @@ EOF
       case "$1" in
         export) config_export ;;
         import) config_import ;;
+        plan) config_converge "$2" ;;
+        apply) config_converge "$2" apply ;;
         *) show_help ;;
       esac
       ;;
@@ -288,29 +290,47 @@ EOF
             echo "Usage: bdrman vpn add <username>"
             exit 1
           fi
-          info "Adding VPN user: $2"
+          shift
+          info "Adding VPN user(s): $*"
+          if vpn_native add "$@"; then
+            exit 0
+          fi
+          # Server not set up yet: the installer creates it with the first client
+          [ -f /etc/wireguard/wg0.conf ] && exit 1
           vpn_add_client
           exit $?
           ;;
         list)
           info "VPN Users"
           if [ -d /etc/wireguard ]; then
-            ls -1 /etc/wireguard/*.conf 2>/dev/null | xargs -n1 basename | sed 's/.conf$//'
+            vpn_native list || ls -1 /etc/wireguard/clients/*.conf 2>/dev/null | xargs -n1 basename | sed 's/.conf$//'
           else
             warning "WireGuard not configured"
           fi
           exit 0
           ;;
+        remove|qr)
+          if [ -z "$2" ]; then
+            error "Username required"
+            echo "Usage: bdrman vpn $1 <username>"
+            exit 1
+          fi
+          vpn_native "$1" "$2"
+          exit $?
+          ;;
         --help|-h)
           cat << 'EOF'
 Usage: bdrman vpn <command> [options]
 
 Commands:
-  add <username>      Add a new VPN user
-  list                List all VPN users
+  add <username>...   Add VPN users (several at once)
+  list                List VPN users with last handshake and traffic
+  remove <username>   Remove a user and disconnect it
+  qr <username>       Path of the user's QR code PNG
 
 Examples:
   bdrman vpn add john
+  bdrman vpn add alice bob carol
   bdrman vpn list
 
 Note: WireGuard must be installed first.
@@ -319,7 +339,7 @@ EOF
           ;;
         *)
           error "Unknown vpn command: $1"
-          echo "Usage: bdrman vpn {add|list}"
+          echo "Usage: bdrman vpn {add|list|remove|qr}"
           echo "Run 'bdrman vpn --help' for more information"
           exit 1
           ;;
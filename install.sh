@@ -123,6 +123,27 @@ else
 fi
 chmod +x "$CONFIG_DIR/telegram_bot.py"
 
+# Bot package (handler modules are imported lazily by the bot)
+rm -rf "$CONFIG_DIR/bdrbot"
+if [ -d "bdrbot" ] && [ -d ".git" ]; then
+  echo "📂 Found local bdrbot package (Git Repo), copying..."
+  cp -r bdrbot "$CONFIG_DIR/bdrbot"
+  find "$CONFIG_DIR/bdrbot" -name "__pycache__" -type d -prune -exec rm -rf {} +
+else
+  BOT_MODULES=("__init__" "jsonlog" "core" "audit" "registry" "scheduler" "jobs" "containers" "procs" "diskusage" "tlsscan" "probes" "logindex" "metrics" "fleet" "wireguard" "hostconfig" "dockerclean" "pager" "alertstore"
+    "handlers/__init__" "handlers/general" "handlers/monitoring" "handlers/docker" "handlers/network"
+    "handlers/security" "handlers/system" "handlers/caprover" "handlers/vpn" "handlers/jobs")
+  mkdir -p "$CONFIG_DIR/bdrbot/handlers"
+  for mod in "${BOT_MODULES[@]}"; do
+    # A missing module leaves a bot that can't import: stop the install instead
+    curl -s -S -f -L "$REPO_URL/bdrbot/$mod.py?v=$(date +%s)" -o "$CONFIG_DIR/bdrbot/$mod.py" || {
+      echo "❌ Failed to download bdrbot/$mod.py"
+      exit 1
+    }
+  done
+  echo "   - bdrbot (${#BOT_MODULES[@]} modules) installed"
+fi
+
 # Install Python Dependencies
 echo "🐍 Installing Python dependencies..."
 # Try to install globally (might require --break-system-packages on newer Debian/Ubuntu)
@@ -184,6 +205,7 @@ echo "📝 Installed components:"
 echo "   • Main script:     $DEST_DIR/bdrman"
 echo "   • Libraries:       $LIB_DEST/"
 echo "   • Bot Script:      $CONFIG_DIR/telegram_bot.py"
+echo "   • Bot Package:     $CONFIG_DIR/bdrbot/"
 echo "   • Config dir:      $CONFIG_DIR"
 echo ""
 echo "🚀 Quick start:"
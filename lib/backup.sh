@@ -335,6 +335,11 @@ config_export(){
   # Export systemd services
   systemctl list-unit-files --type=service --state=enabled > "$CONFIG_EXPORT_DIR/enabled_services.txt"
   
+  # Structured desired state, re-applied by "bdrman config apply" (bdrbot/hostconfig.py)
+  if [ -d /etc/bdrman/bdrbot ]; then
+    (cd /etc/bdrman && python3 -m bdrbot.hostconfig export "$CONFIG_EXPORT_DIR/config.json")
+  fi
+
   # Create YAML manifest
   cat > "$CONFIG_EXPORT_DIR/manifest.yaml" << EOF
 # BDRman Configuration Export
@@ -373,6 +378,26 @@ EOF
   echo "  - Installed packages"
   echo "  - System services"
   echo "  - YAML manifest"
+  echo "  - config.json (bdrman config plan|apply <file>)"
+}
+
+# Converge this host to an exported config.json: only the differences are applied
+config_converge(){
+  local file="$1" mode="$2"
+  if [ ! -f "$file" ]; then
+    echo "❌ File not found: $file"
+    return 1
+  fi
+  if [ ! -d /etc/bdrman/bdrbot ]; then
+    echo "❌ Bot package not installed (/etc/bdrman/bdrbot)"
+    return 1
+  fi
+  file=$(realpath "$file")
+  if [ "$mode" = "apply" ]; then
+    (cd /etc/bdrman && python3 -m bdrbot.hostconfig import "$file" --apply)
+  else
+    (cd /etc/bdrman && python3 -m bdrbot.hostconfig import "$file")
+  fi
 }
 
 config_import(){
@@ -408,7 +433,7 @@ config_import(){
   echo "1) Firewall rules"
   echo "2) Cron jobs"
   echo "3) Show manifest"
-  echo "4) All (interactive)"
+  echo "4) Converge to this export (firewall, blocked IPs, services, settings)"
   read -rp "Choice: " choice
   
   case "$choice" in
@@ -441,8 +466,16 @@ config_import(){
       fi
       ;;
     4)
-      echo "Interactive import not yet implemented."
-      echo "Review files in: $CONFIG_DIR"
+      if [ -f "$CONFIG_DIR/config.json" ]; then
+        config_converge "$CONFIG_DIR/config.json"
+        read -rp "Apply these changes? (y/n): " confirm
+        if [[ "$confirm" =~ [Yy] ]]; then
+          config_converge "$CONFIG_DIR/config.json" apply
+        fi
+      else
+        echo "❌ This export has no config.json (made by an older bdrman)."
+        echo "Review files in: $CONFIG_DIR"
+      fi
       ;;
   esac
   
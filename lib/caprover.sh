@@ -370,6 +370,152 @@ caprover_list_backups(){
   fi
 }
 
+# Parallel restore: each archive is streamed into a staging directory on
+# the same filesystem while its apps keep running, then swapped in with a
+# rename. Only the containers that mount that volume are stopped, and only
+# around their own swap.
+caprover_restore_parallelism(){
+  local dir="$1" jobs dev rota
+  jobs=$(nproc 2>/dev/null || echo 2)
+  [ "$jobs" -gt 4 ] && jobs=4
+  # Spinning disks get slower with concurrent extractions
+  dev=$(df --output=source "$dir" 2>/dev/null | tail -n1)
+  rota=$(lsblk -ndo ROTA "$dev" 2>/dev/null | head -n1 | tr -d ' ')
+  [ "$rota" = "1" ] && jobs=1
+  echo "$jobs"
+}
+
+# Containers with a mount whose source is (under) the given path
+caprover_mounting_containers(){
+  local path="$1"
+  docker ps -q 2>/dev/null | xargs -r docker inspect \
+    --format '{{.Name}} {{index .Config.Labels "com.docker.swarm.service.name"}}{{range .Mounts}} {{.Source}}{{end}}' 2>/dev/null |
+  awk -v p="$path" '{
+    for (i = 3; i <= NF; i++) if ($i == p || index($i, p "/") == 1) {
+      name = substr($1, 2)
+      if (name ~ /captain/) print name, ($2 == "" ? "-" : $2)
+      break
+    }
+  }'
+}
+
+# Stop what uses a path; prints "service <name> <replicas>" / "container <name>" lines for caprover_resume
+caprover_quiesce(){
+  local path="$1" name service replicas
+  # One line per swarm service (its tasks share it), one per plain container
+  caprover_mounting_containers "$path" | awk '!seen[$2 == "-" ? $1 : $2]++' | while read -r name service; do
+    if [ "$service" != "-" ]; then
+      # Swarm would replace a stopped task, so scale the service down instead
+      replicas=$(docker service inspect --format '{{.Spec.Mode.Replicated.Replicas}}' "$service" 2>/dev/null)
+      docker service scale "$service=0" >/dev/null 2>&1 && echo "service $service ${replicas:-1}"
+    else
+      docker stop "$name" >/dev/null 2>&1 && echo "container $name"
+    fi
+  done
+}
+
+caprover_resume(){
+  local kind name replicas
+  while read -r kind name replicas; do
+    if [ "$kind" = "service" ]; then
+      docker service scale -d "$name=$replicas" >/dev/null 2>&1
+    elif [ "$kind" = "container" ]; then
+      docker start "$name" >/dev/null 2>&1
+    fi
+  done <<< "$1"
+}
+
+# Print the log of every finished restore job as soon as it is done (called after wait -n).
+# Uses caprover_restore's RUNNING (pid -> index), SELECTED_FILES, WORK_DIR, DONE and TOTAL.
+caprover_restore_progress(){
+  local running pid i status
+  running=" $(jobs -rp | tr '\n' ' ') "
+  for pid in "${!RUNNING[@]}"; do
+    [[ "$running" == *" $pid "* ]] && continue
+    i=${RUNNING[$pid]}
+    unset "RUNNING[$pid]"
+    DONE=$((DONE + 1))
+    status=$(grep '^RESULT|' "$WORK_DIR/$i.log" | cut -d'|' -f3)
+    echo "── [$DONE/$TOTAL] $(basename "${SELECTED_FILES[$i]}"): ${status:-failed}"
+    grep -v '^RESULT|' "$WORK_DIR/$i.log"
+  done
+}
+
+# Restore one archive. Prints progress and a final "RESULT|item|status|downtime|size|old data" line.
+caprover_restore_volume(){
+  local file="$1" volumes_dir="$2" stamp="$3"
+  local filename item target parent entry staging old started swap_start downtime stopped key lockfd lockfds decompress status
+  filename=$(basename "$file")
+  item=$(echo "$filename" | sed 's/_[0-9][0-9]-[0-9][0-9]\.tar\.gz$//')
+
+  if [ "$item" == "CapRover-Root-Data" ]; then
+    # Archive holds captain/..., swapped in as /captain
+    parent="/"; entry="captain"; target="/captain"
+  else
+    # Archive holds _data/..., swapped in as the volume's _data
+    parent="$volumes_dir/$item"; entry="_data"; target="$volumes_dir/$item/_data"
+  fi
+  mkdir -p "$parent"
+  staging="$parent/.bdrman-restore-$$-$item"
+  old="$target.pre-restore-$stamp"
+  started=$(date +%s)
+
+  echo "[$item] 📦 Extracting $filename"
+  decompress="gzip -dc"
+  command_exists pigz && decompress="pigz -dc"
+  rm -rf "$staging" && mkdir -p "$staging"
+  if ! $decompress "$file" | tar -x -C "$staging" 2>/dev/null || [ ! -d "$staging/$entry" ]; then
+    rm -rf "$staging"
+    echo "[$item] ❌ Extraction failed, live data untouched"
+    echo "RESULT|$item|failed|0|-|-"
+    return 1
+  fi
+
+  # Apps can mount several volumes: lock every affected service/container,
+  # in sorted order, so parallel swaps never scale the same app
+  lockfds=()
+  for key in $(caprover_mounting_containers "$target" | awk '{print ($2 == "-" ? $1 : $2)}' | sort -u); do
+    exec {lockfd}>"/var/lock/bdrman-restore-$key.lock"
+    flock "$lockfd"
+    lockfds+=("$lockfd")
+  done
+
+  swap_start=$(date +%s)
+  stopped=$(caprover_quiesce "$target")
+  [ -n "$stopped" ] && echo "[$item] ⏸️  Stopped: $(echo "$stopped" | awk '{print $2}' | xargs)"
+  # Both moves are checked: services only come back on the new data or,
+  # if the swap fails, on the old data moved back into place
+  status=ok
+  if [ -e "$target" ] && ! mv "$target" "$old"; then
+    status=failed
+  elif ! mv "$staging/$entry" "$target"; then
+    status=failed
+    if [ -e "$old" ] && ! mv "$old" "$target"; then
+      status=broken
+    fi
+  fi
+  [ "$status" != "broken" ] && caprover_resume "$stopped"
+  downtime=$(( $(date +%s) - swap_start ))
+  for lockfd in "${lockfds[@]}"; do
+    exec {lockfd}>&-
+  done
+
+  rm -rf "$staging"
+  if [ "$status" = "failed" ]; then
+    echo "[$item] ❌ Swap failed, previous data put back"
+    echo "RESULT|$item|failed|$downtime|-|-"
+    return 1
+  elif [ "$status" = "broken" ]; then
+    echo "[$item] ❌ Swap failed and the previous data could not be moved back: $old"
+    echo "[$item] ⚠️  Left stopped: $(echo "$stopped" | awk '{print $2}' | xargs)"
+    echo "RESULT|$item|broken|$downtime|-|$old"
+    return 1
+  fi
+  [ -e "$old" ] || old="-"
+  echo "[$item] ✅ Restored in $(( $(date +%s) - started ))s, downtime ${downtime}s"
+  echo "RESULT|$item|ok|$downtime|$(du -sh "$target" 2>/dev/null | cut -f1)|$old"
+}
+
 caprover_restore_backup(){
   echo "=== CAPROVER RESTORE FROM BACKUP ==="
   echo ""
@@ -384,11 +530,11 @@ caprover_restore_backup(){
   
   echo "🔍 Searching for available backups..."
   
-  # Find all backup files
+  # Find all backup files, newest first
   BACKUP_FILES=()
-  while IFS= read -r -d '' file; do
-    BACKUP_FILES+=("$file")
-  done < <(find "$BACKUP_BASE_DIR" -name "*.tar.gz" -type f -print0 2>/dev/null)
+  while IFS= read -r line; do
+    BACKUP_FILES+=("${line#* }")
+  done < <(find "$BACKUP_BASE_DIR" -name "*.tar.gz" ! -name "safety_backup_*" -type f -printf '%T@ %p\n' 2>/dev/null | sort -rn)
   
   if [ ${#BACKUP_FILES[@]} -eq 0 ]; then
     echo "📦 No backup files found."
@@ -404,159 +550,118 @@ caprover_restore_backup(){
     FILENAME=$(basename "$FILE")
     DATE_PART=$(dirname "$FILE" | xargs basename)
     SIZE=$(du -sh "$FILE" 2>/dev/null | cut -f1)
-    MODIFIED=$(stat -c "%y" "$FILE" 2>/dev/null | cut -d' ' -f1,2 | cut -d'.' -f1)
     
-    echo "$(($i + 1)). $FILENAME"
-    echo "    📅 Date: $DATE_PART"
-    echo "    💾 Size: $SIZE"
-    echo "    🕒 Modified: $MODIFIED"
-    echo ""
+    echo "$(($i + 1)). $FILENAME  (📅 $DATE_PART, 💾 $SIZE)"
   done
   
   echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
+  echo "l) Latest backup of every item"
   echo "0) Cancel"
   echo ""
-  read -rp "Select backup file to restore (1-${#BACKUP_FILES[@]}): " choice
+  read -rp "Select backups to restore (e.g. 3 or 1,4,7): " choice
   
-  if [[ "$choice" == "0" ]]; then
+  if [[ "$choice" == "0" || -z "$choice" ]]; then
     echo "Restore cancelled."
     return
   fi
   
-  if ! [[ "$choice" =~ ^[0-9]+$ ]] || [ "$choice" -lt 1 ] || [ "$choice" -gt "${#BACKUP_FILES[@]}" ]; then
-    echo "❌ Invalid selection."
-    return
+  SELECTED_FILES=()
+  if [[ "$choice" == "l" || "$choice" == "L" ]]; then
+    declare -A SEEN=()
+    for FILE in "${BACKUP_FILES[@]}"; do
+      ITEM=$(basename "$FILE" | sed 's/_[0-9][0-9]-[0-9][0-9]\.tar\.gz$//')
+      if [ -z "${SEEN[$ITEM]}" ]; then
+        SEEN[$ITEM]=1
+        SELECTED_FILES+=("$FILE")
+      fi
+    done
+  else
+    # One archive per item: two restores of one item would share its staging dir
+    declare -A PICKED=()
+    for n in ${choice//,/ }; do
+      if ! [[ "$n" =~ ^[0-9]+$ ]] || [ "$n" -lt 1 ] || [ "$n" -gt "${#BACKUP_FILES[@]}" ]; then
+        echo "❌ Invalid selection: $n"
+        return
+      fi
+      FILE="${BACKUP_FILES[$((n - 1))]}"
+      ITEM=$(basename "$FILE" | sed 's/_[0-9][0-9]-[0-9][0-9]\.tar\.gz$//')
+      if [ -n "${PICKED[$ITEM]}" ]; then
+        [ "${PICKED[$ITEM]}" = "$n" ] && continue
+        echo "❌ Backups ${PICKED[$ITEM]} and $n are both $ITEM, pick one"
+        return
+      fi
+      PICKED[$ITEM]=$n
+      SELECTED_FILES+=("$FILE")
+    done
   fi
   
-  SELECTED_FILE="${BACKUP_FILES[$((choice - 1))]}"
-  FILENAME=$(basename "$SELECTED_FILE")
-  
-  # Extract volume name from filename (remove timestamp HH-MM and extension)
-  VOLUME_NAME=$(echo "$FILENAME" | sed 's/_[0-9][0-9]-[0-9][0-9]\.tar\.gz$//')
+  JOBS=$(caprover_restore_parallelism "$VOLUMES_DIR")
   
   echo ""
-  echo "📦 Selected backup: $FILENAME"
-  echo "🔄 Target: $VOLUME_NAME"
-  
-  # Determine paths based on volume name
-  if [ "$VOLUME_NAME" == "CapRover-Root-Data" ]; then
-    TARGET_PATH="/captain"
-    PARENT_DIR="/"
-    IS_ROOT_DATA=true
-    echo "📁 Restore Path: /captain"
-  else
-    TARGET_PATH="$VOLUMES_DIR/$VOLUME_NAME"
-    PARENT_DIR="$VOLUMES_DIR/$VOLUME_NAME"
-    IS_ROOT_DATA=false
-    echo "📁 Restore Path: $TARGET_PATH"
-  fi
-  
+  echo "🔄 Will restore ${#SELECTED_FILES[@]} item(s), $JOBS at a time:"
+  for FILE in "${SELECTED_FILES[@]}"; do
+    echo "   • $(basename "$FILE")"
+  done
   echo ""
+  echo "⚠️  Existing data is replaced. The previous data is kept next to it"
+  echo "   as *.pre-restore-<time> until you remove it."
+  read -rp "Do you want to continue? Type 'YES' to confirm: " confirm
   
-  # Check if target exists
-  if [ -d "$TARGET_PATH" ]; then
-    echo "⚠️  WARNING: Target '$TARGET_PATH' already exists!"
-    echo "   This will OVERWRITE the existing data."
-    echo ""
-    read -rp "Do you want to continue? Type 'YES' to confirm: " confirm
-    
-    if [ "$confirm" != "YES" ]; then
-      echo "Restore cancelled."
-      return
-    fi
-    
-    # Create safety backup
-    echo "🔄 Creating safety backup of existing data..."
-    export TZ='Europe/Istanbul'
-    SAFETY_BACKUP="$BACKUP_BASE_DIR/safety_backup_${VOLUME_NAME}_$(date +%d%m%Y_%H%M).tar.gz"
-    
-    if [ "$IS_ROOT_DATA" = true ]; then
-      tar -czf "$SAFETY_BACKUP" -C / captain 2>/dev/null
-    else
-      tar -czf "$SAFETY_BACKUP" -C "$TARGET_PATH" _data 2>/dev/null
-    fi
-    
-    echo "   ✅ Safety backup created: $SAFETY_BACKUP"
-    
-    # Remove existing data
-    echo "🗑️  Removing existing data..."
-    if [ "$IS_ROOT_DATA" = true ]; then
-      rm -rf "$TARGET_PATH"/*
-    else
-      rm -rf "$TARGET_PATH/_data"/*
-    fi
-    
-  else
-    echo "📁 Target doesn't exist. Creating structure..."
-    mkdir -p "$TARGET_PATH"
+  if [ "$confirm" != "YES" ]; then
+    echo "Restore cancelled."
+    return
   fi
   
-  echo ""
-  echo "🔄 Restoring from backup..."
-  echo "   Source: $SELECTED_FILE"
-  echo "   Target: $TARGET_PATH"
+  acquire_lock "caprover_restore" || return 1
   
-  # Extract backup
-  # For Root Data: archive contains 'captain/...', we extract to /
-  # For Volumes: archive contains '_data/...', we extract to volume dir
+  export TZ='Europe/Istanbul'
+  STAMP=$(date +%d%m%Y_%H%M%S)
+  WORK_DIR=$(mktemp -d)
+  START=$(date +%s)
   
-  if [ "$IS_ROOT_DATA" = true ]; then
-    EXTRACT_CMD="tar -xzf \"$SELECTED_FILE\" -C /"
-  else
-    EXTRACT_CMD="tar -xzf \"$SELECTED_FILE\" -C \"$TARGET_PATH/\""
-  fi
+  echo ""
+  echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
+  # Each app's log is printed as soon as its restore finishes
+  declare -A RUNNING=()
+  DONE=0
+  TOTAL=${#SELECTED_FILES[@]}
+  for i in "${!SELECTED_FILES[@]}"; do
+    while [ "$(jobs -rp | wc -l)" -ge "$JOBS" ]; do
+      wait -n
+      caprover_restore_progress
+    done
+    caprover_restore_volume "${SELECTED_FILES[$i]}" "$VOLUMES_DIR" "$STAMP" > "$WORK_DIR/$i.log" 2>&1 &
+    RUNNING[$!]=$i
+  done
+  while [ "${#RUNNING[@]}" -gt 0 ]; do
+    wait -n
+    caprover_restore_progress
+  done
   
-  if eval "$EXTRACT_CMD" 2>/dev/null; then
-    echo "   ✅ Extraction successful!"
-    
-    # Set proper permissions
-    echo "🔐 Setting permissions..."
-    chown -R root:root "$TARGET_PATH"
-    
-    # Verify restoration
-    if [ "$IS_ROOT_DATA" = true ]; then
-       CHECK_PATH="$TARGET_PATH/config.json" # config.json usually exists in /captain
-       # Or just check if directory is not empty
-       if [ "$(ls -A $TARGET_PATH)" ]; then
-         VERIFIED=true
-       else
-         VERIFIED=false
-       fi
-    else
-       if [ -d "$TARGET_PATH/_data" ]; then
-         VERIFIED=true
-       else
-         VERIFIED=false
-       fi
-    fi
-    
-    if [ "$VERIFIED" = true ]; then
-      RESTORED_SIZE=$(du -sh "$TARGET_PATH" 2>/dev/null | cut -f1)
-      echo "   📊 Restored size: $RESTORED_SIZE"
-      
-      echo ""
-      echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-      echo "✅ RESTORE COMPLETED SUCCESSFULLY!"
-      echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-      echo "📦 Item: $VOLUME_NAME"
-      echo "📁 Location: $TARGET_PATH"
-      echo "💾 Size: $RESTORED_SIZE"
-      echo "🕒 Restored: $(date '+%Y-%m-%d %H:%M:%S')"
-      echo ""
-      echo "⚠️  NOTE: You may need to restart the related Docker container"
-      echo "          for the changes to take effect."
-      
-      log_success "CapRover restored: $VOLUME_NAME from $FILENAME"
-      
+  echo ""
+  echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
+  echo "📊 RESTORE SUMMARY ($(( $(date +%s) - START ))s total)"
+  echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
+  FAILED=0
+  while IFS='|' read -r _ ITEM STATUS DOWNTIME SIZE OLD; do
+    if [ "$STATUS" = "ok" ]; then
+      echo "✅ $ITEM  💾 $SIZE  ⏸️  ${DOWNTIME}s down"
+      [ "$OLD" != "-" ] && echo "   Previous data: $OLD"
+      log_success "CapRover restored: $ITEM (downtime ${DOWNTIME}s)"
+    elif [ "$STATUS" = "broken" ]; then
+      echo "❌ $ITEM  (swap failed, previous data at $OLD, apps left stopped)"
+      log_error "CapRover restore failed: $ITEM, previous data left at $OLD"
+      FAILED=$((FAILED + 1))
     else
-      echo "   ❌ Verification failed - Data not found after extraction"
-      log_error "CapRover restore verification failed: $VOLUME_NAME"
+      echo "❌ $ITEM  (live data untouched)"
+      log_error "CapRover restore failed: $ITEM"
+      FAILED=$((FAILED + 1))
     fi
-    
-  else
-    echo "   ❌ Extraction failed!"
-    log_error "CapRover restore failed: $SELECTED_FILE"
-  fi
+  done < <(cat "$WORK_DIR"/*.log | grep '^RESULT|')
+  rm -rf "$WORK_DIR"
+  release_lock
+  
+  [ "$FAILED" -eq 0 ]
 }
 
 caprover_cleanup_backups(){
@@ -15,6 +15,9 @@ CPU_ALERT_THRESHOLD=90
 MEMORY_ALERT_THRESHOLD=90
 DISK_ALERT_THRESHOLD=90
 FAILED_LOGIN_THRESHOLD=10
+FLAP_WINDOW=1800
+FLAP_LIMIT=6
+ALERT_HISTORY_DAYS=30
 
 # Telegram defaults
 TELEGRAM_CONFIG="/etc/bdrman/telegram.conf"
@@ -41,6 +41,18 @@ docker_start(){
 }
 
 docker_prune(){
+  # Ranked plan from bdrbot/dockerclean.py; keeps CapRover rollback images
+  if [ -d /etc/bdrman/bdrbot ]; then
+    echo "=== RECLAIMABLE SPACE (best MB/s first, ⚠ = holds data) ==="
+    if (cd /etc/bdrman && python3 -m bdrbot.dockerclean plan); then
+      read -rp "Items to remove (e.g. 1 3 5), 'safe' for all safe items, empty to cancel: " sel
+      [ -z "$sel" ] && return
+      # shellcheck disable=SC2086
+      (cd /etc/bdrman && python3 -m bdrbot.dockerclean run $sel) && log "Docker cleanup: $sel"
+      return
+    fi
+  fi
+
   echo "⚠️  This will remove all stopped containers, unused networks and images."
   read -rp "Are you sure? (y/n): " ans
   if [[ "$ans" =~ ^[Yy]$ ]]; then
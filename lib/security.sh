@@ -600,6 +600,11 @@ security_monitoring_setup(){
   read -rp "Enable advanced security monitoring? (yes/no): " confirm
   [ "$confirm" != "yes" ] && return
   
+  if ! command_exists sqlite3; then
+    echo "📦 Installing sqlite3 (alert state shared with the bot)..."
+    apt-get install -y -qq sqlite3 >/dev/null 2>&1 || echo "⚠️  sqlite3 not installed, /alerts will not see the monitor's state"
+  fi
+
   echo "📝 Creating security monitor script..."
   
   cat > /etc/bdrman/security_monitor.sh << 'EOFMONITOR'
@@ -619,46 +624,144 @@ CPU_ALERT_THRESHOLD=${CPU_ALERT_THRESHOLD:-90}
 MEMORY_ALERT_THRESHOLD=${MEMORY_ALERT_THRESHOLD:-90}
 DISK_ALERT_THRESHOLD=${DISK_ALERT_THRESHOLD:-90}
 FAILED_LOGIN_THRESHOLD=${FAILED_LOGIN_THRESHOLD:-10}
+FLAP_WINDOW=${FLAP_WINDOW:-1800}
+FLAP_LIMIT=${FLAP_LIMIT:-6}
+ALERT_HISTORY_DAYS=${ALERT_HISTORY_DAYS:-30}
 TELEGRAM_TIMEOUT=${TELEGRAM_TIMEOUT:-10}
 TELEGRAM_RETRIES=${TELEGRAM_RETRIES:-2}
 
 ALERT_LOG="/var/log/bdrman_security_alerts.log"
 
-# Per-alert type cooldown tracking
+# Alert state shared with the bot's /alerts (bdrbot/alertstore.py): firing
+# alerts, cooldowns, flap damping and history. Without the sqlite3 CLI the
+# cooldowns are kept in memory only.
+ALERT_DB="/var/lib/bdrman/alerts.db"
+declare -A FIRING LAST_SENT
+
+alert_db() {
+    sqlite3 -batch -noheader -cmd ".timeout 5000" "$ALERT_DB" "$@" 2>/dev/null
+}
+
+sql_quote() {
+    printf "'%s'" "${1//\'/\'\'}"
+}
+
+alert_db_init() {
+    rm -f /tmp/bdrman_last_alert_* 2>/dev/null
+    if ! command -v sqlite3 >/dev/null 2>&1; then
+        ALERT_DB=""
+        return 1
+    fi
+    mkdir -p "$(dirname "$ALERT_DB")"
+    # Same schema as bdrbot/alertstore.py
+    alert_db "PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS alerts (
+    type TEXT PRIMARY KEY, state TEXT NOT NULL DEFAULT 'ok', detail TEXT,
+    since INTEGER, last_seen INTEGER, last_sent INTEGER NOT NULL DEFAULT 0,
+    last_change INTEGER NOT NULL DEFAULT 0, flaps INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS history (ts INTEGER, type TEXT, event TEXT, detail TEXT);
+CREATE INDEX IF NOT EXISTS history_ts ON history (ts);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);" >/dev/null || { ALERT_DB=""; return 1; }
+    local t
+    for t in $(alert_db "SELECT type FROM alerts WHERE state = 'firing'"); do
+        FIRING[$t]=1
+    done
+}
+
+# Mark an alert firing; prints send, cooldown or flapping.
+# A state change less than FLAP_WINDOW after the previous one counts as a
+# flap; after FLAP_LIMIT of them notifications wait until the alert has
+# been firing steadily for FLAP_WINDOW.
+alert_fire() {
+    local t d now
+    t=$(sql_quote "$1"); d=$(sql_quote "$2"); now=$(date +%s)
+    alert_db "BEGIN IMMEDIATE;
+INSERT OR IGNORE INTO alerts (type) VALUES ($t);
+UPDATE alerts SET state = 'firing', since = $now, last_change = $now,
+    flaps = CASE WHEN $now - last_change > $FLAP_WINDOW THEN 1 ELSE flaps + 1 END
+  WHERE type = $t AND state != 'firing';
+INSERT INTO history SELECT $now, $t, 'firing', $d WHERE changes() > 0;
+UPDATE alerts SET detail = $d, last_seen = $now WHERE type = $t;
+SELECT CASE WHEN flaps >= $FLAP_LIMIT AND $now - last_change < $FLAP_WINDOW THEN 'flapping'
+            WHEN $now - last_sent >= $ALERT_COOLDOWN THEN 'send' ELSE 'cooldown' END
+  FROM alerts WHERE type = $t;
+COMMIT;"
+}
+
+# Check passed: resolve the alert if it was firing
+alert_clear() {
+    local alert_type="$1"
+    [ -z "${FIRING[$alert_type]}" ] && return 0
+    unset "FIRING[$alert_type]"
+    echo "$(date): [$alert_type] RESOLVED" >> "$ALERT_LOG"
+    [ -z "$ALERT_DB" ] && return 0
+    local t now
+    t=$(sql_quote "$alert_type"); now=$(date +%s)
+    alert_db "UPDATE alerts SET state = 'ok', last_change = $now,
+    flaps = CASE WHEN $now - last_change > $FLAP_WINDOW THEN 1 ELSE flaps + 1 END
+  WHERE type = $t AND state = 'firing';
+INSERT INTO history SELECT $now, $t, 'resolved', detail FROM alerts WHERE type = $t AND changes() > 0;"
+}
+
+alert_event() {
+    [ -z "$ALERT_DB" ] && return 0
+    local t now
+    t=$(sql_quote "$1"); now=$(date +%s)
+    alert_db "INSERT INTO history SELECT $now, $t, '$2', detail FROM alerts WHERE type = $t;
+UPDATE alerts SET last_sent = CASE WHEN '$2' = 'sent' THEN $now ELSE last_sent END WHERE type = $t;"
+}
+
+# Once per loop: lets the bot tell a live monitor from a stale store
+alert_heartbeat() {
+    [ -z "$ALERT_DB" ] && return 0
+    local now
+    now=$(date +%s)
+    alert_db "INSERT OR REPLACE INTO meta VALUES ('heartbeat', '$now');
+DELETE FROM history WHERE ts < $now - $ALERT_HISTORY_DAYS * 86400;"
+}
+
+# Record the alert as firing and decide: send, cooldown or flapping
 can_send_alert() {
     local alert_type="$1"
-    local cooldown_file="/tmp/bdrman_last_alert_${alert_type}"
-    
-    if [ ! -f "$cooldown_file" ]; then
-        return 0
+    local detail="$2"
+    local decision=""
+
+    [ -n "$ALERT_DB" ] && decision=$(alert_fire "$alert_type" "$detail")
+    if [ -z "$decision" ]; then
+        local diff=$(( $(date +%s) - ${LAST_SENT[$alert_type]:-0} ))
+        decision=cooldown
+        [ $diff -ge $ALERT_COOLDOWN ] && decision=send
     fi
-    
-    local last_alert=$(cat "$cooldown_file" 2>/dev/null || echo 0)
-    local current_time=$(date +%s)
-    local diff=$((current_time - last_alert))
-    
-    [ $diff -ge $ALERT_COOLDOWN ]
+    echo "$decision"
 }
 
-# Send alert with per-type cooldown
+# Send alert with per-type cooldown and flap damping
 send_alert() {
     local alert_type="$1"
     local message="$2"
-    local cooldown_file="/tmp/bdrman_last_alert_${alert_type}"
-    
-    if can_send_alert "$alert_type"; then
-        if send_telegram_alert "$message"; then
-            date +%s > "$cooldown_file"
-            echo "$(date): [$alert_type] ALERT SENT" >> "$ALERT_LOG"
-            return 0
-        else
+    local detail="${3:-}"
+
+    if [ -z "${FIRING[$alert_type]}" ]; then
+        FIRING[$alert_type]=1
+        echo "$(date): [$alert_type] FIRING $detail" >> "$ALERT_LOG"
+    fi
+    case "$(can_send_alert "$alert_type" "$detail")" in
+        send)
+            if send_telegram_alert "$message"; then
+                LAST_SENT[$alert_type]=$(date +%s)
+                alert_event "$alert_type" sent
+                echo "$(date): [$alert_type] ALERT SENT" >> "$ALERT_LOG"
+                return 0
+            fi
+            alert_event "$alert_type" failed
             echo "$(date): [$alert_type] ALERT FAILED" >> "$ALERT_LOG"
             return 1
-        fi
-    else
-        echo "$(date): [$alert_type] ALERT SKIPPED (cooldown)" >> "$ALERT_LOG"
-        return 2
-    fi
+            ;;
+        *)
+            return 2
+            ;;
+    esac
 }
 
 # Safe curl wrapper for Telegram API
@@ -712,18 +815,43 @@ check_ddos() {
         alert+="   3. /block ${top_ip} - Block this IP%0A%0A"
         alert+="📅 Time: $(date '+%Y-%m-%d %H:%M:%S')"
         
-        send_alert "ddos" "$alert"
+        send_alert "ddos" "$alert" "${count} IPs over ${DDOS_THRESHOLD} conns, top ${top_ip} (${connections})"
         return 1
     fi
+    alert_clear "ddos"
     return 0
 }
 
+# CPU usage over the last second from /proc/stat deltas (top -bn1 reports the average since boot)
+cpu_usage_percent() {
+    local a b i total=0
+    a=($(head -1 /proc/stat))
+    sleep 1
+    b=($(head -1 /proc/stat))
+    for i in 1 2 3 4 5 6 7 8; do
+        total=$((total + b[i] - a[i]))
+    done
+    local idle=$(( (b[4] + b[5]) - (a[4] + a[5]) ))
+    [ "$total" -gt 0 ] && echo $(( (total - idle) * 100 / total ))
+}
+
+# Process that used the most CPU in the last second (ps %CPU is a lifetime average)
+top_cpu_process() {
+    local before
+    before=$(awk '{ pid = $1; sub(/.*\) /, ""); print pid, $12 + $13 }' /proc/[0-9]*/stat 2>/dev/null)
+    sleep 1
+    awk 'NR == FNR { prev[$1] = $2; next }
+         { pid = $1; sub(/.*\) /, ""); d = $12 + $13 - prev[pid]; if (d > max) { max = d; top = pid } }
+         END { if (top) print top }' <(echo "$before") /proc/[0-9]*/stat 2>/dev/null \
+        | { read -r pid && cat "/proc/$pid/comm" 2>/dev/null; }
+}
+
 # High CPU Detection
 check_cpu() {
-    local cpu_usage=$(top -bn1 | grep "Cpu(s)" | awk '{print $2}' | cut -d'%' -f1 | cut -d'.' -f1)
+    local cpu_usage=$(cpu_usage_percent)
     
     if [ -n "$cpu_usage" ] && [ "$cpu_usage" -gt "$CPU_ALERT_THRESHOLD" ]; then
-        local top_process=$(ps aux --sort=-%cpu | head -2 | tail -1 | awk '{print $11}')
+        local top_process=$(top_cpu_process)
         
         local alert="⚠️ *HIGH CPU ALERT*%0A%0A"
         alert+="📊 *CPU Usage:* ${cpu_usage}%% (threshold: ${CPU_ALERT_THRESHOLD}%%)%0A"
@@ -737,9 +865,10 @@ check_cpu() {
         alert+="   /docker - Check containers%0A"
         alert+="   /ddos_status - Check for attacks"
         
-        send_alert "cpu" "$alert"
+        send_alert "cpu" "$alert" "${cpu_usage}% > ${CPU_ALERT_THRESHOLD}%, top ${top_process}"
         return 1
     fi
+    alert_clear "cpu"
     return 0
 }
 
@@ -760,9 +889,10 @@ check_memory() {
         alert+="   /docker - Check containers%0A"
         alert+="   /restart docker - Restart if needed"
         
-        send_alert "memory" "$alert"
+        send_alert "memory" "$alert" "${mem_usage}% > ${MEMORY_ALERT_THRESHOLD}% (${mem_used}/${mem_total})"
         return 1
     fi
+    alert_clear "memory"
     return 0
 }
 
@@ -783,9 +913,10 @@ check_disk() {
         alert+="   /disk - View details%0A"
         alert+="   /capclean - Clean old backups"
         
-        send_alert "disk" "$alert"
+        send_alert "disk" "$alert" "${disk_usage}% > ${DISK_ALERT_THRESHOLD}%, ${disk_free} free"
         return 1
     fi
+    alert_clear "disk"
     return 0
 }
 
@@ -810,19 +941,22 @@ check_failed_logins() {
             alert+="   /firewall - Check firewall status"
         fi
         
-        send_alert "bruteforce" "$alert"
+        send_alert "bruteforce" "$alert" "${failed_count} failed logins > ${FAILED_LOGIN_THRESHOLD}"
         return 1
     fi
+    alert_clear "bruteforce"
     return 0
 }
 
 # Service Down Detection
 check_services() {
     local down_services=""
+    local down_names=""
     
     for service in docker nginx ssh; do
         if ! systemctl is-active --quiet $service 2>/dev/null && ! systemctl is-active --quiet sshd 2>/dev/null; then
             down_services+="   ❌ ${service}%0A"
+            down_names+="${service} "
         fi
     done
     
@@ -835,17 +969,20 @@ check_services() {
         alert+="   /restart all - Restart services%0A"
         alert+="   /health - Full health check"
         
-        send_alert "services" "$alert"
+        send_alert "services" "$alert" "down: ${down_names% }"
         return 1
     fi
+    alert_clear "services"
     return 0
 }
 
 # Main monitoring loop
 main() {
     echo "🛡️ Security monitoring started at $(date)"
+    alert_db_init || echo "⚠️  sqlite3 not found: alert state kept in memory, /alerts can't see it"
     
     while true; do
+        alert_heartbeat
         check_ddos
         check_cpu
         check_memory
@@ -903,6 +1040,11 @@ security_monitoring_status(){
   echo ""
   systemctl status bdrman-security-monitor --no-pager
   echo ""
+  if [ -d /etc/bdrman/bdrbot ]; then
+    echo "Alert state:"
+    (cd /etc/bdrman && python3 -m bdrbot.alertstore)
+    echo ""
+  fi
   echo "Recent alerts:"
   tail -20 /var/log/bdrman_security_alerts.log 2>/dev/null || echo "No alerts yet"
 }
@@ -377,6 +377,10 @@ logs_all_critical(){
 logs_custom_search(){
   read -rp "Enter search term: " term
   if [ -n "$term" ]; then
+    # Use the bot's log index when it is installed, else a plain grep
+    if [ -f /etc/bdrman/bdrbot/logindex.py ] && [ -f /var/lib/bdrman/logindex/index.json ]; then
+      (cd /etc/bdrman && python3 -m bdrbot.logindex "$term" 2>/dev/null) && return
+    fi
     grep -r "$term" /var/log/syslog 2>/dev/null | tail -n 20
   fi
 }
@@ -56,6 +56,11 @@ BOT_TOKEN="$bot_token"
 CHAT_ID="$chat_id"
 PIN_CODE="1234"
 SERVER_NAME="$(hostname)"
+# Extra /probe targets: hosts (ping), host:port (tcp), URLs (http)
+PROBE_TARGETS=""
+# Fleet mode (bdrman telegram -> Fleet Setup)
+FLEET_SECRET=""
+FLEET_LISTEN=""
 EOF
   
   # Secure permissions (only root can read)
@@ -100,12 +105,9 @@ EOF
   
   chmod +x /usr/local/bin/bdrman-telegram
   
-  # Create weekly report script
+  # Weekly reports are sent by the bot
   telegram_create_weekly_report
   
-  # Setup cron for weekly report (Monday at 12:00)
-  (crontab -l 2>/dev/null | grep -v "telegram_weekly_report.sh"; echo "0 12 * * 1 /etc/bdrman/telegram_weekly_report.sh") | crontab -
-  
   # Test notification
   if /usr/local/bin/bdrman-telegram "✅ Telegram bot configured!%0A%0A📅 Weekly reports: Monday at 12:00%0A💬 Commands: Send /help to see all available commands"; then
     echo "✅ Telegram bot configured successfully"
@@ -123,133 +125,13 @@ EOF
 
 
 telegram_create_weekly_report(){
-  cat > /etc/bdrman/telegram_weekly_report.sh << 'EOFSCRIPT'
-#!/bin/bash
-if [ ! -f /etc/bdrman/telegram.conf ]; then
-  exit 1
-fi
-
-source /etc/bdrman/telegram.conf
-
-HOSTNAME=$(hostname)
-UPTIME=$(uptime -p)
-DISK_USAGE=$(df -h / | tail -1 | awk '{print $5}')
-DISK_USED=$(df -h / | tail -1 | awk '{print $3}')
-DISK_TOTAL=$(df -h / | tail -1 | awk '{print $2}')
-MEM_USAGE=$(free -h | grep Mem | awk '{print $3"/"$2}')
-MEM_PERCENT=$(free | grep Mem | awk '{printf("%.0f", $3/$2 * 100.0)}')
-LOAD=$(uptime | awk -F'load average:' '{print $2}')
-CPU_USAGE=$(top -bn1 | grep "Cpu(s)" | sed "s/.*, *\([0-9.]*\)%* id.*/\1/" | awk '{print 100 - $1"%"}')
-
-DOCKER_RUNNING=$(docker ps --format "{{.Names}}" 2>/dev/null | wc -l)
-DOCKER_TOTAL=$(docker ps -a --format "{{.Names}}" 2>/dev/null | wc -l)
-DOCKER_STOPPED=$(docker ps -a --filter "status=exited" --format "{{.Names}}" 2>/dev/null | wc -l)
-
-# Failed services
-FAILED_COUNT=$(systemctl --failed --no-pager --no-legend 2>/dev/null | wc -l)
-if [ "$FAILED_COUNT" -gt 0 ]; then
-  FAILED_SERVICES=$(systemctl --failed --no-pager --no-legend 2>/dev/null | cut -d' ' -f2 | tr '\n' ',' | sed 's/,$//')
-else
-  FAILED_SERVICES="None"
-fi
-
-# Disk warnings
-DISK_NUM=$(echo $DISK_USAGE | sed 's/%//')
-if [ "$DISK_NUM" -ge 90 ]; then
-  DISK_ICON="🔴"
-elif [ "$DISK_NUM" -ge 80 ]; then
-  DISK_ICON="🟡"
-else
-  DISK_ICON="🟢"
-fi
-
-# Memory warnings
-if [ "$MEM_PERCENT" -ge 90 ]; then
-  MEM_ICON="🔴"
-elif [ "$MEM_PERCENT" -ge 80 ]; then
-  MEM_ICON="🟡"
-else
-  MEM_ICON="🟢"
-fi
-
-REPORT="📊 *WEEKLY SYSTEM REPORT*%0A"
-REPORT+="━━━━━━━━━━━━━━━━━━━━━━━━━━━━%0A%0A"
-REPORT+="🖥️ *Server:* \`${HOSTNAME}\`%0A"
-REPORT+="📅 *Date:* $(date '+%Y-%m-%d %H:%M')%0A"
-REPORT+="⏱️ *Uptime:* ${UPTIME}%0A%0A"
-
-REPORT+="*💻 RESOURCES*%0A"
-REPORT+="━━━━━━━━━━━━━━━━━━━━━━━━━━━━%0A"
-REPORT+="${DISK_ICON} *Disk:* ${DISK_USAGE} (${DISK_USED}/${DISK_TOTAL})%0A"
-REPORT+="${MEM_ICON} *Memory:* ${MEM_PERCENT}%25 (${MEM_USAGE})%0A"
-REPORT+="⚡ *CPU Usage:* ${CPU_USAGE}%0A"
-REPORT+="📈 *Load Average:* ${LOAD}%0A%0A"
-
-REPORT+="*🐳 DOCKER*%0A"
-REPORT+="━━━━━━━━━━━━━━━━━━━━━━━━━━━━%0A"
-REPORT+="✅ Running: ${DOCKER_RUNNING}%0A"
-REPORT+="⏸️ Stopped: ${DOCKER_STOPPED}%0A"
-REPORT+="📦 Total: ${DOCKER_TOTAL}%0A%0A"
-
-REPORT+="*⚙️ SERVICES STATUS*%0A"
-REPORT+="━━━━━━━━━━━━━━━━━━━━━━━━━━━━%0A"
-
-# Check key services
-if systemctl is-active --quiet docker 2>/dev/null; then
-  REPORT+="✅ Docker%0A"
-else
-  REPORT+="❌ Docker (DOWN)%0A"
-fi
-
-if systemctl is-active --quiet nginx 2>/dev/null; then
-  REPORT+="✅ Nginx%0A"
-else
-  REPORT+="⚠️ Nginx (not active)%0A"
-fi
-
-if systemctl is-active --quiet wg-quick@wg0 2>/dev/null; then
-  REPORT+="✅ WireGuard%0A"
-else
-  REPORT+="⚠️ WireGuard (not active)%0A"
-fi
-
-if systemctl is-active --quiet sshd 2>/dev/null || systemctl is-active --quiet ssh 2>/dev/null; then
-  REPORT+="✅ SSH%0A"
-else
-  REPORT+="❌ SSH (DOWN!)%0A"
-fi
-
-REPORT+="%0A"
-
-if [ "$FAILED_COUNT" -gt 0 ]; then
-  REPORT+="*❌ FAILED SERVICES*%0A"
-  REPORT+="━━━━━━━━━━━━━━━━━━━━━━━━━━━━%0A"
-  REPORT+="Count: ${FAILED_COUNT}%0A"
-  REPORT+="Services: ${FAILED_SERVICES}%0A%0A"
-fi
-
-# Top processes by memory
-TOP_PROCS=$(ps aux --sort=-%mem | head -n 4 | tail -n 3 | awk '{print $11}' | tr '\n' ',' | sed 's/,$//')
-REPORT+="*📊 TOP MEMORY USERS*%0A"
-REPORT+="━━━━━━━━━━━━━━━━━━━━━━━━━━━━%0A"
-REPORT+="${TOP_PROCS}%0A%0A"
-
-# Network info
-IP_ADDR=$(hostname -I | awk '{print $1}')
-REPORT+="*🌐 NETWORK*%0A"
-REPORT+="━━━━━━━━━━━━━━━━━━━━━━━━━━━━%0A"
-REPORT+="IP: \`${IP_ADDR}\`%0A%0A"
-
-REPORT+="━━━━━━━━━━━━━━━━━━━━━━━━━━━━%0A"
-REPORT+="Use /help to see bot commands"
-
-curl -s -X POST "https://api.telegram.org/bot${BOT_TOKEN}/sendMessage" \
-  -d chat_id="${CHAT_ID}" \
-  -d text="$REPORT" \
-  -d parse_mode="Markdown" > /dev/null
-EOFSCRIPT
-  
-  chmod +x /etc/bdrman/telegram_weekly_report.sh
+  # The bot builds the weekly report from its metric history
+  # (bdrbot/metrics.py) and sends it on Monday at 12:00. Drop the old
+  # point-in-time script and its cron entry.
+  rm -f /etc/bdrman/telegram_weekly_report.sh
+  crontab -l 2>/dev/null | grep -q "telegram_weekly_report.sh" && \
+    crontab -l 2>/dev/null | grep -v "telegram_weekly_report.sh" | crontab -
+  return 0
 }
 
 telegram_send(){
@@ -271,13 +153,13 @@ telegram_send(){
 telegram_test_report(){
   echo "=== SEND TEST WEEKLY REPORT ==="
   
-  if [ ! -f /etc/bdrman/telegram_weekly_report.sh ]; then
-    echo "Weekly report script not found. Run setup first."
+  if [ ! -f /etc/bdrman/bdrbot/metrics.py ]; then
+    echo "Bot package not found. Run setup first."
     return
   fi
   
   echo "Sending test weekly report..."
-  /etc/bdrman/telegram_weekly_report.sh
+  (cd /etc/bdrman && python3 -m bdrbot.metrics week --send)
   echo "✅ Report sent! Check your Telegram"
 }
 
@@ -368,6 +250,18 @@ telegram_bot_webhook(){
     chmod +x /etc/bdrman/telegram_bot.py
   fi
   
+  # Check for bot package (handlers live next to the script)
+  if [ ! -d /etc/bdrman/bdrbot ]; then
+    if [ -d "$(dirname "$0")/../bdrbot" ]; then
+      # Local dev environment
+      cp -r "$(dirname "$0")/../bdrbot" /etc/bdrman/bdrbot
+    else
+      echo "❌ Bot package not found at /etc/bdrman/bdrbot"
+      echo "   Re-run the installer: curl -s https://raw.githubusercontent.com/burakdarende/bdrman/main/install.sh | bash"
+      return 1
+    fi
+  fi
+
   echo "✅ Bot script installed"
   
   # Create systemd service
@@ -404,6 +298,78 @@ EOF
   log_success "Telegram bot webhook server started"
 }
 
+telegram_fleet_setup(){
+  echo "=== FLEET MODE ==="
+  echo ""
+  echo "One controller bot runs commands on many hosts: /status @all, /capapps @eu"
+  echo "Every host runs an agent; all agents and the controller share one secret."
+  echo "Agents are not encrypted: listen on localhost or a WireGuard address."
+  echo ""
+
+  local conf=/etc/bdrman/telegram.conf
+  mkdir -p /etc/bdrman
+  if [ ! -f "$conf" ]; then
+    # Agent-only host: no bot token, commands come from the controller
+    echo "SERVER_NAME=\"$(hostname)\"" > "$conf"
+  fi
+  source "$conf"
+
+  read -rp "Fleet secret (empty = ${FLEET_SECRET:+keep current}${FLEET_SECRET:-generate}): " secret
+  secret=$(echo "$secret" | tr -d '[:space:]')
+  [ -z "$secret" ] && secret="$FLEET_SECRET"
+  [ -z "$secret" ] && secret=$(openssl rand -hex 32 2>/dev/null || head -c 32 /dev/urandom | od -An -tx1 | tr -d ' \n')
+
+  read -rp "Agent listen address, e.g. 10.8.0.11:7722 (empty = controller only) [${FLEET_LISTEN}]: " listen
+  listen=$(echo "${listen:-$FLEET_LISTEN}" | tr -d '[:space:]')
+
+  sed -i '/^FLEET_SECRET=/d; /^FLEET_LISTEN=/d; /^# Fleet mode/d' "$conf"
+  {
+    echo "# Fleet mode (bdrman telegram -> Fleet Setup)"
+    echo "FLEET_SECRET=\"$secret\""
+    echo "FLEET_LISTEN=\"$listen\""
+  } >> "$conf"
+  chmod 600 "$conf"
+
+  if [ -n "$BOT_TOKEN" ]; then
+    # The bot serves agent requests itself
+    systemctl disable --now bdrman-agent.service 2>/dev/null || true
+    systemctl restart bdrman-telegram 2>/dev/null && echo "✅ Bot restarted"
+  elif [ -n "$listen" ]; then
+    cat > /etc/systemd/system/bdrman-agent.service << EOF
+[Unit]
+Description=BDRman Fleet Agent
+After=network.target
+
+[Service]
+Type=simple
+User=root
+WorkingDirectory=/etc/bdrman
+ExecStart=/usr/bin/python3 -m bdrbot.fleet agent
+Restart=always
+RestartSec=10
+
+[Install]
+WantedBy=multi-user.target
+EOF
+    systemctl daemon-reload
+    systemctl enable bdrman-agent.service
+    systemctl restart bdrman-agent.service
+    echo "✅ Agent service started: bdrman-agent"
+  fi
+
+  echo ""
+  echo "Secret (use the same on every host):"
+  echo "  $secret"
+  echo ""
+  echo "On the controller, list the agents in /etc/bdrman/fleet.conf:"
+  echo "  # name  address          tags    [timeout=seconds]"
+  echo "  web1    10.8.0.11:7722   web,eu"
+  echo "  db1     10.8.0.21:7722   db,us   timeout=60"
+  echo ""
+  echo "Check with /fleet or: cd /etc/bdrman && python3 -m bdrbot.fleet ping"
+  log_success "Fleet mode configured"
+}
+
 telegram_bot_status(){
   echo "=== DETAILED BOT STATUS ==="
   echo ""
@@ -524,7 +490,8 @@ telegram_menu(){
     echo "5) Send Weekly Report Now"
     echo "6) Restart Bot Service"
     echo "7) View Bot Logs"
-    echo "8) Back"
+    echo "8) Fleet Setup (multi-host)"
+    echo "9) Back"
     read -rp "Select: " c
     case "$c" in
       1) telegram_setup; pause ;;
@@ -534,7 +501,8 @@ telegram_menu(){
       5) telegram_test_report; pause ;;
       6) systemctl restart bdrman-telegram && echo "✅ Restarted"; pause ;;
       7) journalctl -u bdrman-telegram -n 50 --no-pager; pause ;;
-      8) break ;;
+      8) telegram_fleet_setup; pause ;;
+      9) break ;;
       *) echo "Invalid choice."; pause ;;
     esac
   done
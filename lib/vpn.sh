@@ -7,7 +7,26 @@ vpn_status(){
   fi
 }
 
+# Native peer management (bdrbot/wireguard.py), used once the server is set up
+vpn_native(){
+  [ -f /etc/wireguard/wg0.conf ] && [ -d /etc/bdrman/bdrbot ] || return 1
+  (cd /etc/bdrman && python3 -m bdrbot.wireguard "$@")
+}
+
 vpn_add_client(){
+  if [ -f /etc/wireguard/wg0.conf ] && [ -d /etc/bdrman/bdrbot ]; then
+    read -rp "Client name(s), space separated: " names
+    [ -z "$names" ] && return
+    # shellcheck disable=SC2086
+    vpn_native add $names || return 1
+    for name in $names; do
+      [ -f "/etc/wireguard/clients/$name.conf" ] && qrencode -t ANSIutf8 < "/etc/wireguard/clients/$name.conf"
+    done
+    log "VPN clients added: $names"
+    return
+  fi
+
+  # First client: wireguard-install.sh also installs and configures the server
   WG_SCRIPT="/usr/local/bin/wireguard-install.sh"
   
   if [ ! -f "$WG_SCRIPT" ]; then
@@ -51,15 +70,26 @@ vpn_add_client(){
 }
 
 vpn_list_conf(){
-  echo "=== VPN CONFIGS ==="
-  ls -1 *.conf 2>/dev/null | sed 's/\.conf$//'
+  echo "=== VPN CLIENTS ==="
+  vpn_native list && return
+  ls -1 /etc/wireguard/clients/*.conf "$HOME"/*.conf 2>/dev/null | xargs -n1 basename 2>/dev/null | sed 's/\.conf$//'
+}
+
+vpn_remove_client(){
+  echo "=== REMOVE CLIENT ==="
+  vpn_native list || { echo "❌ WireGuard not set up."; return; }
+  read -rp "Client name to remove: " name
+  [ -z "$name" ] && return
+  read -rp "Remove $name and disconnect it now? (yes/no): " ans
+  [ "$ans" != "yes" ] && return
+  vpn_native remove "$name" && log "VPN client removed: $name"
 }
 
 vpn_show_qr(){
   echo "=== SHOW QR CODE ==="
   
   # Create array of config files
-  mapfile -t CONFS < <(ls -1 *.conf 2>/dev/null | sed 's/\.conf$//')
+  mapfile -t CONFS < <(ls -1 /etc/wireguard/clients/*.conf *.conf 2>/dev/null | xargs -n1 basename 2>/dev/null | sed 's/\.conf$//' | sort -u)
   
   if [ ${#CONFS[@]} -eq 0 ]; then
     echo "❌ No VPN clients found."
@@ -85,6 +115,7 @@ vpn_show_qr(){
   echo "Selected: $client_name"
   
   CONF_FILE="${client_name}.conf"
+  [ -f "/etc/wireguard/clients/$CONF_FILE" ] && CONF_FILE="/etc/wireguard/clients/$CONF_FILE"
   PNG_FILE="${client_name}.png"
   
   if [ -f "$CONF_FILE" ]; then
@@ -95,6 +126,8 @@ vpn_show_qr(){
     if [ "$fmt" == "1" ]; then
       qrencode -t ANSIutf8 < "$CONF_FILE"
     elif [ "$fmt" == "2" ]; then
+      # Cached by config hash when the bot package is installed
+      PNG_FILE=$(vpn_native qr "$client_name" 2>/dev/null) || PNG_FILE="${client_name}.png"
       if [ ! -f "$PNG_FILE" ]; then
         qrencode -t PNG -o "$PNG_FILE" < "$CONF_FILE"
       fi
@@ -144,21 +177,23 @@ vpn_menu(){
     echo "0) Back"
     echo "1) Install WireGuard (Auto)"
     echo "2) WireGuard Status"
-    echo "3) Add New Client (wireguard-install.sh)"
+    echo "3) Add New Client(s)"
     echo "4) Restart WireGuard"
-    echo "5) List Config Files (/etc/wireguard)"
+    echo "5) List Clients"
     echo "6) Show wg show"
     echo "7) Show QR Code (PNG/ASCII)"
-    read -rp "Select (0-7): " c
+    echo "8) Remove Client"
+    read -rp "Select (0-8): " c
     case "$c" in
       0) break ;;
       1) vpn_install_wireguard; pause ;;
       2) vpn_status; pause ;;
       3) vpn_add_client; pause ;;
       4) vpn_restart; pause ;;
-      5) ls -la /etc/wireguard 2>/dev/null || echo "Directory not found."; pause ;;
+      5) vpn_list_conf; pause ;;
       6) wg show || echo "WireGuard not installed."; pause ;;
       7) vpn_show_qr; pause ;;
+      8) vpn_remove_client; pause ;;
       *) echo "Invalid choice."; pause ;;
     esac
   done
@@ -0,0 +1,111 @@
+"""Fleet mode on localhost: two agents, one dead host, one controller."""
+import asyncio
+import os
+import shutil
+import socket
+import stat
+import tempfile
+import types
+import unittest
+from unittest import mock
+from bdrbot import core, fleet, registry
+
+SECRET = "test-fleet-secret"
+
+def _closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class FleetTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        patcher = mock.patch.multiple(core, FLEET_SECRET=SECRET, CHAT_ID="1000", SERVER_NAME="agent")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.hosts = []
+        for name in ("web1", "web2"):
+            server = await fleet.start_agent("127.0.0.1:0")
+            self.addAsyncCleanup(server.wait_closed)
+            self.addCleanup(server.close)
+            port = server.sockets[0].getsockname()[1]
+            self.hosts.append(fleet.Host(name, f"127.0.0.1:{port}", ["web"], timeout=10))
+        self.hosts.append(fleet.Host("dead", f"127.0.0.1:{_closed_port()}", ["db"], timeout=10))
+
+    async def test_ping(self):
+        results = await fleet.ping(self.hosts)
+        self.assertEqual([r.status for r in results], ["ok", "ok", "down"])
+        self.assertEqual(results[0].info["name"], "agent")
+
+    async def test_fan_out_aggregates(self):
+        seen = []
+
+        async def on_result(result):
+            seen.append(result.host.name)
+
+        results = await fleet.fan_out(self.hosts, {"op": "run", "cmd": "version", "args": [], "user": "test"},
+                                      on_result=on_result)
+        self.assertCountEqual(seen, ["web1", "web2", "dead"])
+        web1, web2, dead = results
+        self.assertEqual((web1.status, web2.status), ("ok", "ok"))
+        self.assertIn("BDRman", web1.text)
+        self.assertEqual(dead.status, "down")
+        self.assertTrue(dead.error)
+
+        headline, body = fleet.summarize(results)
+        self.assertTrue(headline.startswith("2/3 ok"))
+        blocks = body.split("\n\n")
+        self.assertTrue(blocks[0].startswith("✅ web1, web2 "))     # identical output grouped
+        self.assertTrue(blocks[-1].startswith("🔌 dead "))          # failures last
+
+    async def test_wrong_secret_rejected(self):
+        results = await fleet.fan_out(self.hosts[:2], {"op": "ping"}, secret="wrong-secret")
+        for r in results:
+            self.assertEqual(r.status, "down")
+            self.assertIn("authentication failed", r.error)
+
+    async def test_commands_not_allowed_remotely(self):
+        result = await fleet.call(self.hosts[0], {"op": "run", "cmd": "vpn", "args": []})
+        self.assertEqual(result.status, "error")
+        self.assertIn("not available in fleet mode", result.error)
+
+    async def test_timeout(self):
+        slow = fleet.Host("slow", self.hosts[0].address, timeout=0.01)
+        result = await fleet.call(slow, {"op": "run", "cmd": "version", "args": []})
+        self.assertEqual(result.status, "timeout")
+
+class UnixAgentTest(unittest.IsolatedAsyncioTestCase):
+    async def test_socket_is_private(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "agent.sock")
+        with mock.patch.object(core, "FLEET_SECRET", SECRET):
+            server = await fleet.start_agent(path)
+            self.addAsyncCleanup(server.wait_closed)
+            self.addCleanup(server.close)
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+            result = await fleet.call(fleet.Host("local", path), {"op": "ping"})
+        self.assertEqual(result.status, "ok")
+
+class TargetsTest(unittest.TestCase):
+    hosts = [fleet.Host("web1", "10.0.0.1:7722", ["web", "eu"]), fleet.Host("db1", "10.0.0.2:7722", ["db"])]
+
+    def test_leading_selectors_only(self):
+        self.assertEqual(fleet.split_targets(["@web", "@db1", "restart"], self.hosts), (["restart"], ["web", "db1"]))
+        self.assertEqual(fleet.split_targets(["1.2.3.4", "@web"], self.hosts), (["1.2.3.4", "@web"], []))
+
+    def test_unknown_selector_is_an_argument(self):
+        self.assertEqual(fleet.split_targets(["@user"], self.hosts), (["@user"], []))
+        self.assertEqual(fleet.split_targets(["@all", "x"], []), (["x"], ["all"]))
+        self.assertEqual(fleet.split_targets(["@typo"]), ([], ["typo"]))       # /fleet and the CLI
+
+    def test_registry_routing(self):
+        context = lambda *args: types.SimpleNamespace(args=list(args))
+        with mock.patch.object(fleet, "load_hosts", return_value=self.hosts):
+            self.assertTrue(registry._fleet_targets(context("@eu")))
+            self.assertTrue(registry._fleet_targets(context("@web*", "nginx")))
+            self.assertFalse(registry._fleet_targets(context("@user")))
+            self.assertFalse(registry._fleet_targets(context("error", "@web")))
+            self.assertFalse(registry._fleet_targets(context()))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+"""Config export validation, planning, settings rewrites and rollback."""
+import copy
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from unittest import mock
+from bdrbot import hostconfig
+
+def _doc(**sections):
+    doc = {"format": hostconfig.FORMAT, "version": hostconfig.VERSION}
+    doc.update(sections)
+    return doc
+
+FIREWALL = {"enabled": True, "defaults": {"incoming": "deny", "outgoing": "allow"},
+            "rules": ["allow 22/tcp", "allow  'Nginx Full'", "deny from 10.0.0.9"], "blocked_ips": ["1.2.3.4"]}
+
+class ValidateTest(unittest.TestCase):
+    def test_normalizes_rules_and_blocked_ips(self):
+        doc = hostconfig.validate(_doc(firewall=copy.deepcopy(FIREWALL)))
+        self.assertEqual(doc["firewall"]["rules"], ["allow 22/tcp", "allow 'Nginx Full'"])
+        self.assertEqual(doc["firewall"]["blocked_ips"], ["1.2.3.4", "10.0.0.9"])
+
+    def test_rejects_bad_types(self):
+        for bad in (
+            _doc(version="2"),
+            _doc(version=True),
+            _doc(firewall=["allow 22"]),
+            _doc(firewall={"enabled": "yes"}),
+            _doc(firewall={"defaults": ["deny"]}),
+            _doc(firewall={"rules": "allow 22"}),
+            _doc(firewall={"rules": [22]}),
+            _doc(firewall={"blocked_ips": [1234]}),
+            _doc(services=["docker"]),
+            _doc(services={"docker": "enabled"}),
+            _doc(settings=["config"]),
+            _doc(settings={"config": ["x"]}),
+            _doc(settings={"config": {"KEY": ["x"]}}),
+            _doc(settings={"config": {"KEY": None}}),
+        ):
+            with self.subTest(doc=bad), self.assertRaises(hostconfig.ConfigError):
+                hostconfig.validate(bad)
+
+    def test_rejects_unsafe_content(self):
+        for bad in (
+            {"format": "something-else"},
+            _doc(version=hostconfig.VERSION + 1),
+            _doc(firewall={"rules": ["rm -rf /"]}),
+            _doc(firewall={"rules": ["allow 'unterminated"]}),
+            _doc(firewall={"blocked_ips": ["not-an-ip"]}),
+            _doc(firewall={"defaults": {"incoming": "maybe"}}),
+            _doc(services={"sshd": True}),
+            _doc(services={"bdrman-telegram": False}),        # role units are per host
+            _doc(settings={"secrets": {"KEY": "x"}}),
+            _doc(settings={"telegram": {"BOT_TOKEN": "x"}}),
+            _doc(settings={"config": {"lower": "x"}}),
+        ):
+            with self.subTest(doc=bad), self.assertRaises(hostconfig.ConfigError):
+                hostconfig.validate(bad)
+        for value in ('a"b', "$(reboot)", "`id`", "a\\b", "a\nb"):
+            with self.subTest(value=value), self.assertRaises(hostconfig.ConfigError):
+                hostconfig.validate(_doc(settings={"config": {"KEY": value}}))
+
+    def test_load_wraps_json_errors(self):
+        with self.assertRaises(hostconfig.ConfigError):
+            hostconfig.load("{not json")
+        with self.assertRaises(hostconfig.ConfigError):
+            hostconfig.load("[1, 2]")
+
+class SettingsFileTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "config.conf")
+
+    def test_rewrite_in_place(self):
+        with open(self.path, "w") as f:
+            f.write('# comment\nKEEP="1"\nCHANGE="old"\nNO_NEWLINE=x')
+        os.chmod(self.path, 0o640)
+        hostconfig._write_settings(self.path, {"CHANGE": "new", "ADDED": "2"})
+        with open(self.path) as f:
+            self.assertEqual(f.read(), '# comment\nKEEP="1"\nCHANGE="new"\nNO_NEWLINE=x\nADDED="2"\n')
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o640)
+        self.assertEqual(hostconfig.read_settings(self.path), {"KEEP": "1", "CHANGE": "new", "NO_NEWLINE": "x", "ADDED": "2"})
+
+    def test_new_file_is_private(self):
+        hostconfig._write_settings(self.path, {"KEY": "v"})
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+        self.assertEqual(hostconfig.read_settings(self.path), {"KEY": "v"})
+
+class PlanTest(unittest.TestCase):
+    def current(self):
+        return {
+            "firewall": {"enabled": False, "defaults": {"incoming": "allow", "outgoing": "allow"},
+                         "rules": ["allow 22/tcp", "allow 8080"], "blocked_ips": ["5.6.7.8"]},
+            "services": {"docker": True, "nginx": False},
+            "settings": {"config": {"KEEP": "1", "BACKUP_DIR": "/old"}},
+        }
+
+    def test_changes(self):
+        doc = hostconfig.validate(_doc(firewall=copy.deepcopy(FIREWALL), services={"docker": True, "nginx": True, "cron": True},
+                                       settings={"config": {"BACKUP_DIR": "/backup", "NEW": 5}}))
+        changes = hostconfig.plan(doc, self.current())
+        got = {(c.section, c.symbol, c.text) for c in changes}
+        self.assertEqual(got, {
+            ("firewall", "+", "allow 'Nginx Full'"),
+            ("blocked", "+", "1.2.3.4"),
+            ("blocked", "+", "10.0.0.9"),
+            ("firewall", "-", "allow 8080"),
+            ("blocked", "-", "5.6.7.8"),
+            ("firewall", "~", "default deny incoming"),
+            ("firewall", "~", "enable"),
+            ("services", "~", "enable nginx"),
+            ("services", "!", "cron not installed"),
+            ("settings:config", "~", "BACKUP_DIR=/backup"),
+            ("settings:config", "+", "NEW=5"),
+        })
+        # Additions before deletions: a replaced rule never leaves a gap
+        kinds = [c.symbol for c in changes if c.section == "firewall"]
+        self.assertLess(kinds.index("+"), kinds.index("-"))
+        nginx = next(c for c in changes if c.text == "enable nginx")
+        self.assertEqual((nginx.cmd, nginx.undo), ("systemctl enable --now nginx", "systemctl disable --now nginx"))
+
+    def test_second_plan_is_empty(self):
+        """Planning against the state the first plan converged to finds nothing to do."""
+        settings_file = os.path.join(tempfile.mkdtemp(), "config.conf")
+        self.addCleanup(shutil.rmtree, os.path.dirname(settings_file))
+        with open(settings_file, "w") as f:
+            f.write('KEEP="1"\nBACKUP_DIR="/old"\n')
+        doc = hostconfig.validate(_doc(firewall=copy.deepcopy(FIREWALL), services={"docker": False, "nginx": True},
+                                       settings={"config": {"BACKUP_DIR": "/backup", "NEW": 5}}))
+        self.assertTrue(hostconfig.actionable(hostconfig.plan(doc, self.current())))
+
+        converged = {"firewall": copy.deepcopy(doc["firewall"]), "services": {"docker": False, "nginx": True}}
+        hostconfig._write_settings(settings_file, {"BACKUP_DIR": "/backup", "NEW": "5"})
+        converged["settings"] = {"config": hostconfig.read_settings(settings_file)}
+        second = hostconfig.plan(doc, converged)
+        self.assertEqual(hostconfig.actionable(second), [])
+        self.assertIn("Already in sync", hostconfig.render_plan(second))
+
+    def test_missing_ufw_is_a_warning(self):
+        doc = hostconfig.validate(_doc(firewall=copy.deepcopy(FIREWALL)))
+        changes = hostconfig.plan(doc, {"firewall": None, "services": {}, "settings": {}})
+        self.assertEqual([c.symbol for c in changes], ["!"])
+        self.assertEqual(hostconfig.actionable(changes), [])
+
+class ApplyRollbackTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.log = os.path.join(self.dir, "log")
+        patcher = mock.patch.multiple(hostconfig, UFW_FILES=(), SETTINGS_FILES={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def step(self, name, cmd="true", undo="true"):
+        return hostconfig.Change("services", "~", name, f"echo do-{name} >> {self.log}; {cmd}",
+                                 f"echo undo-{name} >> {self.log}; {undo}")
+
+    def logged(self):
+        with open(self.log) as f:
+            return f.read().split()
+
+    def test_only_steps_that_ran_are_undone(self):
+        with self.assertRaisesRegex(hostconfig.ConfigError, "Import rolled back"):
+            hostconfig.apply({}, [self.step("a"), self.step("b", cmd="false"), self.step("c")])
+        self.assertEqual(self.logged(), ["do-a", "do-b", "undo-b", "undo-a"])
+
+    def test_failed_undo_is_reported(self):
+        with self.assertRaises(hostconfig.ConfigError) as caught:
+            hostconfig.apply({}, [self.step("a", undo="echo unit masked >&2; false"), self.step("b", cmd="false")])
+        message = str(caught.exception)
+        self.assertIn("Rollback incomplete", message)
+        self.assertIn("undo-a", message)
+        self.assertIn("unit masked", message)
+        self.assertNotIn("undo-b", message)
+
+if __name__ == "__main__":
+    unittest.main()
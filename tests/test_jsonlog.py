@@ -0,0 +1,55 @@
+"""Size rotation and external rotation of the JSON log file."""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from bdrbot import jsonlog
+
+def _record(msg):
+    return logging.LogRecord("bdrman-bot", logging.INFO, __file__, 1, msg, None, None)
+
+class RotatingJsonHandlerTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "bot.log")
+
+    def handler(self, **kwargs):
+        handler = jsonlog.RotatingJsonHandler(self.path, **kwargs)
+        handler.handleError = lambda record: self.fail("emit raised")
+        self.addCleanup(handler.close)
+        return handler
+
+    def lines(self, path):
+        with open(path) as f:
+            return [json.loads(line)["msg"] for line in f]
+
+    def test_existing_file_over_max_bytes(self):
+        with open(self.path, "w") as f:
+            f.write("x" * 200 + "\n")
+        handler = self.handler(max_bytes=100)
+        handler.emit(_record("first"))
+        with open(f"{self.path}.1") as f:
+            self.assertEqual(f.read(), "x" * 200 + "\n")
+        self.assertEqual(self.lines(self.path), ["first"])
+
+    def test_rotation_keeps_backups(self):
+        handler = self.handler(max_bytes=150, backups=2)
+        for n in range(10):
+            handler.emit(_record(f"message {n}"))
+        self.assertFalse(os.path.exists(f"{self.path}.3"))
+        self.assertEqual(self.lines(self.path)[-1], "message 9")
+        self.assertTrue(self.lines(f"{self.path}.2"))
+
+    def test_follows_external_rename(self):
+        handler = self.handler()
+        handler.emit(_record("before"))
+        os.replace(self.path, f"{self.path}.1")      # what logrotate does
+        handler.emit(_record("after"))
+        self.assertEqual(self.lines(f"{self.path}.1"), ["before"])
+        self.assertEqual(self.lines(self.path), ["after"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""HTTP and DNS probes against local stand-in servers."""
+import asyncio
+import socket
+import struct
+import unittest
+from unittest import mock
+from bdrbot import probes
+
+class HttpProbeTest(unittest.IsolatedAsyncioTestCase):
+    async def serve(self, response):
+        """HTTP server answering every request with response; returns its base URL."""
+        self.requests = []
+
+        async def handle(reader, writer):
+            head = await reader.readuntil(b"\r\n\r\n")
+            self.requests.append(head.decode())
+            writer.write(response)
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+        return f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+    async def test_status(self):
+        url = await self.serve(b"HTTP/1.1 204 No Content\r\nContent-Length: 0\r\n\r\n")
+        ms, status = await probes.http_get(f"{url}/health?full=1")
+        self.assertEqual(status, 204)
+        self.assertGreaterEqual(ms, 0)
+        request = self.requests[0].split("\r\n")
+        self.assertEqual(request[0], "GET /health?full=1 HTTP/1.1")
+        self.assertIn(f"Host: {url[len('http://'):]}", request)
+
+    async def test_bad_response(self):
+        url = await self.serve(b"garbage\r\n")
+        with self.assertRaises(ValueError):
+            await probes.http_get(url)
+
+    async def test_engine_records_server_errors(self):
+        engine = probes.ProbeEngine()
+        ok = await engine.measure_now(probes.HTTP, await self.serve(b"HTTP/1.1 200 OK\r\n\r\n"))
+        self.assertIsNone(ok.last_error)
+        self.assertEqual(ok.detail, 200)
+        failing = await engine.measure_now(probes.HTTP, await self.serve(b"HTTP/1.1 503 Unavailable\r\n\r\n"))
+        self.assertEqual(failing.last_error, "HTTP 503")
+        self.assertEqual(failing.hist.summary()[:2], (0, 1))
+
+    async def test_connection_refused(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        t = await probes.ProbeEngine().measure_now(probes.HTTP, f"http://127.0.0.1:{port}/")
+        self.assertIsNone(t.last_ms)
+        self.assertTrue(t.last_error)
+
+class _DnsStub(asyncio.DatagramProtocol):
+    """Answers A queries from a fixed table, NXDOMAIN otherwise; names in silent get no reply."""
+
+    def __init__(self, records, silent=()):
+        self.records = records
+        self.silent = silent
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        qid, = struct.unpack("!H", data[:2])
+        pos, labels = 12, []
+        while data[pos]:
+            labels.append(data[pos + 1:pos + 1 + data[pos]].decode())
+            pos += data[pos] + 1
+        question = data[12:pos + 5]
+        name = ".".join(labels)
+        if name in self.silent:
+            return
+        addrs = self.records.get(name)
+        flags = 0x8180 if addrs else 0x8183
+        reply = struct.pack("!HHHHHH", qid, flags, 1, len(addrs or ()), 0, 0) + question
+        for ip in addrs or ():
+            # Name as a pointer to the question, like real servers send it
+            reply += struct.pack("!HHHIH", 0xc00c, 1, 1, 60, 4) + socket.inet_aton(ip)
+        self.transport.sendto(reply, addr)
+
+class DnsProbeTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        records = {"app.example.com": ["10.0.0.1", "10.0.0.2"]}
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: _DnsStub(records, silent={"slow.example.com"}), local_addr=("127.0.0.1", 0))
+        self.addCleanup(transport.close)
+        self.client = probes.DnsClient("127.0.0.1", transport.get_extra_info("sockname")[1])
+
+    async def asyncTearDown(self):
+        if self.client.transport:
+            self.client.transport.close()
+
+    async def test_resolve(self):
+        ms, addrs = await self.client.resolve("app.example.com")
+        self.assertEqual(addrs, ["10.0.0.1", "10.0.0.2"])
+        self.assertGreaterEqual(ms, 0)
+
+    async def test_concurrent_queries_share_the_socket(self):
+        results = await asyncio.gather(*(self.client.resolve("app.example.com") for _ in range(20)))
+        self.assertTrue(all(addrs == ["10.0.0.1", "10.0.0.2"] for _, addrs in results))
+        self.assertEqual(self.client._waiting, {})
+
+    async def test_nxdomain(self):
+        with self.assertRaisesRegex(LookupError, "NXDOMAIN"):
+            await self.client.resolve("missing.example.com")
+
+    async def test_timeout(self):
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.client.resolve("slow.example.com", timeout=0.2)
+        self.assertEqual(self.client._waiting, {})
+
+    async def test_engine_records_dns(self):
+        engine = probes.ProbeEngine()
+        engine.dns = self.client
+        t = await engine.measure_now(probes.DNS, "app.example.com")
+        self.assertEqual(t.detail, ["10.0.0.1", "10.0.0.2"])
+        t = await engine.measure_now(probes.DNS, "missing.example.com")
+        self.assertEqual(t.last_error, "NXDOMAIN")
+
+class IcmpPingerTest(unittest.TestCase):
+    def test_failure_is_cached(self):
+        pinger = probes.IcmpPinger()
+        with mock.patch.object(probes.socket, "socket", side_effect=PermissionError) as opened:
+            self.assertFalse(pinger.available)
+            self.assertFalse(pinger.available)
+        self.assertEqual(opened.call_count, 2)      # DGRAM then RAW, once
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""TLS scanner against a local TLS server with openssl-generated certificates."""
+import asyncio
+import os
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import time
+import unittest
+from unittest import mock
+from bdrbot import tlsscan
+
+def _openssl(*args, cwd):
+    subprocess.run(["openssl", *args], cwd=cwd, check=True, capture_output=True)
+
+@unittest.skipUnless(shutil.which("openssl"), "openssl CLI not installed")
+class CheckTest(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = tempfile.mkdtemp()
+        # Self-signed, 30 days
+        _openssl("req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "30", "-subj", "/CN=self.test",
+                 "-keyout", "self.key", "-out", "self.crt", cwd=cls.dir)
+        # CA-signed leaf, 90 days
+        _openssl("req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "365", "-subj", "/CN=Test CA",
+                 "-keyout", "ca.key", "-out", "ca.crt", cwd=cls.dir)
+        _openssl("req", "-new", "-newkey", "rsa:2048", "-nodes", "-subj", "/CN=leaf.test",
+                 "-keyout", "leaf.key", "-out", "leaf.csr", cwd=cls.dir)
+        _openssl("x509", "-req", "-in", "leaf.csr", "-CA", "ca.crt", "-CAkey", "ca.key", "-CAcreateserial",
+                 "-days", "90", "-out", "leaf.crt", cwd=cls.dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dir)
+
+    async def serve(self, name):
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(os.path.join(self.dir, f"{name}.crt"), os.path.join(self.dir, f"{name}.key"))
+
+        async def handle(reader, writer):
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0, ssl=ctx)
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+        return server.sockets[0].getsockname()[1]
+
+    def expires_in(self, result, days):
+        self.assertIsNone(result.error)
+        self.assertAlmostEqual(result.not_after, time.time() + days * 86400, delta=120)
+
+    async def test_self_signed(self):
+        port = await self.serve("self")
+        result = await tlsscan.check(f"self.test:{port}", connect_host="127.0.0.1")
+        self.expires_in(result, 30)
+        self.assertTrue(result.self_signed)
+
+    async def test_ca_signed(self):
+        port = await self.serve("leaf")
+        result = await tlsscan.check(f"leaf.test:{port}", connect_host="127.0.0.1")
+        self.expires_in(result, 90)
+        self.assertFalse(result.self_signed)
+
+    async def test_connection_refused(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        result = await tlsscan.check(f"self.test:{port}", connect_host="127.0.0.1")
+        self.assertIsNone(result.not_after)
+        self.assertTrue(result.error)
+
+class SplitTargetTest(unittest.IsolatedAsyncioTestCase):
+    def test_split(self):
+        self.assertEqual(tlsscan.split_target("example.com"), ("example.com", 443))
+        self.assertEqual(tlsscan.split_target("example.com:8443"), ("example.com", 8443))
+        for bad in ("example.com:abc", "example.com:", "example.com:0", "example.com:70000", "example.com:-1"):
+            with self.assertRaises(ValueError):
+                tlsscan.split_target(bad)
+
+    async def test_bad_port_is_an_error_result(self):
+        result = await tlsscan.check("example.com:abc")
+        self.assertIsNone(result.not_after)
+        self.assertIn("bad port", result.error)
+
+class ScannerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.scanner = tlsscan.TLSScanner(state_file=os.path.join(self.dir, "tls.json"))
+
+        async def fake_check(target, connect_host=None):
+            return tlsscan.CertResult(target, time.time() + 2 * 86400)
+
+        patcher = mock.patch.object(tlsscan, "check", fake_check)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_adhoc_targets_are_not_cached(self):
+        await self.scanner.scan(["known.test"])
+        results = await self.scanner.scan(["known.test", "oneoff.test"], force=True, adhoc=True)
+        self.assertEqual([r.target for r in results], ["known.test", "oneoff.test"])
+        self.assertEqual(set(self.scanner.results), {"known.test"})
+
+    async def test_sweep_forgets_undiscovered(self):
+        await self.scanner.scan(["old.test", "kept.test"])
+        with mock.patch.object(tlsscan, "discover", return_value=["kept.test"]):
+            await self.scanner.sweep()
+        self.assertEqual(set(self.scanner.results), {"kept.test"})
+
+    async def test_alert_marked_only_after_send(self):
+        bot = mock.AsyncMock()
+        bot.send_message.side_effect = OSError("network down")
+        with mock.patch.object(tlsscan, "discover", return_value=["soon.test"]), \
+                mock.patch.object(tlsscan.core, "CHAT_ID", "1"):
+            await self.scanner.sweep(bot)
+            self.assertIsNone(self.scanner.results["soon.test"].alerted)
+            bot.send_message.side_effect = None
+            await self.scanner.sweep(bot)
+            self.assertEqual(self.scanner.results["soon.test"].alerted, 3)
+            await self.scanner.sweep(bot)
+        self.assertEqual(bot.send_message.await_count, 2)     # failed, sent, nothing new
+
+if __name__ == "__main__":
+    unittest.main()